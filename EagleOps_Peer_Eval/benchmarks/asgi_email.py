@@ -0,0 +1,160 @@
+"""
+ASGI vs WSGI throughput of the invite_students view against a slow SMTP server.
+
+    python benchmarks/asgi_email.py [--requests 120] [--concurrency 40]
+                                    [--smtp-delay 0.25] [--wsgi-workers 4]
+
+Starts a local SMTP stub that waits --smtp-delay seconds before accepting each
+message, then sends the same batch of invites twice against a fresh database
+file: through the WSGI handler from a fixed pool of --wsgi-workers threads (a
+threaded WSGI server) and through the ASGI handler with --concurrency requests
+in flight on one event loop. Under ASGI the SMTP round trip runs in the
+EMAIL_SEND_THREADS pool, so the event loop keeps serving other requests while
+mail is pending.
+"""
+import argparse
+import json
+import os
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import asyncio, json, os, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, {project_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_main.settings')
+from django.conf import settings
+settings.DATABASES['default']['NAME'] = {db_path!r}
+settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+settings.EMAIL_HOST, settings.EMAIL_PORT = '127.0.0.1', {smtp_port!r}
+settings.EMAIL_USE_TLS = False
+settings.EMAIL_HOST_USER = settings.EMAIL_HOST_PASSWORD = ''
+settings.ALLOWED_HOSTS = ['*']
+import django
+django.setup()
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+call_command('migrate', verbosity=0)
+from pages.models import Course, UserProfile
+
+mode, requests = {mode!r}, {requests!r}
+concurrency, wsgi_workers = {concurrency!r}, {wsgi_workers!r}
+user = User.objects.create_user('admin')
+profile = UserProfile.objects.create(user=user)
+course = Course.objects.create(name='Bench', code='BENCH1')
+url = reverse('invite_students', args=[course.id])
+clients = [AsyncClient() for _ in range(concurrency)] if mode == 'asgi' else []
+for client in clients:
+    client.force_login(user)
+local = threading.local()
+
+def invite(n):
+    # One client per server thread, as each WSGI worker serves one request at a time
+    if not hasattr(local, 'client'):
+        local.client = Client()
+        local.client.force_login(user)
+        UserProfile.objects.filter(id=profile.id).update(admin=True)
+    response = local.client.post(url, {{'email': f'student{{n}}@example.com'}})
+    return response.status_code
+
+async def ainvite(n, slots):
+    async with slots:
+        response = await clients[n % concurrency].post(url, {{'email': f'student{{n}}@example.com'}})
+        return response.status_code
+
+# Logging in re-derives the admin flag from ADMIN_EMAILS
+UserProfile.objects.filter(id=profile.id).update(admin=True)
+
+async def run_asgi():
+    slots = asyncio.Semaphore(concurrency)
+    return await asyncio.gather(*(ainvite(n, slots) for n in range(requests)))
+
+start = time.perf_counter()
+if mode == 'asgi':
+    statuses = asyncio.run(run_asgi())
+else:
+    with ThreadPoolExecutor(max_workers=wsgi_workers) as pool:
+        statuses = list(pool.map(invite, range(requests)))
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'ok': statuses.count(302), 'failed': len(statuses) - statuses.count(302)}}))
+"""
+
+
+class SlowSMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: accepts every message after a delay"""
+
+    def reply(self, line):
+        self.wfile.write(line + b'\r\n')
+
+    def handle(self):
+        self.reply(b'220 localhost SMTP stub')
+        for line in self.rfile:
+            command = line[:4].upper()
+            if command == b'DATA':
+                self.reply(b'354 End data with <CR><LF>.<CR><LF>')
+                for data_line in self.rfile:
+                    if data_line.rstrip(b'\r\n') == b'.':
+                        break
+                time.sleep(self.server.delay)
+                self.server.delivered += 1
+                self.reply(b'250 OK')
+            elif command == b'QUIT':
+                self.reply(b'221 Bye')
+                break
+            elif command in (b'EHLO', b'HELO'):
+                self.reply(b'250 localhost')
+            else:
+                self.reply(b'250 OK')
+
+
+class SlowSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, delay):
+        super().__init__(('127.0.0.1', 0), SlowSMTPHandler)
+        self.delay = delay
+        self.delivered = 0
+
+
+def run(mode, smtp_port, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        code = CHILD.format(project_dir=PROJECT_DIR, db_path=os.path.join(tmp, 'bench.sqlite3'),
+                            smtp_port=smtp_port, mode=mode, requests=args.requests,
+                            concurrency=args.concurrency, wsgi_workers=args.wsgi_workers)
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=PROJECT_DIR, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=120)
+    parser.add_argument('--concurrency', type=int, default=40, help='Clients with a request in flight')
+    parser.add_argument('--smtp-delay', type=float, default=0.25, help='Seconds per message')
+    parser.add_argument('--wsgi-workers', type=int, default=4, help='Threads of the WSGI server')
+    args = parser.parse_args()
+
+    server = SlowSMTPServer(args.smtp_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        print(f"{'handler':<8} {'ok':>5} {'failed':>7} {'seconds':>8} {'req/s':>7}")
+        for mode in ('wsgi', 'asgi'):
+            result = run(mode, server.server_address[1], args)
+            rate = result['ok'] / result['seconds'] if result['seconds'] else 0
+            print(f"{mode:<8} {result['ok']:5d} {result['failed']:7d} "
+                  f"{result['seconds']:8.2f} {rate:7.1f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
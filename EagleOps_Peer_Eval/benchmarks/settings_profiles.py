@@ -0,0 +1,105 @@
+"""
+Settings profile benchmark: request latency and queries, development vs production.
+
+    python benchmarks/settings_profiles.py [--requests 50]
+
+Each profile runs in its own interpreter (DJANGO_ENV=development / production)
+against a throwaway SQLite file seeded with one course, so connection setup,
+template loading and session handling all count toward the numbers.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, os, statistics, sys, time
+sys.path.insert(0, {project_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_main.settings')
+import django
+django.setup()
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.utils import timezone
+
+setup_test_environment()
+connection.settings_dict['TEST']['NAME'] = {db_path!r}
+connection.creation.create_test_db(verbosity=0, keepdb=False)
+
+from pages.models import Course, Form, FormTemplate, Question, Team, UserProfile
+user = User.objects.create_user('bench', password='pass')
+profile = UserProfile.objects.create(user=user, admin=True)
+course = Course.objects.create(name='Bench', code='BENCH1')
+course.instructors.add(profile)
+template = FormTemplate.objects.create(title='Weekly', course=course, created_by=profile)
+for order in range(5):
+    Question.objects.create(template=template, text=f'Q{{order}}', order=order)
+for number in range(10):
+    Team.objects.create(name=f'Team {{number}}', course=course)
+now = timezone.now()
+Form.objects.create(title='Week 1', template=template, course=course, created_by=profile,
+                    publication_date=now, closing_date=now + timedelta(days=7))
+
+client = Client()
+client.force_login(user)
+# The login signal recomputes admin status from the email list
+UserProfile.objects.filter(id=profile.id).update(admin=True)
+session = client.session
+session['selected_course_id'] = course.id
+session.save()
+urls = ['/courses/', f'/courses/{{course.id}}/', '/forms-dashboard/', '/roster/']
+client.get(urls[0])
+
+results = {{}}
+for url in urls:
+    timings = []
+    queries = 0
+    for _ in range({requests}):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, (url, response.status_code)
+        queries = len(captured.captured_queries)
+    results[url.replace(str(course.id), '<id>')] = {{
+        'median_ms': statistics.median(timings) * 1000,
+        'queries': queries,
+    }}
+print(json.dumps(results))
+"""
+
+
+def run_profile(profile, requests):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DJANGO_ENV=profile, DJANGO_CACHE_DIR=os.path.join(tmp, 'cache'),
+                   DJANGO_SECRET_KEY='bench-secret', DJANGO_JOIN_CODE_KEY='bench-join-code-key')
+        env.pop('REDIS_URL', None)
+        code = CHILD.format(project_dir=PROJECT_DIR, db_path=os.path.join(tmp, 'bench.sqlite3'),
+                            requests=requests)
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=PROJECT_DIR, env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50, help='Requests per URL')
+    args = parser.parse_args()
+
+    development = run_profile('development', args.requests)
+    production = run_profile('production', args.requests)
+    print(f"{'URL':<22} {'dev ms':>8} {'prod ms':>8} {'dev q':>6} {'prod q':>6}")
+    for url in development:
+        dev, prod = development[url], production[url]
+        print(f"{url:<22} {dev['median_ms']:8.1f} {prod['median_ms']:8.1f} "
+              f"{dev['queries']:6d} {prod['queries']:6d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+SQLite write-concurrency stress test: form submissions from many threads at once.
+
+    python benchmarks/sqlite_concurrency.py [--threads 16] [--submissions 25]
+
+Runs the same workload twice against a fresh database file: once with SQLite's
+defaults (rollback journal, DEFERRED transactions, 5 s timeout) and once with
+the DATABASES options from settings (WAL, synchronous=NORMAL, IMMEDIATE
+transactions, longer busy timeout). Each submission mirrors
+submit_form_response: one transaction that writes a response and its answers.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, os, sys, threading, time
+sys.path.insert(0, {project_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_main.settings')
+from django.conf import settings
+if not {tuned!r}:
+    settings.DATABASES['default']['OPTIONS'] = {{}}
+settings.DATABASES['default']['NAME'] = {db_path!r}
+import django
+django.setup()
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.utils import timezone
+
+call_command('migrate', verbosity=0)
+from pages.models import Answer, Course, Form, FormResponse, FormTemplate, Question, UserProfile
+
+threads, submissions = {threads!r}, {submissions!r}
+owner = UserProfile.objects.create(user=User.objects.create_user('owner'))
+course = Course.objects.create(name='Stress', code='STRESS1')
+template = FormTemplate.objects.create(title='Weekly', course=course, created_by=owner)
+questions = [Question.objects.create(template=template, text=f'Q{{n}}', order=n) for n in range(5)]
+now = timezone.now()
+form = Form.objects.create(title='Week 1', template=template, course=course, created_by=owner,
+                           publication_date=now, closing_date=now + timedelta(days=1))
+evaluators = [UserProfile.objects.create(user=User.objects.create_user(f's{{n}}')) for n in range(threads)]
+response_ids = [
+    [FormResponse.objects.create(form=form, evaluator=evaluator, evaluatee=owner).id] * submissions
+    for evaluator in evaluators
+]
+connection.close()
+
+written = []
+locked = []
+
+def submit(worker):
+    done = errors = 0
+    for response_id in response_ids[worker]:
+        try:
+            with transaction.atomic():
+                response = FormResponse.objects.get(id=response_id)
+                for question in questions:
+                    Answer.objects.update_or_create(
+                        response=response, question=question,
+                        defaults={{'likert_answer': 1 + (done % 5)}},
+                    )
+                response.submit()
+            done += 1
+        except OperationalError:
+            errors += 1
+    connection.close()
+    written.append(done)
+    locked.append(errors)
+
+start = time.perf_counter()
+workers = [threading.Thread(target=submit, args=(n,)) for n in range(threads)]
+for worker in workers:
+    worker.start()
+for worker in workers:
+    worker.join()
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'written': sum(written), 'locked': sum(locked)}}))
+"""
+
+
+def run(tuned, threads, submissions):
+    with tempfile.TemporaryDirectory() as tmp:
+        code = CHILD.format(project_dir=PROJECT_DIR, db_path=os.path.join(tmp, 'stress.sqlite3'),
+                            tuned=tuned, threads=threads, submissions=submissions)
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=PROJECT_DIR, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--submissions', type=int, default=25, help='Submissions per thread')
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'written':>8} {'locked':>7} {'seconds':>8} {'writes/s':>9}")
+    for label, tuned in (('default', False), ('tuned', True)):
+        result = run(tuned, args.threads, args.submissions)
+        rate = result['written'] / result['seconds'] if result['seconds'] else 0
+        print(f"{label:<10} {result['written']:8d} {result['locked']:7d} "
+              f"{result['seconds']:8.2f} {rate:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
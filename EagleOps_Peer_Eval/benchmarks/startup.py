@@ -0,0 +1,67 @@
+"""
+Startup benchmark: how long django.setup() takes and how many queries it runs.
+
+    python benchmarks/startup.py [--runs 10] [--only-setup-oauth]
+
+Each run is a fresh interpreter, like a WSGI worker boot. The second mode also
+runs the setup_oauth command after django.setup(), which shows what the one-off
+setup step (make migrate) costs on top of a plain start. --only-setup-oauth
+measures just that mode.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import io, json, os, sys, time
+sys.path.insert(0, {project_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_main.settings')
+start = time.perf_counter()
+import django
+from django.db import connection
+connection.force_debug_cursor = True
+django.setup()
+if {bootstrap!r}:
+    from django.core.management import call_command
+    call_command('setup_oauth', stdout=io.StringIO())
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'queries': len(connection.queries)}}))
+"""
+
+
+def run_once(bootstrap):
+    code = CHILD.format(project_dir=PROJECT_DIR, bootstrap=bootstrap)
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=PROJECT_DIR, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(runs, bootstrap):
+    results = [run_once(bootstrap) for _ in range(runs)]
+    return {
+        'median_ms': statistics.median(r['seconds'] for r in results) * 1000,
+        'queries': max(r['queries'] for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--only-setup-oauth', action='store_true',
+                        help='Only measure startup followed by the setup_oauth command')
+    args = parser.parse_args()
+
+    modes = [('setup + setup_oauth', True)]
+    if not args.only_setup_oauth:
+        modes.insert(0, ('setup only', False))
+    for label, bootstrap in modes:
+        result = measure(args.runs, bootstrap)
+        print(f"{label:<22} {result['median_ms']:8.1f} ms  {result['queries']:3d} queries")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+Team formation benchmark: wall time of plan_teams() for growing rosters.
+
+    python benchmarks/team_formation.py [--students 250,1000,4000] [--team-size 4] [--runs 5]
+
+Every roster carries a few keep-together and keep-apart pairs and has half of
+its students paired with an earlier teammate, as after one semester of teams.
+plan_teams() touches no database, so no data is created.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', default='250,1000,4000', help='Comma-separated roster sizes')
+    parser.add_argument('--team-size', type=int, default=4)
+    parser.add_argument('--runs', type=int, default=5, help='Timed runs per roster size')
+    args = parser.parse_args()
+
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_main.settings')
+    import django
+    django.setup()
+    from pages.team_formation import plan_teams
+
+    print(f"{'students':>8} {'teams':>6} {'median ms':>10} {'min ms':>8}")
+    for size in (int(value) for value in args.students.split(',') if value.strip()):
+        students = list(range(1, size + 1))
+        keep_together = [(1, 2), (2, 3)]
+        keep_apart = [(10, 11), (10, 12)]
+        prior_pairs = [(a, a + 1) for a in range(1, size, 2)]
+        times = []
+        for run in range(args.runs):
+            start = time.perf_counter()
+            teams = plan_teams(students, args.team_size, keep_together, keep_apart, prior_pairs, seed=run)
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"{size:8d} {len(teams):6d} {statistics.median(times):10.1f} {min(times):8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+View benchmarks: wall time and query count of the main pages at several data sizes.
+
+    python benchmarks/views.py [--scales small,medium] [--repeat 5]
+                               [--baseline benchmarks/baselines/views.json]
+                               [--save-baseline] [--tolerance 0.25]
+
+For each scale a fresh database file is filled by generate_load_data and every
+view is requested once to warm up, then --repeat times while timing and
+counting queries. Results are compared with the JSON baseline when it exists:
+any extra query, or a median time more than --tolerance slower (and at least
+--min-ms), counts as a regression and makes the script exit with status 1.
+--save-baseline writes this run as the new baseline. Query counts are
+portable; times only compare meaningfully on the same machine. The hit and
+miss counts of the question set caches over each scale's requests are shown
+after the table.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(PROJECT_DIR, 'benchmarks', 'baselines', 'views.json')
+
+# generate_load_data arguments per scale
+SCALES = {
+    'small': {'courses': 1, 'students': 20, 'forms': 2},
+    'medium': {'courses': 2, 'students': 100, 'forms': 4},
+    'large': {'courses': 4, 'students': 400, 'forms': 6},
+}
+
+CHILD = """
+import json, os, statistics, sys, time
+sys.path.insert(0, {project_dir!r})
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_main.settings')
+from django.conf import settings
+settings.DATABASES['default']['NAME'] = {db_path!r}
+settings.ALLOWED_HOSTS = ['*']
+import django
+django.setup()
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+call_command('migrate', verbosity=0)
+from pages.load_data import generate_load_data
+from pages.models import Course, FormResponse, Question, UserProfile
+from pages.question_cache import cache_stats, question_sets, snapshot_sets
+
+generate_load_data(prefix='bench', **{sizes!r})
+course = Course.objects.get(code='BENCH-0000')
+forms = list(course.forms.order_by('publication_date'))
+results_form, active_form = forms[-2], forms[-1]
+student = User.objects.get(username='bench-student-0-0')
+response = FormResponse.objects.filter(form=active_form, evaluator__user=student).first()
+answers = {{}}
+for question in active_form.get_questions():
+    if question.question_type == Question.LIKERT_SCALE:
+        answers[f'likert_{{question.id}}'] = '4'
+    else:
+        answers[f'text_{{question.id}}'] = 'Benchmark answer'
+
+def login(username, admin=False):
+    client = Client()
+    user = User.objects.get(username=username)
+    client.force_login(user)
+    if admin:
+        # Logging in re-derives the admin flag from ADMIN_EMAILS
+        UserProfile.objects.filter(user=user).update(admin=True)
+    return client
+
+admin, instructor, student = login('bench-admin', admin=True), login('bench-instructor-0'), login(student.username)
+cases = [
+    ('form_results', instructor, 'get', reverse('form_results', args=[course.id, results_form.id]), None, 200),
+    ('performance_view', instructor, 'get', reverse('performance', args=[course.id]), None, 200),
+    ('forms_dashboard', admin, 'get', reverse('forms_dashboard'), None, 200),
+    ('todo_view', student, 'get', reverse('todo'), None, 200),
+    ('course_detail', instructor, 'get', reverse('course_detail', args=[course.id]), None, 200),
+    ('roster', admin, 'get', reverse('roster', args=[course.id]), None, 200),
+    ('submit_form_response', student, 'post', reverse('submit_form_response', args=[response.id]), answers, 302),
+]
+
+executed = []
+question_sets.clear()
+snapshot_sets.clear()
+
+def count_queries(execute, sql, params, many, context):
+    # Unlike CaptureQueriesContext this has no 9000-query cap and skips the SQL logging
+    executed.append(1)
+    return execute(sql, params, many, context)
+
+results = {{}}
+for name, client, method, url, data, expected in cases:
+    getattr(client, method)(url, data)
+    times = []
+    for _ in range({repeat!r}):
+        executed.clear()
+        with connection.execute_wrapper(count_queries):
+            start = time.perf_counter()
+            status = getattr(client, method)(url, data).status_code
+            times.append((time.perf_counter() - start) * 1000)
+        if status != expected:
+            raise SystemExit(f"{{name}} answered {{status}} instead of {{expected}}")
+    results[name] = {{
+        'queries': len(executed),
+        'median_ms': round(statistics.median(times), 2),
+        'min_ms': round(min(times), 2),
+    }}
+print(json.dumps({{'views': results, 'caches': cache_stats()}}))
+"""
+
+
+def run_scale(sizes, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        code = CHILD.format(project_dir=PROJECT_DIR, db_path=os.path.join(tmp, 'bench.sqlite3'),
+                            sizes=sizes, repeat=repeat)
+        child = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_DIR, text=True, stdout=subprocess.PIPE)
+    if child.returncode:
+        # The child has already reported the error on stderr
+        sys.exit(child.returncode)
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def compare(baseline, results, tolerance, min_ms):
+    """Yields (scale, view, current, previous, regressed) for every measured view"""
+    for scale, views in results['scales'].items():
+        for view, current in views.items():
+            previous = baseline.get('scales', {}).get(scale, {}).get(view) if baseline else None
+            regressed = previous is not None and (
+                current['queries'] > previous['queries']
+                or (current['median_ms'] > previous['median_ms'] * (1 + tolerance)
+                    and current['median_ms'] - previous['median_ms'] >= min_ms)
+            )
+            yield scale, view, current, previous, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default='small,medium', help=f"Comma-separated, from: {', '.join(SCALES)}")
+    parser.add_argument('--repeat', type=int, default=5, help='Timed requests per view')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative slowdown')
+    parser.add_argument('--min-ms', type=float, default=5.0, help='Slowdowns below this are noise')
+    args = parser.parse_args()
+
+    scales = [scale.strip() for scale in args.scales.split(',') if scale.strip()]
+    unknown = set(scales) - set(SCALES)
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(sorted(unknown))}")
+
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.node(),
+        'repeat': args.repeat,
+        'sizes': {scale: SCALES[scale] for scale in scales},
+        'scales': {},
+        'caches': {},
+    }
+    for scale in scales:
+        measured = run_scale(SCALES[scale], args.repeat)
+        results['scales'][scale] = measured['views']
+        results['caches'][scale] = measured['caches']
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = 0
+    print(f"{'scale':<8} {'view':<22} {'queries':>8} {'(base)':>7} {'median ms':>10} {'(base)':>9}")
+    for scale, view, current, previous, regressed in compare(baseline, results, args.tolerance, args.min_ms):
+        regressions += regressed
+        base_queries = previous['queries'] if previous else '-'
+        base_ms = f"{previous['median_ms']:.1f}" if previous else '-'
+        print(f"{scale:<8} {view:<22} {current['queries']:8d} {base_queries:>7} "
+              f"{current['median_ms']:10.1f} {base_ms:>9}{'  REGRESSION' if regressed else ''}")
+
+    print()
+    print(f"{'scale':<8} {'cache':<10} {'hits':>8} {'misses':>8} {'size':>6}")
+    for scale, caches in results['caches'].items():
+        for cache, stats in caches.items():
+            print(f"{scale:<8} {cache:<10} {stats['hits']:8d} {stats['misses']:8d} {stats['size']:6d}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline written to {args.baseline}")
+    elif baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+
+    if regressions and not args.save_baseline:
+        print(f"{regressions} regression(s) against the baseline.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,11 +8,6 @@ user = User.objects.first()
 if user:
     userprofile, created = UserProfile.objects.get_or_create(user=user, defaults={'admin': True})
     
-    # Create a demo team
-    team, created = Team.objects.get_or_create(name='Demo Team')
-    if created:
-        team.members.add(userprofile)
-    
     # Create a demo course
     course, created = Course.objects.get_or_create(
         code='DEMO101',
@@ -23,9 +18,14 @@ if user:
     )
     
     if created:
-        course.teams.add(team)
         course.instructors.add(userprofile)
     
+    # Create a demo team in the course
+    team, created = Team.objects.get_or_create(name='Demo Team', course=course)
+    if created:
+        team.members.add(userprofile)
+    
     print('Demo data created successfully!')
+    print('For larger data sets use: python manage.py generate_load_data')
 else:
-    print('No user found. Please create a user first.') 
\ No newline at end of file
+    print('No user found. Please create a user first.') 
@@ -1,5 +1,14 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from .models import UserProfile, Team, Course, FormTemplate, Question, Form, FormResponse, Answer
+from .reports import stream_report_bundle
+from .roster_import import format_roster_report, import_roster, parse_roster
 from django.contrib.auth.models import User
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
@@ -17,7 +26,67 @@ class UserProfileAdmin(admin.ModelAdmin):
 # Register your models here.
 admin.site.register(UserProfile, UserProfileAdmin)
 admin.site.register(Team)
-admin.site.register(Course)
+
+class RosterUploadForm(forms.Form):
+    roster = forms.FileField(help_text='CSV with the columns email, first, last, team')
+    dry_run = forms.BooleanField(required=False, help_text='Only report what would change')
+
+class CourseAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'semester', 'year', 'course_join_code')
+    search_fields = ('code', 'name')
+    change_form_template = 'admin/pages/course/change_form.html'
+    actions = ['download_feedback_reports']
+
+    @admin.action(description='Download per-student feedback reports (zip)')
+    def download_feedback_reports(self, request, queryset):
+        response = StreamingHttpResponse(
+            stream_report_bundle(list(queryset.order_by('code'))), content_type='application/zip'
+        )
+        response['Content-Disposition'] = 'attachment; filename="feedback-reports.zip"'
+        return response
+
+    def get_urls(self):
+        custom_urls = [
+            path(
+                '<path:object_id>/import-roster/',
+                self.admin_site.admin_view(self.import_roster_view),
+                name='pages_course_import_roster',
+            ),
+        ]
+        return custom_urls + super().get_urls()
+
+    def import_roster_view(self, request, object_id):
+        """Upload page that imports a CSV roster into this course"""
+        course = get_object_or_404(Course, pk=object_id)
+        if not self.has_change_permission(request, course):
+            return redirect('admin:pages_course_changelist')
+
+        form = RosterUploadForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            try:
+                rows, skipped = parse_roster(form.cleaned_data['roster'])
+                report = import_roster(course, rows, dry_run=form.cleaned_data['dry_run'])
+            except (ValidationError, IntegrityError, UnicodeDecodeError) as e:
+                messages.error(request, f"Roster import failed: {e}")
+            else:
+                for line in format_roster_report(report, skipped):
+                    messages.info(request, line)
+                if form.cleaned_data['dry_run']:
+                    messages.warning(request, 'Dry run: no changes were saved')
+                else:
+                    messages.success(request, f'Roster imported into {course.code}')
+                return redirect('admin:pages_course_change', course.pk)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'original': course,
+            'form': form,
+            'title': f'Import roster into {course.code}',
+        }
+        return TemplateResponse(request, 'admin/pages/course/import_roster.html', context)
+
+admin.site.register(Course, CourseAdmin)
 
 # Add UserProfile info to the User admin page
 class UserProfileInline(admin.StackedInline):
@@ -38,6 +107,10 @@ class QuestionInline(admin.TabularInline):
     model = Question
     extra = 1
 
+    def get_queryset(self, request):
+        # Retired questions only exist for the answers of frozen forms
+        return super().get_queryset(request).filter(retired=False)
+
 class FormTemplateAdmin(admin.ModelAdmin):
     list_display = ('title', 'course', 'created_by', 'question_count', 'updated_at')
     search_fields = ('title', 'description')
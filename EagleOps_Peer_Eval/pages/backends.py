@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from allauth.account.auth_backends import AuthenticationBackend
+
+UserModel = get_user_model()
+
+
+class ProfileUserMixin:
+    """
+    Loads the session's user together with its UserProfile in one joined
+    query, so request.user.userprofile in views, templates and context
+    processors needs no query of its own.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('userprofile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+
+class ProfileModelBackend(ProfileUserMixin, ModelBackend):
+    pass
+
+
+class ProfileAuthenticationBackend(ProfileUserMixin, AuthenticationBackend):
+    pass
@@ -1,6 +1,23 @@
 from django.conf import settings
 from .models import Course
 
+def available_courses(user_profile):
+    """All courses the user has access to, as listed in the navbar"""
+    if user_profile.admin:
+        return Course.objects.all().order_by('name')
+
+    # Get courses where user is an instructor
+    instructor_courses = Course.objects.filter(instructors=user_profile)
+
+    # Get courses where user is in a team
+    team_courses = Course.objects.filter(teams__members=user_profile)
+
+    # Get courses where user is directly enrolled
+    enrolled_courses = Course.objects.filter(students=user_profile)
+
+    # Combine the querysets and remove duplicates
+    return (instructor_courses | team_courses | enrolled_courses).distinct().order_by('name')
+
 def course_context(request):
     """
     Context processor that adds the user's courses and selected course to all templates.
@@ -9,22 +26,7 @@ def course_context(request):
         return {}
     
     user_profile = request.user.userprofile
-    
-    # Get all courses the user has access to
-    if user_profile.admin:
-        courses = Course.objects.all().order_by('name')
-    else:
-        # Get courses where user is an instructor
-        instructor_courses = Course.objects.filter(instructors=user_profile)
-        
-        # Get courses where user is in a team
-        team_courses = Course.objects.filter(teams__members=user_profile)
-        
-        # Get courses where user is directly enrolled
-        enrolled_courses = Course.objects.filter(students=user_profile)
-        
-        # Combine the querysets and remove duplicates
-        courses = (instructor_courses | team_courses | enrolled_courses).distinct().order_by('name')
+    courses = available_courses(user_profile)
     
     # Get the selected course from session or default to most recent
     selected_course_id = request.session.get('selected_course_id')
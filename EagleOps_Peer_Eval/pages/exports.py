@@ -0,0 +1,195 @@
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.db.models import Q
+
+from .models import Answer, Team, UserProfile
+
+EXPORT_CHUNK_SIZE = 2000
+LONG_HEADER = ['evaluator', 'evaluatee', 'team', 'question', 'value']
+# Characters XML 1.0 cannot hold even escaped; one in a comment would corrupt the workbook
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+
+class _Echo:
+    """Pseudo-buffer for csv.writer: write() returns the line instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+class ChunkBuffer:
+    """Write-only file object collecting bytes until they are taken with pop()"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _names(form):
+    """{profile id: display name} for everyone who evaluated or was evaluated on the form"""
+    profiles = UserProfile.objects.filter(
+        Q(evaluations_given__form=form) | Q(evaluations_received__form=form)
+    ).distinct().values_list('id', 'first_name', 'last_name', 'user__username')
+    return {
+        profile_id: f"{first} {last}" if first and last else username
+        for profile_id, first, last, username in profiles
+    }
+
+
+def _teams(form):
+    """{profile id: team name} for the teams assigned to the form"""
+    Membership = Team.members.through
+    return dict(
+        Membership.objects.filter(team__assigned_forms=form)
+        .values_list('userprofile_id', 'team__name')
+    )
+
+
+def _answers(form):
+    """Submitted answers of the form, streamed from the database in chunks"""
+    return (
+        Answer.objects.filter(response__form=form, response__submitted=True)
+        .order_by('response__evaluatee_id', 'response__evaluator_id', 'question__order', 'question_id')
+        .values_list('response__evaluator_id', 'response__evaluatee_id', 'question_id',
+                     'likert_answer', 'text_answer')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+
+def long_rows(form):
+    """Yields the header, then one row per submitted answer (evaluator, evaluatee, team, question, value)"""
+    names, teams = _names(form), _teams(form)
+    questions = {question.id: question.text for question in form.get_questions()}
+    yield LONG_HEADER
+    for evaluator_id, evaluatee_id, question_id, likert, text in _answers(form):
+        yield [
+            names.get(evaluator_id, ''),
+            names.get(evaluatee_id, ''),
+            teams.get(evaluatee_id, ''),
+            questions.get(question_id, ''),
+            likert if likert is not None else text or '',
+        ]
+
+
+def wide_rows(form):
+    """
+    Yields the header, then one row per evaluatee: team, name, number of
+    evaluators, the average of each Likert question and the open answers to
+    each open question joined with ' | '. Only one evaluatee is held in memory.
+    """
+    names, teams = _names(form), _teams(form)
+    questions = form.get_question_set()
+    yield (['team', 'evaluatee', 'evaluators']
+           + [question.text for question in questions.likert]
+           + [question.text for question in questions.open])
+
+    def row(evaluatee_id, evaluators, scores, comments):
+        return (
+            [teams.get(evaluatee_id, ''), names.get(evaluatee_id, ''), len(evaluators)]
+            + [round(sum(scores[q.id]) / len(scores[q.id]), 2) if scores.get(q.id) else ''
+               for q in questions.likert]
+            + [' | '.join(comments.get(q.id, ())) for q in questions.open]
+        )
+
+    current = None
+    for evaluator_id, evaluatee_id, question_id, likert, text in _answers(form):
+        if evaluatee_id != current:
+            if current is not None:
+                yield row(current, evaluators, scores, comments)
+            current, evaluators, scores, comments = evaluatee_id, set(), {}, {}
+        evaluators.add(evaluator_id)
+        if likert is not None:
+            scores.setdefault(question_id, []).append(likert)
+        elif text:
+            comments.setdefault(question_id, []).append(text)
+    if current is not None:
+        yield row(current, evaluators, scores, comments)
+
+
+def stream_csv(rows):
+    """Yields CSV lines for rows"""
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _xlsx_cell(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_XML_INVALID.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Results" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def stream_xlsx(rows):
+    """
+    Yields an .xlsx workbook with a single sheet holding rows. The sheet is
+    written straight into a zip stream, so memory does not grow with the
+    number of rows.
+    """
+    buffer = ChunkBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.pop()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                        b'<sheetData>')
+            for row in rows:
+                sheet.write(('<row>' + ''.join(_xlsx_cell(value) for value in row) + '</row>').encode())
+                data = buffer.pop()
+                if data:
+                    yield data
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.pop()
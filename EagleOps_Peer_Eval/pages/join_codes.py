@@ -0,0 +1,176 @@
+import hashlib
+import hmac
+import re
+import string
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+ALPHABET = string.digits + string.ascii_uppercase
+CODE_LENGTH = 8
+# A code is two halves of four characters each; the permutation works on the halves
+HALF_SPACE = len(ALPHABET) ** (CODE_LENGTH // 2)
+CODE_SPACE = HALF_SPACE * HALF_SPACE
+FEISTEL_ROUNDS = 4
+# Codes reserved per database round trip when creating courses one at a time
+DEFAULT_BLOCK_SIZE = 20
+
+# Join code lookups: cached code -> (course id, name) entries and failed-attempt
+# limits. The per-address limit stops guessing from many throwaway accounts; it
+# is set well above the per-user one because a campus NAT or proxy puts many
+# students behind one address.
+JOIN_CODE_CACHE_TIMEOUT = 60 * 60
+JOIN_ATTEMPT_WINDOW = 15 * 60
+MAX_FAILED_JOINS_PER_USER = 10
+MAX_FAILED_JOINS_PER_IP = 100
+JOIN_CODE_PATTERN = re.compile(r'[0-9A-Z]{1,10}')
+
+
+def _permutation_key():
+    key = getattr(settings, 'JOIN_CODE_KEY', None)
+    if not key:
+        # Never derived from SECRET_KEY: the committed development key would
+        # let anyone compute every code
+        raise ImproperlyConfigured("JOIN_CODE_KEY must be set to allocate join codes.")
+    return key.encode()
+
+
+def _round_value(key, round_number, half):
+    digest = hmac.new(key, f"{round_number}:{half}".encode(), hashlib.sha256).digest()
+    return int.from_bytes(digest[:8], 'big') % HALF_SPACE
+
+
+def permute(number, key=None):
+    """
+    Maps a sequence number onto the code space with a keyed Feistel network.
+    The mapping is a bijection, so distinct numbers always give distinct codes,
+    while consecutive numbers give codes that look unrelated.
+    """
+    if not 0 <= number < CODE_SPACE:
+        raise ValueError("Join code sequence is exhausted.")
+    key = key or _permutation_key()
+    left, right = divmod(number, HALF_SPACE)
+    for round_number in range(FEISTEL_ROUNDS):
+        left, right = right, (left + _round_value(key, round_number, right)) % HALF_SPACE
+    return left * HALF_SPACE + right
+
+
+def encode(value):
+    """Formats a value from the code space as a fixed-length code"""
+    chars = []
+    for _ in range(CODE_LENGTH):
+        value, digit = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def code_for(number, key=None):
+    """Returns the join code for a sequence number"""
+    return encode(permute(number, key))
+
+
+class JoinCodePool:
+    """
+    Codes reserved by this process but not handed out yet. Spare codes from a
+    reservation only join the pool once the reserving transaction commits, so
+    a rolled-back reservation can never hand out a code twice.
+    """
+
+    def __init__(self, block_size=DEFAULT_BLOCK_SIZE):
+        self.block_size = block_size
+        self._codes = deque()
+        self._lock = threading.Lock()
+
+    def take(self, count, reserve):
+        """Returns count codes, calling reserve(n) for n fresh codes when the pool runs out"""
+        with self._lock:
+            codes = [self._codes.popleft() for _ in range(min(count, len(self._codes)))]
+
+        missing = count - len(codes)
+        if missing:
+            fresh = reserve(max(missing, self.block_size))
+            codes.extend(fresh[:missing])
+            spare = fresh[missing:]
+            if spare:
+                transaction.on_commit(lambda: self._put(spare))
+        return codes
+
+    def _put(self, codes):
+        with self._lock:
+            self._codes.extend(codes)
+
+    def clear(self):
+        with self._lock:
+            self._codes.clear()
+
+
+join_code_pool = JoinCodePool()
+
+
+class JoinAttemptsExceeded(Exception):
+    """Raised when a user or address has made too many failed join attempts"""
+
+
+def _join_code_key(code):
+    return f'join-course:{code}'
+
+
+def _attempt_keys(request):
+    """(cache key, limit) of each failed-attempt counter that applies to request"""
+    keys = [(f'join-attempts:user:{request.user.pk}',
+             getattr(settings, 'MAX_FAILED_JOINS_PER_USER', MAX_FAILED_JOINS_PER_USER))]
+    address = request.META.get('REMOTE_ADDR')
+    if address:
+        keys.append((f'join-attempts:ip:{address}',
+                     getattr(settings, 'MAX_FAILED_JOINS_PER_IP', MAX_FAILED_JOINS_PER_IP)))
+    return keys
+
+
+def _record_failed_join(keys):
+    for key, _ in keys:
+        cache.add(key, 0, JOIN_ATTEMPT_WINDOW)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Expired between add() and incr()
+            cache.set(key, 1, JOIN_ATTEMPT_WINDOW)
+
+
+def cache_join_code(code, course_id, course_name):
+    cache.set(_join_code_key(code), (course_id, course_name), JOIN_CODE_CACHE_TIMEOUT)
+
+
+def forget_join_code(code):
+    cache.delete(_join_code_key(code))
+
+
+def resolve_join_code(request, code):
+    """
+    Returns (id, name) of the course with this join code, or None for an
+    unknown code. Known codes are served from the cache, which the Course
+    signals keep current, so a cached code needs no course query at all.
+    Failed attempts are counted per user and per address in the cache, and
+    once either limit is reached JoinAttemptsExceeded is raised before the
+    database is consulted.
+    """
+    keys = _attempt_keys(request)
+    failures = cache.get_many([key for key, _ in keys])
+    if any(failures.get(key, 0) >= limit for key, limit in keys):
+        raise JoinAttemptsExceeded()
+
+    course = None
+    if JOIN_CODE_PATTERN.fullmatch(code):
+        course = cache.get(_join_code_key(code))
+        if course is None:
+            from .models import Course
+            course = Course.objects.filter(course_join_code=code).values_list('id', 'name').first()
+            if course is not None:
+                cache_join_code(code, *course)
+
+    if course is None:
+        _record_failed_join(keys)
+    return course
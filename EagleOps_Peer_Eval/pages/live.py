@@ -0,0 +1,129 @@
+import asyncio
+import json
+import threading
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, OuterRef
+
+from .models import FormResponse, Team
+from .utils import _count_subquery
+
+# Seconds between keepalive comments on an idle completion stream
+SSE_KEEPALIVE = 15
+# Milliseconds the browser waits before reconnecting a dropped stream
+SSE_RETRY = 5000
+# Milliseconds between completion polls when the app is served over WSGI
+COMPLETION_POLL_INTERVAL = 15000
+
+
+def serves_streams(request):
+    """
+    Whether request came through the ASGI server, which can hold an endless
+    stream open on its event loop. Under WSGI the handler consumes the stream
+    to the end, tying up a worker forever, so pages poll instead.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+class CompletionBroker:
+    """
+    In-process publish/subscribe of form completion snapshots. Subscribers are
+    asyncio queues living on an event loop (the SSE view under ASGI); publishers
+    are the sync request threads that record submissions. Each queue holds only
+    the latest snapshot, since an older one is of no use once a newer arrived.
+
+    Only subscribers in the same process see a publication, so live updates
+    need the ASGI server, where sync views and async streams share a process.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, form_id):
+        """Registers a queue for form_id on the running loop and returns it"""
+        queue = asyncio.Queue(maxsize=1)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(form_id, set()).add((loop, queue))
+        return queue
+
+    def unsubscribe(self, form_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(form_id, set())
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(form_id, None)
+
+    def has_subscribers(self, form_id):
+        with self._lock:
+            return bool(self._subscribers.get(form_id))
+
+    def publish(self, form_id, snapshot):
+        """Hands snapshot to every subscriber of form_id; safe to call from any thread"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(form_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, snapshot)
+            except RuntimeError:
+                # The subscriber's loop is closed
+                self.unsubscribe(form_id, queue)
+
+    @staticmethod
+    def _offer(queue, snapshot):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(snapshot)
+
+
+completion_broker = CompletionBroker()
+
+
+def team_completion(form):
+    """
+    Submitted and expected evaluations per team assigned to the form, read in
+    one query. A team of n members expects n * (n - 1) evaluations, or n * n
+    when the form includes self assessment.
+    """
+    submitted = FormResponse.objects.filter(
+        form=form, submitted=True, evaluator__teams=OuterRef('pk')
+    )
+    teams = (
+        Team.objects.filter(assigned_forms=form)
+        .annotate(
+            member_count=Count('members', distinct=True),
+            submitted_count=_count_subquery(submitted, 'evaluator__teams', Count('id')),
+        )
+        .order_by('name', 'id')
+        .values('id', 'name', 'member_count', 'submitted_count')
+    )
+
+    rows = []
+    for team in teams:
+        n = team['member_count']
+        rows.append({
+            'id': team['id'],
+            'name': team['name'],
+            'submitted': team['submitted_count'],
+            'expected': n * n if form.self_assessment else n * (n - 1),
+        })
+    return {
+        'form': form.id,
+        'submitted': sum(row['submitted'] for row in rows),
+        'expected': sum(row['expected'] for row in rows),
+        'teams': rows,
+    }
+
+
+def publish_completion(form):
+    """Publishes the form's completion snapshot if anyone in this process is listening"""
+    if completion_broker.has_subscribers(form.id):
+        completion_broker.publish(form.id, team_completion(form))
+
+
+def sse_event(data, event=None):
+    """Formats data as one Server-Sent Events message"""
+    lines = [f'event: {event}'] if event else []
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
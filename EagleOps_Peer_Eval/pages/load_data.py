@@ -0,0 +1,194 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Answer, Course, Form, FormResponse, FormTemplate, Question, Team, UserProfile
+
+DEFAULT_BATCH_SIZE = 5000
+# Share of the responses submitted on a course's active form
+ACTIVE_COMPLETION = 0.7
+
+FIRST_NAMES = ['Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Okafor', 'Novak', 'Patel', 'Kim', 'Silva', 'Murphy', 'Haddad']
+LIKERT_TEXTS = ['Contributed a fair share of the work', 'Communicated clearly with the team',
+                'Met deadlines', 'Produced work of high quality', 'Helped teammates when asked',
+                'Came to meetings prepared', 'Took on responsibility']
+OPEN_TEXTS = ['What did this teammate do well?', 'What could this teammate improve?',
+              'Any other comments?']
+COMMENTS = ['Always reliable and on time.', 'Could communicate more during the sprint.',
+            'Great at debugging tricky issues.', 'Kept the team organised.',
+            'Should ask for help earlier.', 'Wrote most of the documentation.']
+
+
+def _form_status(index, forms_per_course):
+    """Oldest forms are published, the newest is active and the one before it closed"""
+    if index == forms_per_course - 1:
+        return Form.ACTIVE
+    if index == forms_per_course - 2:
+        return Form.CLOSED
+    return Form.PUBLISHED
+
+
+def _create_users(usernames, rng, batch_size):
+    password = make_password(None)
+    users = User.objects.bulk_create(
+        [User(username=name, email=f'{name}@example.com', password=password) for name in usernames],
+        batch_size=batch_size,
+    )
+    return UserProfile.objects.bulk_create(
+        [UserProfile(user=user, first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES))
+         for user in users],
+        batch_size=batch_size,
+    )
+
+
+def _insert_answers(rows, created_at):
+    """
+    Inserts (response id, question id, likert, text) rows with one executemany.
+    Answers are nearly all of the generated rows, and bulk_create spends most
+    of its time preparing each field of each instance, so they skip the model
+    layer and share one prepared timestamp.
+    """
+    if not rows:
+        return 0
+    meta = Answer._meta
+    quote = connection.ops.quote_name
+    columns = [meta.get_field(name).column for name in
+               ('response', 'question', 'likert_answer', 'text_answer', 'created_at', 'updated_at')]
+    timestamp = connection.ops.adapt_datetimefield_value(created_at)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {quote(meta.db_table)} ({', '.join(map(quote, columns))}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})",
+            [row + (timestamp, timestamp) for row in rows],
+        )
+    return len(rows)
+
+
+def generate_load_data(courses=5, students=100, team_size=5, forms=4, likert_questions=5,
+                       open_questions=1, seed=0, prefix='load', batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Creates courses with enrolled students split into teams, one template per
+    course and forms whose responses and answers are filled in, using only
+    bulk inserts inside one transaction. The same arguments always produce the
+    same rows (apart from timestamps and ids). Every course gets its own
+    instructor and students, and usernames and course codes start with prefix.
+
+    Answers created: courses * forms * students * (team_size - 1) *
+    (likert_questions + open_questions), less the unsubmitted share of each
+    course's active form. Returns the number of rows created per model.
+    """
+    if Course.objects.filter(code__startswith=f'{prefix.upper()}-').exists():
+        raise ValueError(f"Load data with prefix '{prefix}' already exists.")
+
+    rng = random.Random(seed)
+    now = timezone.now()
+    Membership = Team.members.through
+    Enrollment = Course.students.through
+    Teaching = Course.instructors.through
+    Assignment = Form.teams.through
+    counts = dict.fromkeys(['courses', 'students', 'teams', 'forms', 'responses', 'answers'], 0)
+
+    with transaction.atomic():
+        admin = _create_users([f'{prefix}-admin'], rng, batch_size)[0]
+        UserProfile.objects.filter(id=admin.id).update(admin=True)
+        instructors = _create_users([f'{prefix}-instructor-{c}' for c in range(courses)], rng, batch_size)
+        course_rows = Course.objects.bulk_create([
+            Course(name=f'Load Course {c}', code=f'{prefix.upper()}-{c:04d}', year=now.year)
+            for c in range(courses)
+        ])
+        Teaching.objects.bulk_create([
+            Teaching(course_id=course.id, userprofile_id=instructor.id)
+            for course, instructor in zip(course_rows, instructors)
+        ])
+        counts['courses'] = len(course_rows)
+
+        for c, course in enumerate(course_rows):
+            roster = _create_users([f'{prefix}-student-{c}-{s}' for s in range(students)], rng, batch_size)
+            Enrollment.objects.bulk_create(
+                [Enrollment(course_id=course.id, userprofile_id=profile.id) for profile in roster],
+                batch_size=batch_size,
+            )
+            counts['students'] += len(roster)
+
+            groups = [roster[start:start + team_size] for start in range(0, len(roster), team_size)]
+            teams = Team.objects.bulk_create(
+                [Team(name=f'Team {t + 1}', course=course) for t in range(len(groups))]
+            )
+            Membership.objects.bulk_create(
+                [Membership(team_id=team.id, userprofile_id=member.id)
+                 for team, group in zip(teams, groups) for member in group],
+                batch_size=batch_size,
+            )
+            counts['teams'] += len(teams)
+
+            template = FormTemplate.objects.create(
+                title='Peer Evaluation', course=course, created_by=instructors[c]
+            )
+            questions = Question.objects.bulk_create(
+                [Question(template=template, text=LIKERT_TEXTS[q % len(LIKERT_TEXTS)],
+                          question_type=Question.LIKERT_SCALE, order=q + 1)
+                 for q in range(likert_questions)]
+                + [Question(template=template, text=OPEN_TEXTS[q % len(OPEN_TEXTS)],
+                            question_type=Question.OPEN_ENDED, order=likert_questions + q + 1)
+                   for q in range(open_questions)]
+            )
+            question_kinds = [(q.id, q.question_type == Question.LIKERT_SCALE) for q in questions]
+            snapshot = Form.build_question_snapshot(template.id, questions)
+
+            form_rows = []
+            for f in range(forms):
+                status = _form_status(f, forms)
+                if status == Form.ACTIVE:
+                    publication_date, closing_date = now - timedelta(days=2), now + timedelta(days=5)
+                else:
+                    publication_date = now - timedelta(days=14 * (forms - f))
+                    closing_date = publication_date + timedelta(days=7)
+                form_rows.append(Form(
+                    title=f'Week {2 * f + 1} Evaluation', template=template, course=course,
+                    created_by=instructors[c], status=status, publication_date=publication_date,
+                    closing_date=closing_date, question_snapshot=snapshot, questions_frozen_at=publication_date,
+                ))
+            form_rows = Form.objects.bulk_create(form_rows)
+            Assignment.objects.bulk_create(
+                [Assignment(form_id=form.id, team_id=team.id) for form in form_rows for team in teams],
+                batch_size=batch_size,
+            )
+            counts['forms'] += len(form_rows)
+
+            for form in form_rows:
+                completion = ACTIVE_COMPLETION if form.status == Form.ACTIVE else 1
+                responses = []
+                for group in groups:
+                    for evaluator in group:
+                        for evaluatee in group:
+                            if evaluator is evaluatee:
+                                continue
+                            submitted = completion == 1 or rng.random() < completion
+                            responses.append(FormResponse(
+                                form_id=form.id, evaluator_id=evaluator.id, evaluatee_id=evaluatee.id,
+                                submitted=submitted,
+                                submission_date=form.publication_date + timedelta(days=1) if submitted else None,
+                            ))
+                responses = FormResponse.objects.bulk_create(responses, batch_size=batch_size)
+                counts['responses'] += len(responses)
+
+                answers = []
+                for response in responses:
+                    if not response.submitted:
+                        continue
+                    for question_id, is_likert in question_kinds:
+                        if is_likert:
+                            answers.append((response.id, question_id, rng.randint(1, 5), None))
+                        else:
+                            answers.append((response.id, question_id, None, rng.choice(COMMENTS)))
+                    if len(answers) >= batch_size:
+                        counts['answers'] += _insert_answers(answers, now)
+                        answers = []
+                counts['answers'] += _insert_answers(answers, now)
+
+    return counts
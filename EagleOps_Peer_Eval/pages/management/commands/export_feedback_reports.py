@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from pages.models import Course
+from pages.reports import DEFAULT_REPORT_CHUNK_SIZE, write_report_bundle
+
+
+class Command(BaseCommand):
+    help = 'Writes a zip of per-student HTML feedback reports for one or more courses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the zip file to write')
+        parser.add_argument('course_codes', nargs='+', help='Codes of the courses to report on')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes (default: one per CPU; 1 renders in this process)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_REPORT_CHUNK_SIZE,
+                            help='Students rendered per worker task')
+
+    def handle(self, *args, **options):
+        courses = list(Course.objects.filter(code__in=options['course_codes']).order_by('code'))
+        missing = set(options['course_codes']) - {course.code for course in courses}
+        if missing:
+            raise CommandError(f"Unknown course code(s): {', '.join(sorted(missing))}")
+
+        count = 0
+        with open(options['output'], 'wb') as output:
+            for count in write_report_bundle(courses, output, workers=options['workers'],
+                                             chunk_size=options['chunk_size']):
+                pass
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} report(s) to {options['output']}"))
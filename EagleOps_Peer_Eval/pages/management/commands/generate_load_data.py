@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pages.load_data import DEFAULT_BATCH_SIZE, generate_load_data
+
+
+class Command(BaseCommand):
+    help = 'Creates a deterministic synthetic data set (courses, teams, forms, responses, answers) for profiling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courses', type=int, default=5)
+        parser.add_argument('--students', type=int, default=100, help='Students per course')
+        parser.add_argument('--team-size', type=int, default=5)
+        parser.add_argument('--forms', type=int, default=4, help='Forms per course')
+        parser.add_argument('--likert-questions', type=int, default=5)
+        parser.add_argument('--open-questions', type=int, default=1)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='load',
+                            help='Prefix of the generated usernames and course codes')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options['team_size'] < 2:
+            raise CommandError("--team-size must be at least 2.")
+
+        start = time.perf_counter()
+        try:
+            counts = generate_load_data(
+                courses=options['courses'], students=options['students'], team_size=options['team_size'],
+                forms=options['forms'], likert_questions=options['likert_questions'],
+                open_questions=options['open_questions'], seed=options['seed'],
+                prefix=options['prefix'], batch_size=options['batch_size'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        summary = ', '.join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary} in {elapsed:.1f}s"))
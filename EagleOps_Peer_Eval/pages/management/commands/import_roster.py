@@ -0,0 +1,37 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from pages.models import Course
+from pages.roster_import import DEFAULT_CHUNK_SIZE, format_roster_report, import_roster, parse_roster
+
+
+class Command(BaseCommand):
+    help = 'Imports a CSV roster (email, first, last, team) into a course'
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_code', help='Code of the course to import into')
+        parser.add_argument('csv_path', help='Path to the roster CSV file')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Rows written per bulk insert')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change without saving anything')
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(code=options['course_code'])
+        except Course.DoesNotExist:
+            raise CommandError(f"Course '{options['course_code']}' does not exist")
+
+        try:
+            rows, skipped = parse_roster(options['csv_path'])
+        except (OSError, ValidationError) as e:
+            raise CommandError(f"Could not read roster: {e}")
+
+        report = import_roster(course, rows, chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+
+        for line in format_roster_report(report, skipped):
+            self.stdout.write(line)
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: no changes were saved'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Roster imported into {course.code}'))
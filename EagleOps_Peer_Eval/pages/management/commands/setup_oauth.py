@@ -1,14 +1,14 @@
-from django.core.management.base import BaseCommand
+from django.conf import settings
 from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand
 from allauth.socialaccount.models import SocialApp
-from django.conf import settings
 
 
 class Command(BaseCommand):
-    help = 'Sets up social applications for OAuth'
+    help = 'Sets up the Google social application for OAuth (safe to run repeatedly)'
 
     def handle(self, *args, **options):
-        # Get or create site
+        # Run once per deployment after migrate
         site, _ = Site.objects.get_or_create(
             id=settings.SITE_ID,
             defaults={
@@ -16,18 +16,20 @@ class Command(BaseCommand):
                 'name': 'EagleOps'
             }
         )
-        
-        # Create Google social app if it doesn't exist
-        if not SocialApp.objects.filter(provider='google').exists():
-            self.stdout.write('Creating Google social app...')
-            social_app = SocialApp.objects.create(
-                provider='google',
-                name='Google OAuth',
-                client_id=settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY,
-                secret=settings.SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET,
-                key=''  # Not needed for Google
-            )
+
+        social_app, created = SocialApp.objects.get_or_create(
+            provider='google',
+            defaults={
+                'name': 'Google OAuth',
+                'client_id': settings.SOCIAL_AUTH_GOOGLE_OAUTH2_KEY,
+                'secret': settings.SOCIAL_AUTH_GOOGLE_OAUTH2_SECRET,
+                'key': ''  # Not needed for Google
+            }
+        )
+        if not social_app.sites.filter(id=site.id).exists():
             social_app.sites.add(site)
+
+        if created:
             self.stdout.write(self.style.SUCCESS('Successfully created Google social app'))
         else:
-            self.stdout.write('Google social app already exists') 
\ No newline at end of file
+            self.stdout.write('Google social app already exists')
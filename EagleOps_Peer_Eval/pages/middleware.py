@@ -1,21 +1,35 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.shortcuts import redirect
 from django.conf import settings
 
 class NoSignupMiddleware:
     """
-    Middleware to prevent redirects to the signup page and 
+    Middleware to prevent redirects to the signup page and
     instead redirect directly to the home page.
+
+    Works in both sync and async chains, so under ASGI async views are not
+    forced back onto the single thread that runs sync code.
     """
-    
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
-        
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
     def __call__(self, request):
-        response = self.get_response(request)
-        
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self._skip_signup(self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._skip_signup(await self.get_response(request))
+
+    def _skip_signup(self, response):
         # Check if response is a redirect to the signup page
         if hasattr(response, 'url') and '/accounts/3rdparty/signup/' in response.url:
             # Redirect to home instead
             return redirect(settings.LOGIN_REDIRECT_URL)
-            
-        return response 
\ No newline at end of file
+
+        return response
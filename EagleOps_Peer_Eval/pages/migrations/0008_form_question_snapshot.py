@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0007_course_semester_course_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='form',
+            name='question_snapshot',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='form',
+            name='questions_frozen_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:15
+
+import pages.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0009_join_code_sequence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='avatar',
+            field=models.ImageField(blank=True, null=True, storage=pages.storage.get_avatar_storage, upload_to='avatars/'),
+        ),
+    ]
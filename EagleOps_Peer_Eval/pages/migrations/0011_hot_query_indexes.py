@@ -0,0 +1,33 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0010_avatar_storage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='form',
+            index=models.Index(fields=['course', 'status', 'closing_date'], name='form_course_status_close_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='form',
+            index=models.Index(fields=['status', 'publication_date'], name='form_status_publish_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formresponse',
+            index=models.Index(fields=['form', 'evaluatee', 'submitted'], name='response_form_evaluatee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='formresponse',
+            index=models.Index(fields=['form', 'evaluator'], name='response_form_evaluator_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['template', 'question_type', 'order'], name='question_template_type_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0011_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='retired',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.5 on 2026-10-19 10:06
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0012_question_retired'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='formresponse',
+            name='response_form_evaluator_idx',
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:05
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def freeze_open_forms(apps, schema_editor):
+    """
+    Snapshot the questions of forms that were already open or finished before
+    snapshots existed, so template edits stop changing them. Written in the
+    version 1 snapshot format of Form.build_question_snapshot().
+    """
+    Form = apps.get_model('pages', 'Form')
+    Question = apps.get_model('pages', 'Question')
+    now = timezone.now()
+
+    forms = Form.objects.filter(
+        status__in=['active', 'closed', 'published'], question_snapshot__isnull=True
+    )
+    questions = {}
+    for form in forms.iterator():
+        if form.template_id not in questions:
+            questions[form.template_id] = [
+                [question.id, question.text, question.question_type, question.order]
+                for question in Question.objects.filter(template_id=form.template_id, retired=False).order_by('order')
+            ]
+        Form.objects.filter(pk=form.pk).update(
+            question_snapshot={'version': 1, 'template': form.template_id, 'questions': questions[form.template_id]},
+            questions_frozen_at=now,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0014_team_userprofile_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(freeze_open_forms, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,20 @@
+import re
+from collections import namedtuple
+
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 
 from django.utils import timezone
 from datetime import timedelta
 
+from .join_codes import code_for, join_code_pool
+from .question_cache import question_sets, snapshot_sets, split_questions
+from .storage import get_avatar_storage
+
+# Lightweight stand-in for a Question, read from a form's frozen question set
+SnapshotQuestion = namedtuple('SnapshotQuestion', ['id', 'text', 'question_type', 'order'])
+
 class UserProfile(models.Model):
     """
     Extended user profile that links to Django's built-in User model.
@@ -13,9 +23,10 @@ class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)  # link default user model to custom UserProfile model
     first_name = models.CharField(max_length=100, blank=True, null=True)  # Store first name
     last_name = models.CharField(max_length=100, blank=True, null=True)  # Store last name
-    avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)  # Store user avatar
+    avatar = models.ImageField(upload_to='avatars/', storage=get_avatar_storage, blank=True, null=True)  # Store user avatar (resized, content-addressed)
     bio = models.TextField(blank=True, null=True)  # New field for user bio
     admin = models.BooleanField(default=False)  # Admin field to denote if user is admin or not
+    updated_at = models.DateTimeField(auto_now=True)  # Results pages key their ETags on name changes
 
     def __str__(self):
         return self.user.username
@@ -37,6 +48,7 @@ class Team(models.Model):
     course = models.ForeignKey('Course', on_delete=models.CASCADE, related_name='teams')
     members = models.ManyToManyField(UserProfile, related_name='teams')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} - {self.course.code}"
@@ -44,6 +56,33 @@ class Team(models.Model):
     class Meta:
         unique_together = ['name', 'course']  # Prevent duplicate team names within the same course
 
+class JoinCodeSequence(models.Model):
+    """
+    Single-row counter that course join codes are drawn from. Numbers are
+    reserved in blocks and turned into codes by a keyed permutation, so codes
+    are unique without checking the course table one code at a time.
+    """
+    next_value = models.BigIntegerField(default=0)
+
+    @classmethod
+    def reserve(cls, count):
+        """Advances the counter by count and returns the reserved numbers as a range"""
+        with transaction.atomic():
+            if not cls.objects.filter(pk=1).update(next_value=models.F('next_value') + count):
+                cls.objects.get_or_create(pk=1)
+                cls.objects.filter(pk=1).update(next_value=models.F('next_value') + count)
+            end = cls.objects.values_list('next_value', flat=True).get(pk=1)
+        return range(end - count, end)
+
+class CourseManager(models.Manager):
+    def bulk_create(self, objs, *args, **kwargs):
+        # save() is skipped by bulk inserts, so hand out the join codes here
+        objs = list(objs)
+        missing = [course for course in objs if not course.course_join_code]
+        for course, code in zip(missing, Course.allocate_join_codes(len(missing))):
+            course.course_join_code = code
+        return super().bulk_create(objs, *args, **kwargs)
+
 class Course(models.Model):
     """
     Represents an academic course with teams, instructors and associated forms.
@@ -64,6 +103,8 @@ class Course(models.Model):
     students = models.ManyToManyField(UserProfile, related_name='enrolled_courses', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CourseManager()
+
     def __str__(self):
         return f"{self.code}: {self.name} ({self.semester} {self.year})"
         
@@ -73,19 +114,113 @@ class Course(models.Model):
             self.course_join_code = self.generate_unique_join_code()
         super().save(*args, **kwargs)
     
+    def next_term(self):
+        """Returns the (semester, year) that follows this course's term"""
+        if self.semester == 'Fall':
+            return 'Spring', self.year + 1
+        return 'Fall', self.year
+
+    def next_term_code(self, semester, year):
+        """
+        Returns an unused course code for the given term, e.g. 'CS101-F25'.
+        Any term suffix already on this course's code is replaced. Numbered
+        variants shorten the base to fit the field, so each candidate is
+        checked on its own rather than by a shared prefix.
+        """
+        base = re.sub(r'-[FS]\d{2}(-\d+)?$', '', self.code)
+        suffix = f"-{semester[0]}{year % 100:02d}"
+        code = f"{base[:20 - len(suffix)]}{suffix}"
+        counter = 2
+        while Course.objects.filter(code=code).exists():
+            numbered = f"{suffix}-{counter}"
+            code = f"{base[:20 - len(numbered)]}{numbered}"
+            counter += 1
+        return code
+
+    def clone(self, include_forms=False, date_offset=timedelta(0)):
+        """
+        Creates this course for the next semester with copies of its instructors,
+        templates and questions, and optionally its forms with their dates shifted
+        by date_offset. Students and teams are not copied. Rows are copied with
+        bulk_create, so the cost does not depend on the number of questions.
+        """
+        semester, year = self.next_term()
+
+        with transaction.atomic():
+            new_course = Course.objects.create(
+                name=self.name,
+                code=self.next_term_code(semester, year),
+                description=self.description,
+                semester=semester,
+                year=year
+            )
+            new_course.instructors.set(self.instructors.all())
+
+            templates = list(self.form_templates.order_by('id'))
+            new_templates = FormTemplate.objects.bulk_create([
+                FormTemplate(
+                    title=template.title,
+                    description=template.description,
+                    created_by_id=template.created_by_id,
+                    course=new_course
+                )
+                for template in templates
+            ])
+            template_map = {old.id: new for old, new in zip(templates, new_templates)}
+
+            Question.objects.bulk_create([
+                Question(
+                    template=template_map[question.template_id],
+                    text=question.text,
+                    question_type=question.question_type,
+                    order=question.order
+                )
+                for question in Question.objects.filter(template__course=self, retired=False)
+            ])
+
+            if include_forms:
+                # Copies start as drafts: they have no teams until the new teams exist
+                Form.objects.bulk_create([
+                    Form(
+                        title=form.title,
+                        template=template_map[form.template_id],
+                        course=new_course,
+                        created_by_id=form.created_by_id,
+                        self_assessment=form.self_assessment,
+                        publication_date=form.publication_date + date_offset,
+                        closing_date=form.closing_date + date_offset,
+                        status=Form.DRAFT
+                    )
+                    for form in self.forms.all()
+                ])
+
+        return new_course
+
     @staticmethod
     def generate_unique_join_code():
         """Generate a unique 8-character alphanumeric code"""
-        import random
-        import string
-        
-        while True:
-            # Generate a random 8-character code
-            code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            
-            # Check if this code already exists
-            if not Course.objects.filter(course_join_code=code).exists():
-                return code
+        return Course.allocate_join_codes(1)[0]
+
+    @staticmethod
+    def allocate_join_codes(count):
+        """
+        Returns count unused join codes. Codes come from this process's pool of
+        reserved codes; refilling it costs one reservation plus one query that
+        skips codes already taken (e.g. older random or hand-entered codes).
+        """
+        if count <= 0:
+            return []
+        return join_code_pool.take(count, _reserve_join_codes)
+
+def _reserve_join_codes(count):
+    codes = []
+    while len(codes) < count:
+        candidates = [code_for(number) for number in JoinCodeSequence.reserve(count - len(codes))]
+        taken = set(
+            Course.objects.filter(course_join_code__in=candidates).values_list('course_join_code', flat=True)
+        )
+        codes.extend(code for code in candidates if code not in taken)
+    return codes
 
 class FormTemplate(models.Model):
     """
@@ -105,31 +240,149 @@ class FormTemplate(models.Model):
     @property
     def question_count(self):
         """Returns the total number of questions in this template"""
-        return self.questions.count()
+        # Use the count annotated by the listing query when available
+        num_questions = getattr(self, 'num_questions', None)
+        if num_questions is not None:
+            return num_questions
+        return self.current_questions().count()
+
+    def current_questions(self):
+        """
+        The questions this template asks now. Questions replaced or removed
+        after a form froze them are kept, retired, for that form's answers.
+        """
+        return self.questions.filter(retired=False)
     
+    def get_question_set(self):
+        """
+        Returns this template's questions as a QuestionSet (all, likert, open),
+        served from the process-local cache while updated_at is unchanged.
+        """
+        return question_sets.get(self.id, self.updated_at, lambda: split_questions(
+            SnapshotQuestion(question.id, question.text, question.question_type, question.order)
+            for question in self.current_questions()
+        ))
+
+    def mark_questions_changed(self):
+        """
+        Bump updated_at after question changes that bypass FormTemplate.save(),
+        so cached question sets in every process stop matching.
+        """
+        self.updated_at = timezone.now()
+        FormTemplate.objects.filter(pk=self.pk).update(updated_at=self.updated_at)
+        question_sets.invalidate(self.pk)
+
     def duplicate(self):
         """
         Creates a copy of this template with '(Copy)' appended to the title.
         Also duplicates all associated questions.
         """
-        new_template = FormTemplate.objects.create(
-            title=f"{self.title} (Copy)",
-            description=self.description,
-            created_by=self.created_by,
-            course=self.course
-        )
-        
-        # Duplicate all questions
-        for question in self.questions.all():
-            Question.objects.create(
-                template=new_template,
-                text=question.text,
-                question_type=question.question_type,
-                order=question.order
+        with transaction.atomic():
+            new_template = FormTemplate.objects.create(
+                title=f"{self.title} (Copy)",
+                description=self.description,
+                created_by=self.created_by,
+                course=self.course
             )
             
+            # Duplicate all questions in one insert
+            Question.objects.bulk_create([
+                Question(
+                    template=new_template,
+                    text=question.text,
+                    question_type=question.question_type,
+                    order=question.order
+                )
+                for question in self.current_questions()
+            ])
+            
         return new_template
 
+    def save_questions(self, submitted):
+        """
+        Make this template's questions match the submitted list, in its order.
+        Each entry is a dict with 'id', 'text' and 'type'; ids that are missing or
+        start with 'temp_' are new questions. The difference with the stored
+        questions is applied atomically with one delete, one bulk_update and
+        one bulk_create.
+        Questions in a frozen form's snapshot or with answers are never deleted
+        or rewritten, as those answers point at them: removing one retires it, and
+        changing its text or type retires it and creates a replacement.
+        Returns {submitted id: new question id} for the created questions.
+        """
+        valid_types = {choice for choice, _ in Question.QUESTION_TYPES}
+        existing = {question.id: question for question in self.current_questions()}
+        frozen_ids = self.frozen_question_ids()
+        kept_ids = set()
+        retired_ids = set()
+        to_update = []
+        to_create = []
+
+        for order, data in enumerate(submitted):
+            client_id = str(data.get('id') or '')
+            text = data.get('text', '')
+            question_type = data.get('type', Question.LIKERT_SCALE)
+            if question_type not in valid_types:
+                raise ValidationError(f"Unknown question type '{question_type}'.")
+
+            question = existing.get(int(client_id)) if client_id.isdigit() else None
+            if question is None or question.id in kept_ids:
+                to_create.append((client_id, Question(
+                    template=self,
+                    text=text,
+                    question_type=question_type,
+                    order=order
+                )))
+                continue
+
+            kept_ids.add(question.id)
+            if question.id in frozen_ids and (question.text, question.question_type) != (text, question_type):
+                retired_ids.add(question.id)
+                to_create.append((client_id, Question(
+                    template=self,
+                    text=text,
+                    question_type=question_type,
+                    order=order
+                )))
+            elif (question.text, question.question_type, question.order) != (text, question_type, order):
+                question.text = text
+                question.question_type = question_type
+                question.order = order
+                to_update.append(question)
+
+        removed_ids = set(existing) - kept_ids
+        retired_ids |= removed_ids & frozen_ids
+        deleted_ids = removed_ids - frozen_ids
+        with transaction.atomic():
+            if deleted_ids:
+                Question.objects.filter(template=self, id__in=deleted_ids).delete()
+            if retired_ids:
+                Question.objects.filter(template=self, id__in=retired_ids).update(retired=True)
+            if to_update:
+                Question.objects.bulk_update(to_update, ['text', 'question_type', 'order'])
+            if to_create:
+                Question.objects.bulk_create([question for _, question in to_create])
+            if deleted_ids or retired_ids or to_update or to_create:
+                self.mark_questions_changed()
+
+        return {client_id: question.id for client_id, question in to_create if client_id}
+
+    def frozen_question_ids(self):
+        """
+        Ids of this template's questions held in the snapshot of any of its
+        forms, or answered in any response
+        """
+        frozen_ids = {
+            row[0]
+            for snapshot in self.forms.filter(question_snapshot__isnull=False)
+            .values_list('question_snapshot', flat=True)
+            for row in snapshot['questions']
+        }
+        frozen_ids.update(
+            Answer.objects.filter(question__template=self).values_list('question_id', flat=True).distinct()
+        )
+        return frozen_ids
+
 class Question(models.Model):
     """
     Represents a question within a form template.
@@ -147,9 +400,13 @@ class Question(models.Model):
     text = models.TextField()
     question_type = models.CharField(max_length=10, choices=QUESTION_TYPES, default=LIKERT_SCALE)
     order = models.IntegerField(default=0)  # For controlling the display order
+    retired = models.BooleanField(default=False, editable=False)  # Left the template; kept for frozen forms
     
     class Meta:
         ordering = ['order']  # Questions are always ordered by their order field
+        indexes = [
+            models.Index(fields=['template', 'question_type', 'order'], name='question_template_type_idx'),
+        ]
     
     def __str__(self):
         return f"{self.text[:50]}..." if len(self.text) > 50 else self.text
@@ -185,6 +442,16 @@ class Form(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=DRAFT)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    question_snapshot = models.JSONField(null=True, blank=True, editable=False)  # Questions frozen when the form opens
+    questions_frozen_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Course pages and the dashboard: forms of a course by status, by deadline
+            models.Index(fields=['course', 'status', 'closing_date'], name='form_course_status_close_idx'),
+            # Scheduled forms whose publication date has passed
+            models.Index(fields=['status', 'publication_date'], name='form_status_publish_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -252,6 +519,65 @@ class Form(models.Model):
         
         super().save(*args, **kwargs)
 
+        # However the form got here (opened, closed or closed by the date check),
+        # once it is open or finished its questions no longer follow the template
+        if self.status in self.FROZEN_STATUSES and self.question_snapshot is None:
+            self.freeze_questions()
+
+    SNAPSHOT_VERSION = 1
+    # Statuses in which the question set must no longer follow the template
+    FROZEN_STATUSES = [ACTIVE, CLOSED, PUBLISHED]
+
+    @classmethod
+    def build_question_snapshot(cls, template_id, questions):
+        """The question_snapshot value for questions (in order) of the given template"""
+        return {
+            'version': cls.SNAPSHOT_VERSION,
+            'template': template_id,
+            'questions': [
+                [question.id, question.text, question.question_type, question.order]
+                for question in questions
+            ],
+        }
+
+    def freeze_questions(self):
+        """
+        Store the template's current questions on the form so later template
+        edits don't change a form that is open or has responses.
+        """
+        self.question_snapshot = self.build_question_snapshot(
+            self.template_id, self.template.get_question_set().all
+        )
+        self.questions_frozen_at = timezone.now()
+        Form.objects.filter(pk=self.pk).update(
+            question_snapshot=self.question_snapshot,
+            questions_frozen_at=self.questions_frozen_at
+        )
+
+    def clear_question_snapshot(self):
+        """Let the form follow its template again (e.g. after switching templates)"""
+        self.question_snapshot = None
+        self.questions_frozen_at = None
+
+    def get_question_set(self):
+        """
+        Returns the form's questions as a QuestionSet (all, likert, open). Open and
+        finished forms read the snapshot taken when they opened (taking it now if
+        missing); drafts and scheduled forms follow their template.
+        """
+        if self.question_snapshot is None:
+            if self.status not in self.FROZEN_STATUSES:
+                return self.template.get_question_set()
+            self.freeze_questions()
+
+        return snapshot_sets.get(self.pk, self.questions_frozen_at, lambda: split_questions(
+            SnapshotQuestion(*row) for row in self.question_snapshot['questions']
+        ))
+
+    def get_questions(self):
+        """Returns the form's questions in order (see get_question_set)"""
+        return self.get_question_set().all
+
     def unpublish(self):
         self.status = self.DRAFT
         self.save()
@@ -260,7 +586,11 @@ class Form(models.Model):
     def completion_rate(self):
         """
         Returns the completion rate as 'X/Y completed'.
+        Uses the counts from utils.with_completion() when the form was loaded with them.
         """
+        if hasattr(self, 'expected_count') and hasattr(self, 'completed_count'):
+            return f"{self.completed_count}/{self.expected_count} completed"
+
         total_expected = 0
         for team in self.teams.all():
             member_count = team.members.count()
@@ -308,6 +638,11 @@ class FormResponse(models.Model):
     
     class Meta:
         unique_together = ['form', 'evaluator', 'evaluatee']  # Each person can only evaluate another once per form
+        indexes = [
+            # Results and feedback pages: submitted responses about one member
+            models.Index(fields=['form', 'evaluatee', 'submitted'], name='response_form_evaluatee_idx'),
+            # A student's own responses for a form are served by unique_together's index
+        ]
     
     def __str__(self):
         return f"{self.evaluator} evaluating {self.evaluatee} for {self.form}"
@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict, namedtuple
+
+# A template's questions in order, plus the same questions split by type
+QuestionSet = namedtuple('QuestionSet', ['all', 'likert', 'open'])
+
+
+def split_questions(questions):
+    """Builds a QuestionSet from an ordered iterable of question-like objects"""
+    questions = tuple(questions)
+    return QuestionSet(
+        all=questions,
+        likert=tuple(q for q in questions if q.question_type == 'likert'),
+        open=tuple(q for q in questions if q.question_type == 'open'),
+    )
+
+
+class QuestionSetCache:
+    """
+    Bounded, thread-safe LRU cache of question sets for this process.
+    Entries are keyed by an id and only served while its version matches
+    (a template's updated_at, a form's questions_frozen_at), so an edit made
+    by another process (which bumps the version) is never served stale here.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version, loader):
+        """Returns the cached set for (key, version) or stores loader()"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        question_set = loader()
+        with self._lock:
+            self._entries[key] = (version, question_set)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return question_set
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+# Template question sets, keyed by template id and versioned by updated_at
+question_sets = QuestionSetCache()
+# Frozen form snapshots, keyed by form id and versioned by questions_frozen_at.
+# A snapshot never changes once taken, so entries only need to be bounded.
+snapshot_sets = QuestionSetCache(maxsize=1024)
+
+
+def cache_stats():
+    """Hit and miss counters of both question set caches, for monitoring"""
+    return {'templates': question_sets.stats(), 'snapshots': snapshot_sets.stats()}
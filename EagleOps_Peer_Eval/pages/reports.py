@@ -0,0 +1,149 @@
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .exports import ChunkBuffer
+from .models import Answer, Form, UserProfile
+from .utils import get_score_color
+
+DEFAULT_REPORT_CHUNK_SIZE = 25
+
+
+def collect_report_data(course):
+    """
+    Reads everything the per-student reports need up front (closed and
+    published forms, their questions and every submitted answer, in a few
+    queries) and returns a list of plain dictionaries, one per student,
+    that can be sent to worker processes. Open comments are anonymous.
+    """
+    forms = list(course.forms.filter(status__in=[Form.CLOSED, Form.PUBLISHED]).order_by('closing_date', 'id'))
+    question_sets = {form.id: form.get_question_set() for form in forms}
+    question_text = {
+        form_id: {question.id: question.text for question in question_set.all}
+        for form_id, question_set in question_sets.items()
+    }
+
+    # {(form id, evaluatee id): ({question id: [scores]}, [(question id, comment)])}
+    feedback = {}
+    answers = Answer.objects.filter(
+        response__form__in=forms, response__submitted=True
+    ).order_by('response__form_id', 'response__evaluatee_id', 'response_id', 'question__order').values_list(
+        'response__form_id', 'response__evaluatee_id', 'question_id', 'likert_answer', 'text_answer'
+    )
+    for form_id, evaluatee_id, question_id, likert, text in answers.iterator(chunk_size=2000):
+        scores, comments = feedback.setdefault((form_id, evaluatee_id), ({}, []))
+        if likert is not None:
+            scores.setdefault(question_id, []).append(likert)
+        elif text:
+            comments.append((question_id, text))
+
+    students = UserProfile.objects.filter(
+        Q(enrolled_courses=course) | Q(teams__course=course)
+    ).distinct().select_related('user').order_by('last_name', 'first_name', 'id')
+
+    reports = []
+    for student in students:
+        student_forms = []
+        for form in forms:
+            scores, comments = feedback.get((form.id, student.id), ({}, []))
+            averages = []
+            for question in question_sets[form.id].likert:
+                values = scores.get(question.id)
+                average = sum(values) / len(values) if values else 0
+                averages.append({'question': question.text, 'average': average, 'color': get_score_color(average)})
+            student_forms.append({
+                'title': form.title,
+                'closing_date': form.closing_date,
+                'averages': averages,
+                'comments': [
+                    {'question': question_text[form.id].get(question_id, ''), 'text': text}
+                    for question_id, text in comments
+                ],
+            })
+        reports.append({
+            'id': student.id,
+            'name': student.full_name,
+            'email': student.user.email,
+            'forms': student_forms,
+        })
+    return reports
+
+
+def report_filename(report):
+    return f"{slugify(report['name']) or 'student'}-{report['id']}.html"
+
+
+def render_reports(course_name, reports):
+    """Renders a chunk of reports; runs in a worker process and never touches the database"""
+    generated = timezone.now()
+    return [
+        (report_filename(report), render_to_string('reports/student_report.html', {
+            'course_name': course_name,
+            'report': report,
+            'generated': generated,
+        }))
+        for report in reports
+    ]
+
+
+def _init_worker():
+    # Processes started with "spawn" import a fresh interpreter
+    django.setup()
+
+
+def write_report_bundle(courses, fileobj, workers=1, chunk_size=DEFAULT_REPORT_CHUNK_SIZE):
+    """
+    Writes a zip with one HTML report per student of each course (in a folder
+    named after the course code) to fileobj, which does not need to be
+    seekable. Chunks of students are rendered in this process by default; the
+    export_feedback_reports command passes workers (None for one per CPU) to
+    render them in a process pool instead. This is a generator: it yields the
+    number of reports written so far after each chunk, so callers can stream
+    the archive.
+    """
+    count = 0
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as archive:
+        jobs = []
+        for course in courses:
+            reports = collect_report_data(course)
+            folder = slugify(course.code) or f"course-{course.id}"
+            jobs.extend(
+                (folder, course.name, reports[start:start + chunk_size])
+                for start in range(0, len(reports), chunk_size)
+            )
+
+        if workers == 1:
+            rendered = (render_reports(name, chunk) for _, name, chunk in jobs)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+            rendered = executor.map(render_reports, [name for _, name, _ in jobs], [chunk for _, _, chunk in jobs])
+        try:
+            for (folder, _, _), files in zip(jobs, rendered):
+                for filename, html in files:
+                    archive.writestr(f"{folder}/{filename}", html)
+                    count += 1
+                yield count
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+    yield count
+
+
+def stream_report_bundle(courses, chunk_size=DEFAULT_REPORT_CHUNK_SIZE):
+    """
+    Yields the bytes of the report zip as each chunk of students is rendered.
+    Rendering stays in the calling process: this runs inside a web request,
+    where forked workers would inherit its database connection and outlive a
+    client that disconnects.
+    """
+    buffer = ChunkBuffer()
+    for _ in write_report_bundle(courses, buffer, chunk_size=chunk_size):
+        data = buffer.pop()
+        if data:
+            yield data
@@ -0,0 +1,196 @@
+import csv
+import io
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from .models import Course, Team, UserProfile
+
+ROSTER_COLUMNS = ['email', 'first', 'last', 'team']
+DEFAULT_CHUNK_SIZE = 500
+
+
+def parse_roster(csv_file):
+    """
+    Read roster rows from a CSV file (path, text or binary file object).
+    The header must contain the columns email, first, last and team.
+    Rows import_roster could not write are skipped: invalid or duplicate
+    emails, values longer than their columns, and new emails whose username
+    (the email) already belongs to a user with another email.
+    Returns (rows, skipped) where skipped lists (line number, reason) pairs.
+    """
+    if isinstance(csv_file, str):
+        with open(csv_file, newline='', encoding='utf-8-sig') as handle:
+            return parse_roster(handle)
+    if isinstance(csv_file.read(0), bytes):
+        csv_file = io.TextIOWrapper(csv_file, encoding='utf-8-sig', newline='')
+
+    reader = csv.DictReader(csv_file)
+    header = [name.strip().lower() for name in reader.fieldnames or []]
+    missing = [column for column in ROSTER_COLUMNS if column not in header]
+    if missing:
+        raise ValidationError(f"Roster is missing column(s): {', '.join(missing)}")
+    reader.fieldnames = header
+
+    username_length = User._meta.get_field('username').max_length
+    name_length = UserProfile._meta.get_field('first_name').max_length
+    team_length = Team._meta.get_field('name').max_length
+
+    rows = []
+    skipped = []
+    seen = set()
+    for line, record in enumerate(reader, start=2):
+        email = (record.get('email') or '').strip().lower()
+        row = {
+            'email': email,
+            'first': (record.get('first') or '').strip(),
+            'last': (record.get('last') or '').strip(),
+            'team': (record.get('team') or '').strip(),
+        }
+        try:
+            validate_email(email)
+        except ValidationError:
+            skipped.append((line, f"invalid email '{email}'"))
+            continue
+        if email in seen:
+            skipped.append((line, f"duplicate email '{email}'"))
+            continue
+        seen.add(email)
+        if len(email) > username_length:
+            skipped.append((line, f"email longer than {username_length} characters"))
+        elif len(row['first']) > name_length or len(row['last']) > name_length:
+            skipped.append((line, f"name longer than {name_length} characters"))
+        elif len(row['team']) > team_length:
+            skipped.append((line, f"team name longer than {team_length} characters"))
+        else:
+            rows.append((line, row))
+
+    # New users get their email as username, which another user may already hold
+    emails = [row['email'] for _, row in rows]
+    existing = list(User.objects.annotate(email_lower=Lower('email')).filter(
+        Q(username__in=emails) | Q(email_lower__in=emails)
+    ).values_list('username', 'email_lower'))
+    known_emails = {email for _, email in existing}
+    taken_usernames = {username for username, _ in existing}
+    for line, row in rows:
+        if row['email'] in taken_usernames and row['email'] not in known_emails:
+            skipped.append((line, f"username '{row['email']}' belongs to a user with another email"))
+
+    skipped.sort()
+    skipped_lines = {line for line, _ in skipped}
+    return [row for line, row in rows if line not in skipped_lines], skipped
+
+
+def import_roster(course, rows, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    Create the users, profiles, teams and enrollments described by roster rows.
+    Existing users are matched by email and existing teams by name, so running
+    the same roster twice changes nothing. Everything is written with bulk_create
+    in chunks of chunk_size inside one transaction (rolled back when dry_run).
+    Returns a dictionary with the created counts and the new team names.
+    """
+    emails = [row['email'] for row in rows]
+    team_names = sorted({row['team'] for row in rows if row['team']})
+
+    with transaction.atomic():
+        # Users, matched case-insensitively on email
+        users = {
+            user.email_lower: user
+            for user in User.objects.annotate(email_lower=Lower('email')).filter(email_lower__in=emails)
+        }
+        new_users = [
+            User(
+                username=row['email'],
+                email=row['email'],
+                first_name=row['first'],
+                last_name=row['last'],
+                password=make_password(None),
+            )
+            for row in rows if row['email'] not in users
+        ]
+        User.objects.bulk_create(new_users, batch_size=chunk_size)
+        if new_users:
+            # Reload so the primary keys are set regardless of database backend
+            users.update({
+                user.email: user
+                for user in User.objects.filter(email__in=[user.email for user in new_users])
+            })
+
+        # Profiles
+        profiles = {
+            profile.user_id: profile
+            for profile in UserProfile.objects.filter(user__in=users.values())
+        }
+        new_profiles = [
+            UserProfile(user=users[row['email']], first_name=row['first'], last_name=row['last'])
+            for row in rows if users[row['email']].id not in profiles
+        ]
+        UserProfile.objects.bulk_create(new_profiles, batch_size=chunk_size)
+        if new_profiles:
+            profiles = {
+                profile.user_id: profile
+                for profile in UserProfile.objects.filter(user__in=users.values())
+            }
+        profile_by_email = {row['email']: profiles[users[row['email']].id] for row in rows}
+
+        # Course enrollment
+        enrolled_ids = set(
+            course.students.filter(id__in=[p.id for p in profile_by_email.values()]).values_list('id', flat=True)
+        )
+        Enrollment = Course.students.through
+        new_enrollments = [
+            Enrollment(course_id=course.id, userprofile_id=profile.id)
+            for profile in profile_by_email.values() if profile.id not in enrolled_ids
+        ]
+        Enrollment.objects.bulk_create(new_enrollments, batch_size=chunk_size, ignore_conflicts=True)
+
+        # Teams
+        teams = {team.name: team for team in Team.objects.filter(course=course, name__in=team_names)}
+        new_teams = [Team(name=name, course=course) for name in team_names if name not in teams]
+        Team.objects.bulk_create(new_teams, batch_size=chunk_size)
+        if new_teams:
+            teams = {team.name: team for team in Team.objects.filter(course=course, name__in=team_names)}
+
+        # Team membership
+        Membership = Team.members.through
+        existing_members = set(
+            Membership.objects.filter(team__in=teams.values()).values_list('team_id', 'userprofile_id')
+        )
+        new_members = [
+            Membership(team_id=teams[row['team']].id, userprofile_id=profile_by_email[row['email']].id)
+            for row in rows
+            if row['team'] and (teams[row['team']].id, profile_by_email[row['email']].id) not in existing_members
+        ]
+        Membership.objects.bulk_create(new_members, batch_size=chunk_size, ignore_conflicts=True)
+
+        if dry_run:
+            transaction.set_rollback(True)
+
+    return {
+        'rows': len(rows),
+        'users_created': len(new_users),
+        'profiles_created': len(new_profiles),
+        'enrollments_added': len(new_enrollments),
+        'teams_created': [team.name for team in new_teams],
+        'memberships_added': len(new_members),
+    }
+
+
+def format_roster_report(report, skipped=()):
+    """Returns the import report as a list of human-readable lines"""
+    lines = [
+        f"Rows read: {report['rows']}",
+        f"Users created: {report['users_created']}",
+        f"Profiles created: {report['profiles_created']}",
+        f"Students enrolled: {report['enrollments_added']}",
+        f"Teams created: {len(report['teams_created'])}"
+        + (f" ({', '.join(report['teams_created'])})" if report['teams_created'] else ''),
+        f"Team memberships added: {report['memberships_added']}",
+    ]
+    lines.extend(f"Skipped line {line}: {reason}" for line, reason in skipped)
+    return lines
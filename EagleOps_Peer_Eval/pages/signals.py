@@ -1,53 +1,80 @@
-from django.db.models.signals import post_save
+import json
+import logging
+from functools import lru_cache
+
+from django.db import transaction
+from django.db.models import OuterRef, QuerySet, Subquery
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.test.signals import setting_changed
 from django.contrib.auth.signals import user_logged_in
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, Course, FormTemplate, Question
+from .join_codes import cache_join_code, forget_join_code
+from .question_cache import question_sets
 from allauth.socialaccount.models import SocialAccount
 from allauth.socialaccount.signals import social_account_added, pre_social_login
 from allauth.core.exceptions import ImmediateHttpResponse
 from django.shortcuts import redirect
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=None)
+def admin_emails():
+    """Lower-cased settings.ADMIN_EMAILS, read once per process"""
+    return frozenset(email.lower() for email in getattr(settings, 'ADMIN_EMAILS', ()))
+
+@receiver(setting_changed)
+def clear_admin_emails(sender, setting, **kwargs):
+    if setting == 'ADMIN_EMAILS':
+        admin_emails.cache_clear()
+
 # Signal handler to update UserProfile and admin status on login
 @receiver(user_logged_in)
 def update_user_profile_on_login(sender, request, user, **kwargs):
-    admin_emails = [
-        'hazardo@bc.edu', 
-        'spotob@bc.edu',
-        'mimi@bc.edu',
-        "villelas@bc.edu",
-        "brecker@bc.edu",
-        "careysh@bc.edu",
-        "wuaye@bc.edu"
-    ]  # Existing superuser email
-    user_profile, created = UserProfile.objects.get_or_create(user=user)
-
-    # If the user is logged in through Google OAuth and profile is newly created or names are empty,
-    # populate first and last name
-    if user.socialaccount_set.exists():
-        social_account = user.socialaccount_set.first()
-        extra_data = social_account.extra_data
-        
-        # Only update names if they're empty or this is a newly created profile
+    """
+    Syncs the profile's names (from the Google account) and admin status. The
+    profile and the social account data are read in one query, and the profile
+    is only written when a value actually changed.
+    """
+    social_data = SocialAccount.objects.filter(user=OuterRef('user')).order_by('pk').values('extra_data')[:1]
+    user_profile = UserProfile.objects.filter(user=user).annotate(social_data=Subquery(social_data)).first()
+    created = user_profile is None
+    if created:
+        user_profile = UserProfile(user=user)
+        extra_data = SocialAccount.objects.filter(user=user).order_by('pk').values_list('extra_data', flat=True).first()
+    else:
+        extra_data = user_profile.social_data
+    if isinstance(extra_data, str):
+        # Some backends return JSON from subqueries undecoded
+        extra_data = json.loads(extra_data)
+
+    changed = []
+    def update(field, value):
+        if getattr(user_profile, field) != value:
+            setattr(user_profile, field, value)
+            changed.append(field)
+
+    # If the user is logged in through Google OAuth, fill in names that are empty
+    if extra_data is not None:
         if created or not user_profile.first_name:
-            user_profile.first_name = extra_data.get('given_name', '')
-        
+            update('first_name', extra_data.get('given_name', ''))
         if created or not user_profile.last_name:
-            user_profile.last_name = extra_data.get('family_name', '')
-
-    if user.email in admin_emails:  # Check if user email is in admin_emails
-        user_profile.admin = True
-        if not user.is_superuser:
-            user.is_superuser = True
-            user.is_staff = True
-            user.save()
-            print(f"User {user.username} granted superuser and staff status")
-    else:
-        user_profile.admin = False
+            update('last_name', extra_data.get('family_name', ''))
 
-    user_profile.save()  # Save the user profile
-    print(f"User {user.username} admin status updated to {user_profile.admin}")  # Print user status to the console
+    is_admin = (user.email or '').lower() in admin_emails()
+    update('admin', is_admin)
+    if is_admin and not user.is_superuser:
+        user.is_superuser = True
+        user.is_staff = True
+        user.save(update_fields=['is_superuser', 'is_staff'])
+        logger.info("User %s granted superuser and staff status", user.username)
+
+    if created:
+        user_profile.save()
+    elif changed:
+        user_profile.save(update_fields=[*changed, 'updated_at'])
 
 # Signal handler for adding a new social account
 @receiver(social_account_added)
@@ -60,19 +87,19 @@ def process_social_account(request, sociallogin, **kwargs):
     try:
         existing_super = User.objects.filter(is_superuser=True, email=email).first()
         if existing_super and existing_super != user:
-            print(f"Found existing superuser {existing_super.username} with matching email")
+            logger.info("Found existing superuser %s with matching email", existing_super.username)
             
             # Transfer social account to the existing superuser
             social_account = sociallogin.account
             social_account.user = existing_super
             social_account.save()
             
-            print(f"Transferred social account to existing superuser {existing_super.username}")
+            logger.info("Transferred social account to existing superuser %s", existing_super.username)
             
             # Log in as the superuser instead
             return existing_super
-    except Exception as e:
-        print(f"Error linking social account: {e}")
+    except Exception:
+        logger.exception("Error linking social account")
     
     return None
 
@@ -91,8 +118,7 @@ def auto_login_without_signup_form(sender, request, sociallogin, **kwargs):
             user = User.objects.get(email=email)
             # Connect the social account to the existing user
             sociallogin.connect(request, user)
-            # Print info
-            print(f"Auto-connected social account to existing user: {user.username}")
+            logger.info("Auto-connected social account to existing user: %s", user.username)
             
             # Update or create UserProfile and save first_name, last_name from Google OAuth data
             user_profile, created = UserProfile.objects.get_or_create(user=user)
@@ -107,8 +133,55 @@ def auto_login_without_signup_form(sender, request, sociallogin, **kwargs):
                     user_profile.last_name = extra_data.get('family_name', '')
                 
                 user_profile.save()
-                print(f"UserProfile for {user.username} updated with Google data")
+                logger.info("UserProfile for %s updated with Google data", user.username)
 
         except User.DoesNotExist:
             # No existing user, pass to create a new one (this would normally redirect to the signup form)
-            pass
\ No newline at end of file
+            pass
+
+# Signal handlers keeping the question set cache in sync with template edits
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, origin=None, **kwargs):
+    """
+    Mark the question's template as changed. Skipped when the deletion started
+    from anything but questions (a template, or the course or profile owning
+    it): the template is then being deleted too, and marking it would cost one
+    UPDATE per question.
+    """
+    if origin is not None:
+        origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+        if origin_model is not Question:
+            return
+    FormTemplate(pk=instance.template_id).mark_questions_changed()
+
+@receiver([post_save, post_delete], sender=FormTemplate)
+def template_changed(sender, instance, **kwargs):
+    question_sets.invalidate(instance.pk)
+
+# Signal handlers keeping the cached join code -> course map current
+@receiver(pre_save, sender=Course)
+def course_saving(sender, instance, update_fields=None, **kwargs):
+    """Remember the stored join code, so a replaced code can be dropped from the cache"""
+    if not instance.pk or (update_fields is not None and 'course_join_code' not in update_fields):
+        instance._stored_join_code = None
+        return
+    instance._stored_join_code = Course.objects.filter(pk=instance.pk).values_list(
+        'course_join_code', flat=True
+    ).first()
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, **kwargs):
+    stored_code = getattr(instance, '_stored_join_code', None)
+    if stored_code and stored_code != instance.course_join_code:
+        # Dropped now and again on commit, in case a lookup re-cached it in between
+        forget_join_code(stored_code)
+        transaction.on_commit(lambda: forget_join_code(stored_code))
+    if instance.course_join_code:
+        transaction.on_commit(
+            lambda: cache_join_code(instance.course_join_code, instance.pk, instance.name)
+        )
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    if instance.course_join_code:
+        forget_join_code(instance.course_join_code)
@@ -1,4 +1,12 @@
-from django.core.files.storage import Storage
+import hashlib
+import io
+import re
+
+from PIL import Image, ImageOps
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, Storage
+from django.urls import reverse
 
 class NullStorage(Storage):
     """
@@ -16,3 +24,82 @@ class NullStorage(Storage):
     def url(self, name):
         # Optionally, return an empty string or a placeholder URL
         return ""
+
+
+class AvatarStorage(FileSystemStorage):
+    """
+    Stores avatar uploads as square WebP thumbnails in a few fixed sizes.
+    Files are named after a hash of the uploaded bytes, so the same picture
+    uploaded twice is stored once, and a stored file never changes, which lets
+    it be cached by browsers indefinitely.
+    The name saved on the model is the largest size; see thumbnail_name().
+    """
+    SIZES = {'small': 96, 'medium': 192, 'large': 384}
+    FORMAT = 'WEBP'
+    EXTENSION = 'webp'
+    HASHED_NAME = re.compile(r'^avatars/[0-9a-f]{2}/[0-9a-f]{64}-\d+\.webp$')
+    # Uploads from before hashing: one file directly in avatars/, named by get_valid_name()
+    LEGACY_NAME = re.compile(r'^avatars/\w[\w.-]*$')
+
+    def _save(self, name, content):
+        content.seek(0)
+        data = content.read()
+        digest = hashlib.sha256(data).hexdigest()
+        stored_name = self._hashed_name(digest, self.SIZES['large'])
+        if self.exists(stored_name):
+            return stored_name
+
+        image = Image.open(io.BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        for size in sorted(self.SIZES.values(), reverse=True):
+            thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, self.FORMAT, quality=85, method=4)
+            super()._save(self._hashed_name(digest, size), ContentFile(buffer.getvalue()))
+        return stored_name
+
+    def get_available_name(self, name, max_length=None):
+        # Names are chosen in _save() from the content hash
+        return name
+
+    def _hashed_name(self, digest, size):
+        return f"avatars/{digest[:2]}/{digest}-{size}.{self.EXTENSION}"
+
+    def is_hashed(self, name):
+        return bool(self.HASHED_NAME.match(name or ''))
+
+    def is_avatar_name(self, name):
+        """Whether name can only be a stored avatar: hashed, or a legacy file name without '..'"""
+        name = name or ''
+        return self.is_hashed(name) or (bool(self.LEGACY_NAME.fullmatch(name)) and '..' not in name)
+
+    def thumbnail_name(self, name, size):
+        """Returns the stored name of one size of an avatar (legacy files have only one)"""
+        if not self.is_hashed(name):
+            return name
+        return re.sub(r'-\d+\.webp$', f"-{self.SIZES[size]}.webp", name)
+
+    def url(self, name):
+        return reverse('avatar', args=[name])
+
+    def delete(self, name):
+        # Content-addressed files may be shared by several profiles
+        pass
+
+
+avatar_storage = AvatarStorage(allow_overwrite=True)
+
+
+def get_avatar_storage():
+    return avatar_storage
+
+
+def validate_avatar(upload):
+    """Raises ValidationError unless the upload is an image Pillow can read"""
+    try:
+        Image.open(upload).verify()
+    except Exception:
+        raise ValidationError("Avatar must be an image file.")
+    finally:
+        upload.seek(0)
@@ -0,0 +1,213 @@
+import math
+import random
+
+from django.db import transaction
+
+from .models import Team
+
+# Placements tried before plan_teams gives up. Greedy placement needs one per
+# group; the rest is room to backtrack when the greedy order gets stuck.
+MAX_SEARCH_STEPS = 100_000
+
+
+def _keep_together_groups(student_ids, keep_together):
+    """Merge the students of every keep-together pair into groups (union-find)"""
+    parent = {student_id: student_id for student_id in student_ids}
+
+    def find(student_id):
+        while parent[student_id] != student_id:
+            parent[student_id] = parent[parent[student_id]]
+            student_id = parent[student_id]
+        return student_id
+
+    for a, b in keep_together:
+        if a in parent and b in parent:
+            parent[find(a)] = find(b)
+
+    groups = {}
+    for student_id in student_ids:
+        groups.setdefault(find(student_id), []).append(student_id)
+    return list(groups.values())
+
+
+def _add_pair_costs(costs, pairs, cost):
+    """Adds cost to {student: {other student: cost}} for both members of each pair"""
+    for a, b in pairs:
+        if a == b:
+            continue
+        costs.setdefault(a, {})[b] = costs.get(a, {}).get(b, 0) + cost
+        costs.setdefault(b, {})[a] = costs.get(b, {}).get(a, 0) + cost
+
+
+def plan_teams(student_ids, team_size, keep_together=(), keep_apart=(), prior_pairs=(), seed=None):
+    """
+    Partition students into balanced teams of about team_size members.
+    - keep_together: pairs that must end up on the same team
+    - keep_apart: pairs that must never share a team
+    - prior_pairs: pairs that were teammates before and are avoided when possible
+    Team sizes differ by at most one. Groups are placed greedily on the team
+    with the fewest prior teammates, backtracking when a group no longer fits.
+    Returns a list of lists of student ids. Raises ValueError when the size
+    and keep-together/keep-apart constraints cannot all be met (or no plan
+    is found within MAX_SEARCH_STEPS placements).
+    """
+    if team_size < 1:
+        raise ValueError("Team size must be at least 1.")
+
+    student_ids = list(dict.fromkeys(student_ids))
+    if not student_ids:
+        return []
+
+    team_count = math.ceil(len(student_ids) / team_size)
+    base_size, larger_teams = divmod(len(student_ids), team_count)
+    capacity = [base_size + 1 if i < larger_teams else base_size for i in range(team_count)]
+
+    groups = _keep_together_groups(student_ids, keep_together)
+    if max(len(group) for group in groups) > max(capacity):
+        raise ValueError("A keep-together group is larger than the team size.")
+
+    apart = {}
+    _add_pair_costs(apart, keep_apart, 1)
+    costs = {}
+    _add_pair_costs(costs, prior_pairs, 1)
+    for group in groups:
+        members = set(group)
+        if any(members.intersection(apart.get(student_id, ())) for student_id in group):
+            raise ValueError("A keep-apart pair is also kept together.")
+
+    # Place the hardest groups first: big groups, then the most constrained students
+    rng = random.Random(seed)
+    rng.shuffle(groups)
+    groups.sort(
+        key=lambda group: (len(group), sum(len(apart.get(s, ())) + len(costs.get(s, ())) for s in group)),
+        reverse=True,
+    )
+
+    teams = [[] for _ in range(team_count)]
+    team_of = {}
+
+    def best_team(group, tried):
+        """
+        The team the group joins next: fewest prior teammates, then most room,
+        among teams with room that hold none of its keep-apart partners and
+        were not tried at this point of the search. None if there is none.
+        """
+        blocked = set(tried)
+        team_costs = {}
+        for student_id in group:
+            for other in apart.get(student_id, ()):
+                if other in team_of:
+                    blocked.add(team_of[other])
+            for other, cost in costs.get(student_id, {}).items():
+                if other in team_of:
+                    team_costs[team_of[other]] = team_costs.get(team_of[other], 0) + cost
+
+        best = None
+        best_key = None
+        for index in range(team_count):
+            remaining = capacity[index] - len(teams[index])
+            if remaining < len(group) or index in blocked:
+                continue
+            key = (team_costs.get(index, 0), -remaining)
+            if best_key is None or key < best_key:
+                best, best_key = index, key
+        return best
+
+    # Depth-first over the groups: the first path is the greedy plan, and a
+    # group that fits nowhere sends the previous group to its next best team
+    tried = []
+    placed = []
+    steps = 0
+    while len(placed) < len(groups):
+        depth = len(placed)
+        if len(tried) == depth:
+            tried.append(set())
+        group = groups[depth]
+        index = best_team(group, tried[depth])
+        if index is None:
+            tried.pop()
+            if not placed:
+                raise ValueError("No balanced teams meet the keep-together and keep-apart constraints.")
+            index = placed.pop()
+            del teams[index][-len(groups[depth - 1]):]
+            for student_id in groups[depth - 1]:
+                del team_of[student_id]
+            continue
+
+        steps += 1
+        if steps > MAX_SEARCH_STEPS:
+            raise ValueError("No balanced teams meet the keep-together and keep-apart constraints.")
+        tried[depth].add(index)
+        teams[index].extend(group)
+        for student_id in group:
+            team_of[student_id] = index
+        placed.append(index)
+
+    return [team for team in teams if team]
+
+
+def prior_teammate_pairs(student_ids):
+    """
+    Returns the pairs of students who were on the same team for an earlier form,
+    read in a single query over team memberships.
+    """
+    Membership = Team.members.through
+    rows = Membership.objects.filter(
+        team__assigned_forms__isnull=False,
+        userprofile_id__in=student_ids,
+    ).values_list('team_id', 'userprofile_id').distinct()
+
+    members_by_team = {}
+    for team_id, student_id in rows:
+        members_by_team.setdefault(team_id, []).append(student_id)
+
+    pairs = set()
+    for members in members_by_team.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                pairs.add((min(a, b), max(a, b)))
+    return pairs
+
+
+def unassigned_students(course):
+    """Returns ids of students enrolled in the course who are not on any of its teams"""
+    return list(
+        course.students.exclude(teams__course=course).order_by('id').values_list('id', flat=True)
+    )
+
+
+def form_teams(course, team_size, keep_together=(), keep_apart=(), avoid_prior=True,
+               name_prefix='Team', seed=None):
+    """
+    Build teams for every student of the course who is not on a team yet and write
+    them with two bulk inserts. Returns the created teams.
+    """
+    student_ids = unassigned_students(course)
+    prior_pairs = prior_teammate_pairs(student_ids) if avoid_prior else ()
+    plan = plan_teams(student_ids, team_size, keep_together, keep_apart, prior_pairs, seed=seed)
+
+    # Skip names already used in the course so the unique constraint holds
+    existing_names = set(course.teams.values_list('name', flat=True))
+    names = []
+    number = 1
+    while len(names) < len(plan):
+        name = f"{name_prefix} {number}"
+        if name not in existing_names:
+            names.append(name)
+        number += 1
+
+    with transaction.atomic():
+        teams = Team.objects.bulk_create([Team(name=name, course=course) for name in names])
+        if any(team.pk is None for team in teams):
+            # Backends that don't return primary keys from bulk inserts
+            by_name = {team.name: team for team in Team.objects.filter(course=course, name__in=names)}
+            teams = [by_name[name] for name in names]
+
+        Membership = Team.members.through
+        Membership.objects.bulk_create([
+            Membership(team_id=team.id, userprofile_id=student_id)
+            for team, members in zip(teams, plan)
+            for student_id in members
+        ])
+
+    return teams
@@ -0,0 +1,13 @@
+from django import template
+from django.templatetags.static import static
+
+from pages.storage import avatar_storage
+
+register = template.Library()
+
+@register.simple_tag
+def avatar_url(profile, size='small'):
+    """URL of a profile's avatar at one of AvatarStorage.SIZES, or the default image"""
+    if not profile or not profile.avatar:
+        return static('images/avatar.png')
+    return avatar_storage.url(avatar_storage.thumbnail_name(profile.avatar.name, size))
@@ -0,0 +1,102 @@
+# pages/test_query_counts.py
+"""
+Query-count guards: every page in pages/urls.py, requested by an admin, an
+instructor and a student, must run the same number of queries on a small and a
+larger data set. A page whose count grows with the data has an N+1 somewhere;
+the failure lists the statements that repeat.
+"""
+import re
+from collections import Counter
+
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from pages import urls
+from pages.load_data import generate_load_data
+from pages.models import Course, Form, FormResponse, UserProfile
+
+SMALL = dict(courses=1, students=6, team_size=3, forms=3, likert_questions=2, open_questions=1)
+LARGE = dict(courses=2, students=12, team_size=4, forms=5, likert_questions=3, open_questions=2)
+
+# URL names that are not rendered, and why
+SKIPPED = {
+    'signout': 'ends the session',
+    'form_completion_stream': 'an open-ended event stream',
+    'avatar': 'serves stored files',
+}
+# Pages about filling in a form use the course's active form; the rest a published one
+ACTIVE_FORM_URLS = {'form_evaluations', 'form_response', 'submit_form_response'}
+ROLES = ['admin', 'instructor', 'student']
+URL_NAMES = sorted({pattern.name for pattern in urls.urlpatterns if pattern.name} - set(SKIPPED))
+
+
+def _url(name, prefix):
+    """The URL of name for the first course of the data set generated with prefix"""
+    course = Course.objects.get(code=f'{prefix.upper()}-0000')
+    form = course.forms.filter(status=Form.ACTIVE if name in ACTIVE_FORM_URLS else Form.PUBLISHED).first()
+    student = UserProfile.objects.get(user__username=f'{prefix}-student-0-0')
+    teammate = UserProfile.objects.get(user__username=f'{prefix}-student-0-1')
+    values = {
+        'course_id': course.id,
+        'form_id': form.id,
+        'template_id': form.template_id,
+        'team_id': course.teams.order_by('id').first().id,
+        'evaluatee_id': teammate.id,
+        'member_id': teammate.id,
+        'response_id': FormResponse.objects.get(form=form, evaluator=student, evaluatee=teammate).id,
+    }
+    pattern = next(p for p in urls.urlpatterns if p.name == name)
+    return reverse(name, kwargs={key: values[key] for key in pattern.pattern.converters})
+
+
+def _login(role, prefix):
+    username = {
+        'admin': f'{prefix}-admin',
+        'instructor': f'{prefix}-instructor-0',
+        'student': f'{prefix}-student-0-0',
+    }[role]
+    user = User.objects.get(username=username)
+    client = Client()
+    client.force_login(user)
+    # Logging in re-derives the admin flag from ADMIN_EMAILS
+    UserProfile.objects.filter(user=user).update(admin=role == 'admin')
+    return client
+
+
+def _render(name, role, prefix):
+    """Queries of a warm GET of the page; the first request fills per-process caches"""
+    client, url = _login(role, prefix), _url(name, prefix)
+    client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        client.get(url)
+    return [query['sql'] for query in queries.captured_queries]
+
+
+def _normalize(sql):
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    return re.sub(r'\b\d+(\.\d+)?\b', '?', sql)
+
+
+def _report(name, role, small, large):
+    repeated = Counter(_normalize(sql) for sql in large)
+    lines = [f"{name} as {role}: {len(small)} queries on the small data set, {len(large)} on the larger one.",
+             "Statements run more than once on the larger data set:"]
+    for sql, count in repeated.most_common():
+        if count > 1:
+            lines.append(f"  {count}x {sql[:400]}")
+    return '\n'.join(lines)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('role', ROLES)
+@pytest.mark.parametrize('name', URL_NAMES)
+def test_query_count_does_not_grow_with_data(name, role):
+    generate_load_data(prefix='small', **SMALL)
+    small = _render(name, role, 'small')
+    generate_load_data(prefix='large', **LARGE)
+    large = _render(name, role, 'large')
+    assert len(large) == len(small), _report(name, role, small, large)
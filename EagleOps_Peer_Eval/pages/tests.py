@@ -1,17 +1,46 @@
 # pages/tests.py
+import asyncio
+import csv
+import io
+import json
 import pytest
 import re
+import runpy
+import zipfile
 from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from xml.etree import ElementTree
+from PIL import Image
+from asgiref.sync import async_to_sync, sync_to_async
+from allauth.socialaccount.models import SocialAccount, SocialApp
+from django.apps import apps
 from django.utils import timezone
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.urls import reverse, NoReverseMatch
-from django.test import RequestFactory
+from django.test import AsyncClient, RequestFactory
+from django.test.utils import CaptureQueriesContext
 
+from pages import views
 from pages.models import (
     UserProfile, Course, Team, FormTemplate, Question,
     Form, FormResponse, Answer
 )
 from pages.views import performance_view
+from pages.exports import _xlsx_cell
+from pages.join_codes import MAX_FAILED_JOINS_PER_USER, code_for
+from pages.live import completion_broker, publish_completion, team_completion
+from pages.load_data import generate_load_data
+from pages.question_cache import cache_stats, question_sets, snapshot_sets
+from pages.roster_import import import_roster, parse_roster
+from pages.storage import avatar_storage
+from pages.team_formation import form_teams, plan_teams
+from pages.utils import DASHBOARD_PAGE_SIZE, with_completion
 
 
 # -----------------------------
@@ -43,6 +72,15 @@ def _mark_question_scored(q):
         q.save()
 
 
+def _login_as_admin(client, user):
+    """
+    Log user in as an admin. The login signal recomputes the admin flag from
+    ADMIN_EMAILS, so it is set after logging in.
+    """
+    client.force_login(user)
+    UserProfile.objects.filter(user=user).update(admin=True)
+
+
 def _create_submitted_response(form, evaluator, evaluatee):
     resp = FormResponse.objects.create(
         form=form,
@@ -367,3 +405,1072 @@ def test_time_left_all_plural_units():
     now = timezone.now()
     event = DummyEvent(closing_date=now + timedelta(days=3, hours=4, minutes=11))
     assert event.time_left() == "3 days, 4 hours, and 10 minutes"
+
+
+# -----------------------------
+# 8) course_detail query count does not grow with the course
+# -----------------------------
+def _add_teams_with_forms(course, instructor, team_count, members_per_team=3, prefix="t"):
+    tpl = FormTemplate.objects.create(title=f"{prefix}-tpl", created_by=instructor, course=course)
+    Question.objects.create(template=tpl, text="Effort", order=1)
+    now = timezone.now()
+    form = Form.objects.create(
+        title=f"{prefix}-form", template=tpl, course=course, created_by=instructor,
+        publication_date=now - timedelta(days=1), closing_date=now + timedelta(days=1),
+    )
+    for i in range(team_count):
+        team = Team.objects.create(name=f"{prefix}-team-{i}", course=course)
+        for j in range(members_per_team):
+            u = User.objects.create(username=f"{prefix}-{i}-{j}")
+            team.members.add(UserProfile.objects.create(user=u))
+        form.teams.add(team)
+    return form
+
+
+@pytest.mark.django_db
+def test_course_detail_query_count_is_flat(client):
+    admin_user = User.objects.create_user("adminq", password="pass")
+    padmin = UserProfile.objects.create(user=admin_user, admin=True)
+    course = Course.objects.create(name="Big", code="BIG1")
+    course.instructors.add(padmin)
+    _add_teams_with_forms(course, padmin, team_count=2, prefix="small")
+    _login_as_admin(client, admin_user)
+    url = reverse("course_detail", args=[course.id])
+    client.get(url)  # warm the session's selected course
+
+    with CaptureQueriesContext(connection) as small:
+        assert client.get(url).status_code == 200
+
+    _add_teams_with_forms(course, padmin, team_count=20, prefix="large")
+    with CaptureQueriesContext(connection) as large:
+        assert client.get(url).status_code == 200
+
+    assert len(large) == len(small)
+
+
+@pytest.mark.django_db
+def test_with_completion_matches_completion_rate():
+    user = User.objects.create_user("instr", password="pass")
+    instructor = UserProfile.objects.create(user=user, admin=True)
+    course = Course.objects.create(name="Counts", code="CNT1")
+    form = _add_teams_with_forms(course, instructor, team_count=2, members_per_team=3)
+    team = form.teams.first()
+    a, b = list(team.members.all())[:2]
+    FormResponse.objects.create(form=form, evaluator=a, evaluatee=b, submitted=True)
+    FormResponse.objects.create(form=form, evaluator=b, evaluatee=a, submitted=False)
+
+    expected = form.completion_rate
+    annotated = with_completion(Form.objects.filter(id=form.id)).get()
+    assert annotated.completion_rate == expected == "1/12 completed"
+
+    form.self_assessment = True
+    form.save()
+    annotated = with_completion(Form.objects.filter(id=form.id)).get()
+    assert annotated.completion_rate == "1/18 completed"
+
+
+# -----------------------------
+# 9) forms_dashboard pages its sections and keeps query count flat
+# -----------------------------
+@pytest.mark.django_db
+def test_forms_dashboard_is_paged_and_query_count_is_flat(client):
+    admin_user = User.objects.create_user("dashadmin", password="pass")
+    padmin = UserProfile.objects.create(user=admin_user, admin=True)
+    course = Course.objects.create(name="Dash", code="DASH1")
+    _add_teams_with_forms(course, padmin, team_count=2, prefix="first")
+    _login_as_admin(client, admin_user)
+    url = reverse("forms_dashboard")
+
+    with CaptureQueriesContext(connection) as small:
+        assert client.get(url).status_code == 200
+
+    tpl = FormTemplate.objects.create(title="Bulk", created_by=padmin, course=course)
+    now = timezone.now()
+    for i in range(DASHBOARD_PAGE_SIZE + 5):
+        Form.objects.create(
+            title=f"Bulk {i}", template=tpl, course=course, created_by=padmin,
+            publication_date=now - timedelta(days=1), closing_date=now + timedelta(days=1),
+            status=Form.ACTIVE,
+        )
+    with CaptureQueriesContext(connection) as large:
+        response = client.get(url)
+
+    assert len(response.context["active_forms"]) == DASHBOARD_PAGE_SIZE
+    assert len(client.get(url, {"active_forms_page": 2}).context["active_forms"]) == 5
+    assert len(large) == len(small)
+
+
+# -----------------------------
+# 10) CSV roster import
+# -----------------------------
+ROSTER_CSV = (
+    "email,first,last,team\n"
+    "ann@bc.edu,Ann,Lee,Red\n"
+    "BOB@bc.edu,Bob,Ray,Red\n"
+    "cy@bc.edu,Cy,Oh,Blue\n"
+    "not-an-email,X,Y,Blue\n"
+)
+
+
+@pytest.mark.django_db
+def test_import_roster_creates_everything_once(tmp_path):
+    existing = User.objects.create_user("bob", email="bob@bc.edu", password="pass")
+    course = Course.objects.create(name="Roster", code="ROS1")
+    Team.objects.create(name="Blue", course=course)
+    path = tmp_path / "roster.csv"
+    path.write_text(ROSTER_CSV)
+
+    out = StringIO()
+    call_command("import_roster", "ROS1", str(path), stdout=out)
+    assert "Users created: 2" in out.getvalue()
+    assert "Teams created: 1 (Red)" in out.getvalue()
+    assert "Skipped line 5" in out.getvalue()
+
+    assert UserProfile.objects.get(user=existing).teams.get().name == "Red"
+    assert course.students.count() == 3
+    assert sorted(course.teams.values_list("name", flat=True)) == ["Blue", "Red"]
+    assert Team.objects.get(course=course, name="Red").members.count() == 2
+
+    out = StringIO()
+    call_command("import_roster", "ROS1", str(path), stdout=out)
+    assert "Users created: 0" in out.getvalue()
+    assert "Team memberships added: 0" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_import_roster_dry_run_saves_nothing():
+    course = Course.objects.create(name="Roster", code="ROS2")
+    rows, skipped = parse_roster(StringIO(ROSTER_CSV))
+    report = import_roster(course, rows, dry_run=True)
+
+    assert report["users_created"] == 3 and len(skipped) == 1
+    assert not User.objects.exists()
+    assert not course.teams.exists()
+
+
+@pytest.mark.django_db
+def test_import_roster_skips_rows_it_cannot_write(tmp_path):
+    # Holds "cy@bc.edu" as username but with another email
+    User.objects.create_user("cy@bc.edu", email="cyrus@elsewhere.edu", password="pass")
+    # Already a user by email, so its username does not matter
+    User.objects.create_user("dee@bc.edu", email="DEE@bc.edu", password="pass")
+    Course.objects.create(name="Roster", code="ROS3")
+    roster = (
+        "email,first,last,team\n"
+        "ann@bc.edu,Ann,Lee,Red\n"
+        f"{'a' * 145}@bc.edu,Al,Long,Red\n"
+        "cy@bc.edu,Cy,Oh,Blue\n"
+        f"eve@bc.edu,Eve,Ng,{'T' * 101}\n"
+        "dee@bc.edu,Dee,Ko,Blue\n"
+    )
+    rows, skipped = parse_roster(StringIO(roster))
+    assert [row["email"] for row in rows] == ["ann@bc.edu", "dee@bc.edu"]
+    assert [line for line, _ in skipped] == [3, 4, 5]
+
+    # The command reports those rows instead of failing on the bulk insert
+    path = tmp_path / "roster.csv"
+    path.write_text(roster)
+    out = StringIO()
+    call_command("import_roster", "ROS3", str(path), stdout=out)
+    assert "Users created: 1" in out.getvalue()
+    assert "Skipped line 3: email longer than 150 characters" in out.getvalue()
+    assert "Skipped line 4: username 'cy@bc.edu' belongs to a user with another email" in out.getvalue()
+    assert "Skipped line 5: team name longer than 100 characters" in out.getvalue()
+
+
+# -----------------------------
+# 11) Automatic team formation
+# -----------------------------
+def test_plan_teams_is_balanced_and_honors_constraints():
+    students = list(range(1, 1001))
+    keep_together = [(1, 2), (2, 3)]
+    keep_apart = [(10, 11), (10, 12)]
+    prior_pairs = [(a, a + 1) for a in range(100, 900, 2)]
+
+    teams = plan_teams(students, 4, keep_together, keep_apart, prior_pairs, seed=7)
+
+    assert sorted(s for team in teams for s in team) == students
+    assert {len(team) for team in teams} == {4}
+    team_of = {s: i for i, team in enumerate(teams) for s in team}
+    assert team_of[1] == team_of[2] == team_of[3]
+    assert team_of[10] != team_of[11] and team_of[10] != team_of[12]
+    assert all(team_of[a] != team_of[b] for a, b in prior_pairs)
+
+    sizes = sorted(len(team) for team in plan_teams(range(10), 4))
+    assert sizes == [3, 3, 4]
+    with pytest.raises(ValueError):
+        plan_teams(range(10), 2, keep_together=[(0, 1), (1, 2)])
+
+
+def test_plan_teams_rejects_constraints_that_cannot_all_hold():
+    # Two teams of two cannot separate three mutually kept-apart students
+    with pytest.raises(ValueError):
+        plan_teams(range(4), 2, keep_apart=[(0, 1), (1, 2), (0, 2)])
+    # Three pairs cannot be split over two teams of three without breaking a pair
+    with pytest.raises(ValueError):
+        plan_teams(range(6), 3, keep_together=[(0, 1), (2, 3), (4, 5)])
+    with pytest.raises(ValueError):
+        plan_teams(range(6), 3, keep_together=[(0, 1)], keep_apart=[(0, 1)])
+
+    # Satisfiable constraints are met exactly, with sizes still balanced
+    teams = plan_teams(range(7), 3, keep_together=[(0, 1)], keep_apart=[(0, 2), (2, 3), (3, 4)], seed=3)
+    team_of = {s: i for i, team in enumerate(teams) for s in team}
+    assert sorted(len(team) for team in teams) == [2, 2, 3]
+    assert team_of[0] == team_of[1]
+    assert all(team_of[a] != team_of[b] for a, b in [(0, 2), (2, 3), (3, 4)])
+
+
+@pytest.mark.django_db
+def test_form_teams_writes_teams_for_unassigned_students():
+    course = Course.objects.create(name="Auto", code="AUTO1")
+    profiles = [UserProfile.objects.create(user=User.objects.create(username=f"s{i}")) for i in range(7)]
+    course.students.add(*profiles)
+    Team.objects.create(name="Team 1", course=course).members.add(profiles[0])
+
+    teams = form_teams(course, 3, seed=1)
+
+    assert [team.name for team in teams] == ["Team 2", "Team 3"]
+    assert sorted(team.members.count() for team in teams) == [3, 3]
+    assert form_teams(course, 3) == []
+
+
+# -----------------------------
+# 12) Course cloning
+# -----------------------------
+@pytest.mark.django_db
+def test_clone_course_copies_templates_questions_and_forms():
+    instructor = UserProfile.objects.create(user=User.objects.create(username="prof"))
+    course = Course.objects.create(name="Algorithms", code="CS101-F24", semester="Fall", year=2024)
+    course.instructors.add(instructor)
+    Course.objects.create(name="Taken", code="CS101-S25")
+    tpl = FormTemplate.objects.create(title="Eval", created_by=instructor, course=course)
+    for order in range(3):
+        Question.objects.create(template=tpl, text=f"Q{order}", order=order)
+    now = timezone.now()
+    form = Form.objects.create(
+        title="Midterm", template=tpl, course=course, created_by=instructor,
+        publication_date=now - timedelta(days=2), closing_date=now - timedelta(days=1),
+    )
+
+    clone = course.clone(include_forms=True, date_offset=timedelta(days=120))
+
+    assert (clone.semester, clone.year, clone.code) == ("Spring", 2025, "CS101-S25-2")
+    assert clone.course_join_code and clone.course_join_code != course.course_join_code
+    assert list(clone.instructors.all()) == [instructor]
+    new_tpl = clone.form_templates.get()
+    assert list(new_tpl.questions.values_list("text", flat=True)) == ["Q0", "Q1", "Q2"]
+    new_form = clone.forms.get()
+    assert new_form.template == new_tpl and new_form.status == Form.DRAFT
+    assert new_form.closing_date == form.closing_date + timedelta(days=120)
+    assert tpl.questions.count() == 3
+
+
+@pytest.mark.django_db
+def test_clone_course_with_full_length_code_skips_truncated_variants():
+    course = Course.objects.create(name="Design", code="ENGINEERING-DESIGN01", semester="Fall", year=2024)
+    # Numbered variants cut the base shorter to make room for the counter
+    Course.objects.create(name="Taken", code="ENGINEERING-DESI-S25")
+    Course.objects.create(name="Taken 2", code="ENGINEERING-DE-S25-2")
+
+    clone = course.clone()
+    assert clone.code == "ENGINEERING-DE-S25-3"
+    assert len(clone.code) == 20
+
+
+# -----------------------------
+# 13) template_create_edit saves questions as one diff
+# -----------------------------
+@pytest.mark.django_db
+def test_template_save_applies_question_diff(client):
+    admin_user = User.objects.create_user("tpladmin", password="pass")
+    padmin = UserProfile.objects.create(user=admin_user, admin=True)
+    course = Course.objects.create(name="Tpl", code="TPL1")
+    tpl = FormTemplate.objects.create(title="Eval", created_by=padmin, course=course)
+    keep = Question.objects.create(template=tpl, text="Keep", order=0)
+    edit = Question.objects.create(template=tpl, text="Edit me", order=1)
+    drop = Question.objects.create(template=tpl, text="Drop", order=2)
+    _login_as_admin(client, admin_user)
+
+    payload = {
+        "title": "Eval v2",
+        "questions": [
+            {"id": "temp_1", "text": "New likert", "type": "likert"},
+            {"id": str(keep.id), "text": "Keep", "type": "likert"},
+            {"id": str(edit.id), "text": "Edited", "type": "open"},
+            {"id": "temp_2", "text": "New open", "type": "open"},
+        ],
+    }
+    url = reverse("template_edit", args=[course.id, tpl.id])
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(url, json.dumps(payload), content_type="application/json")
+
+    result = response.json()
+    assert result["status"] == "success"
+    assert set(result["question_ids"]) == {"temp_1", "temp_2"}
+    assert list(tpl.questions.values_list("text", "question_type")) == [
+        ("New likert", "likert"), ("Keep", "likert"), ("Edited", "open"), ("New open", "open"),
+    ]
+    assert tpl.questions.get(text="New open").id == result["question_ids"]["temp_2"]
+    assert not Question.objects.filter(id=drop.id).exists()
+    question_writes = [q["sql"] for q in queries.captured_queries
+                       if "pages_question" in q["sql"] and not q["sql"].startswith("SELECT")]
+    assert len([sql for sql in question_writes if sql.startswith("INSERT")]) == 1
+    assert len([sql for sql in question_writes if sql.startswith("UPDATE")]) == 1
+
+    payload["questions"][0]["type"] = "bogus"
+    response = client.post(url, json.dumps(payload), content_type="application/json")
+    assert response.status_code == 400
+    assert tpl.questions.count() == 4
+
+
+# -----------------------------
+# 14) Active forms keep the questions they opened with
+# -----------------------------
+@pytest.mark.django_db
+def test_active_form_questions_are_frozen(client):
+    data = _create_minimal_course_with_team_and_form()
+    form, course = data["form"], data["course"]
+    pa, pb = data["profiles"]["a"], data["profiles"]["b"]
+    q1, q2 = data["questions"]["q1"], data["questions"]["q2"]
+    form.status = Form.DRAFT
+    form.closing_date = timezone.now() + timedelta(days=1)
+    form.save(force_status=True)
+
+    _login_as_admin(client, data["users"]["admin"])
+    client.post(reverse("form_open", args=[course.id, form.id]))
+    form.refresh_from_db()
+    assert form.status == Form.ACTIVE
+    assert [q[0] for q in form.question_snapshot["questions"]] == [q1.id, q2.id]
+
+    # Editing the template afterwards does not change the open form
+    q1.text = "Changed"
+    q1.save()
+    Question.objects.create(template=form.template, text="Added later", order=3)
+    form.refresh_from_db()
+    assert [q.text for q in form.get_questions()] == ["Effort", "Teamwork"]
+
+    # Submissions are validated against the frozen set only
+    client.force_login(data["users"]["a"])
+    response = FormResponse.objects.create(form=form, evaluator=pa, evaluatee=pb)
+    client.post(reverse("submit_form_response", args=[response.id]),
+                {f"likert_{q1.id}": "4", f"likert_{q2.id}": "5"})
+    response.refresh_from_db()
+    assert response.submitted
+    assert response.answers.count() == 2
+
+
+@pytest.mark.django_db
+def test_template_edit_after_freeze_keeps_frozen_questions(client):
+    data = _create_minimal_course_with_team_and_form()
+    form, course, tpl = data["form"], data["course"], data["form"].template
+    pa, pb = data["profiles"]["a"], data["profiles"]["b"]
+    q1, q2 = data["questions"]["q1"], data["questions"]["q2"]
+    form.status = Form.ACTIVE
+    form.closing_date = timezone.now() + timedelta(days=1)
+    form.save(force_status=True)
+    form.freeze_questions()
+
+    # Drop the first question and turn the second into an open one
+    _login_as_admin(client, data["users"]["admin"])
+    payload = {"title": "Eval v2", "questions": [{"id": str(q2.id), "text": "Teamwork", "type": "open"}]}
+    result = client.post(reverse("template_edit", args=[course.id, tpl.id]),
+                         json.dumps(payload), content_type="application/json").json()
+    assert result["status"] == "success"
+    replacement = result["question_ids"][str(q2.id)]
+    assert [q.id for q in tpl.current_questions()] == [replacement]
+    assert set(Question.objects.filter(retired=True).values_list("id", flat=True)) == {q1.id, q2.id}
+
+    # The frozen form still asks, and accepts answers to, its original questions
+    client.force_login(data["users"]["a"])
+    response = FormResponse.objects.create(form=form, evaluator=pa, evaluatee=pb)
+    client.post(reverse("submit_form_response", args=[response.id]),
+                {f"likert_{q1.id}": "4", f"likert_{q2.id}": "5"})
+    response.refresh_from_db()
+    assert response.submitted
+    assert sorted(response.answers.values_list("question_id", "likert_answer")) == [(q1.id, 4), (q2.id, 5)]
+
+
+@pytest.mark.django_db
+def test_forms_are_frozen_however_they_go_live(client):
+    data = _create_minimal_course_with_team_and_form()
+    form, course, tpl = data["form"], data["course"], data["form"].template
+    pa, pb = data["profiles"]["a"], data["profiles"]["b"]
+    q1, q2 = data["questions"]["q1"], data["questions"]["q2"]
+    now = timezone.now()
+
+    # A form that went live before snapshots existed: its answers pin its questions
+    Form.objects.filter(id=form.id).update(status=Form.ACTIVE, question_snapshot=None, questions_frozen_at=None)
+    response = FormResponse.objects.create(form=form, evaluator=pa, evaluatee=pb, submitted=True)
+    Answer.objects.create(response=response, question=q1, likert_answer=4)
+    _login_as_admin(client, data["users"]["admin"])
+    payload = {"title": "Eval v2", "questions": [{"id": str(q2.id), "text": "Teamwork", "type": "likert"}]}
+    client.post(reverse("template_edit", args=[course.id, tpl.id]),
+                json.dumps(payload), content_type="application/json")
+    assert Question.objects.get(id=q1.id).retired
+    assert Answer.objects.filter(question=q1).exists()
+
+    # The data migration snapshots such forms with the template's current questions
+    import_module("pages.migrations.0015_freeze_open_form_questions").freeze_open_forms(apps, None)
+    form.refresh_from_db()
+    assert [row[0] for row in form.question_snapshot["questions"]] == [q2.id]
+
+    # Forms opened by the dashboard's bulk transition are frozen as well
+    scheduled = Form.objects.create(title="Due", template=tpl, course=course, created_by=data["profiles"]["admin"],
+                                    publication_date=now + timedelta(hours=1), closing_date=now + timedelta(days=1))
+    assert scheduled.status == Form.SCHEDULED and scheduled.question_snapshot is None
+    Form.objects.filter(id=scheduled.id).update(publication_date=now - timedelta(hours=1))
+    client.get(reverse("forms_dashboard"))
+    scheduled.refresh_from_db()
+    assert scheduled.status == Form.ACTIVE and scheduled.question_snapshot is not None
+
+    # And so are forms that save() closes once their closing date has passed
+    late = Form.objects.create(title="Late", template=tpl, course=course, created_by=data["profiles"]["admin"],
+                               publication_date=now + timedelta(hours=1), closing_date=now + timedelta(days=1))
+    late.publication_date, late.closing_date = now - timedelta(days=2), now - timedelta(days=1)
+    late.save()
+    late.refresh_from_db()
+    assert late.status == Form.CLOSED and late.question_snapshot is not None
+
+
+# -----------------------------
+# 15) Question sets are cached per template version
+# -----------------------------
+@pytest.mark.django_db
+def test_question_set_cache_hits_and_invalidation(django_assert_num_queries):
+    data = _create_minimal_course_with_team_and_form()
+    tpl = data["form"].template
+    question_sets.clear()
+
+    first = FormTemplate.objects.get(id=tpl.id).get_question_set()
+    assert [q.text for q in first.likert] == ["Effort", "Teamwork"]
+    tpl.refresh_from_db()
+    with django_assert_num_queries(0):
+        assert tpl.get_question_set() is first
+    assert question_sets.stats()["hits"] == 1
+    assert question_sets.stats()["misses"] == 1
+
+    # Saving a question bumps the template version so the next read reloads
+    Question.objects.create(template=tpl, text="Comments", question_type=Question.OPEN_ENDED, order=3)
+    tpl.refresh_from_db()
+    reloaded = tpl.get_question_set()
+    assert [q.text for q in reloaded.open] == ["Comments"]
+    assert question_sets.stats()["misses"] == 2
+
+    data["questions"]["q1"].delete()
+    tpl.refresh_from_db()
+    assert [q.text for q in tpl.get_question_set().all] == ["Teamwork", "Comments"]
+
+
+@pytest.mark.django_db
+def test_course_delete_does_not_mark_each_question():
+    owner = UserProfile.objects.create(user=User.objects.create_user("owner", password="pass"))
+
+    def delete_course(code, question_count):
+        course = Course.objects.create(name=code, code=code)
+        tpl = FormTemplate.objects.create(title=code, course=course, created_by=owner)
+        Question.objects.bulk_create([Question(template=tpl, text=f"Q{i}", order=i) for i in range(question_count)])
+        with CaptureQueriesContext(connection) as queries:
+            course.delete()
+        assert not FormTemplate.objects.filter(id=tpl.id).exists()
+        return len(queries.captured_queries)
+
+    assert delete_course("SMALL1", 2) == delete_course("LARGE1", 20)
+
+
+@pytest.mark.django_db
+def test_frozen_snapshots_share_the_question_set_cache(django_assert_num_queries):
+    form = _create_minimal_course_with_team_and_form()["form"]
+    form.freeze_questions()
+    snapshot_sets.clear()
+
+    first = Form.objects.get(id=form.id).get_question_set()
+    with django_assert_num_queries(0):
+        assert form.get_question_set() is first
+    assert cache_stats()["snapshots"]["hits"] == 1
+    assert cache_stats()["snapshots"]["misses"] == 1
+
+    # Re-freezing takes a new version, so the old entry is not served
+    form.freeze_questions()
+    assert form.get_question_set() is not first
+    assert cache_stats()["snapshots"]["misses"] == 2
+
+
+# -----------------------------
+# 16) Join codes come from a keyed permutation, not a retry loop
+# -----------------------------
+@pytest.mark.django_db
+def test_bulk_created_courses_get_distinct_join_codes(django_assert_max_num_queries):
+    codes = {code_for(number, key=b"k") for number in range(5000)}
+    assert len(codes) == 5000
+    assert all(re.fullmatch(r"[0-9A-Z]{8}", code) for code in codes)
+
+    # An older code that happens to match the next number in the sequence is skipped
+    Course.objects.create(name="Old", code="OLD1", course_join_code=code_for(0))
+    # Query count does not grow with the number of courses
+    with CaptureQueriesContext(connection) as small:
+        Course.objects.bulk_create([Course(name=f"Small {i}", code=f"SMALL{i}") for i in range(20)])
+    with django_assert_max_num_queries(len(small.captured_queries)):
+        courses = Course.objects.bulk_create([
+            Course(name=f"Course {i}", code=f"BULK{i}") for i in range(200)
+        ])
+    join_codes = [course.course_join_code for course in courses]
+    assert all(join_codes)
+    assert len(set(join_codes)) == 200
+    assert code_for(0) not in join_codes
+    assert Course.objects.filter(course_join_code__in=join_codes).count() == 200
+    assert Course.objects.values('course_join_code').distinct().count() == 221
+
+
+def test_join_code_key_has_no_committed_fallback(settings, monkeypatch):
+    settings.JOIN_CODE_KEY = None
+    with pytest.raises(ImproperlyConfigured):
+        code_for(0)
+
+    # Production refuses to start without its own secrets
+    settings_file = settings.BASE_DIR / "project_main" / "settings.py"
+    monkeypatch.setenv("DJANGO_ENV", "production")
+    monkeypatch.setenv("DJANGO_SECRET_KEY", "secret")
+    monkeypatch.delenv("DJANGO_JOIN_CODE_KEY", raising=False)
+    with pytest.raises(ImproperlyConfigured):
+        runpy.run_path(str(settings_file))
+    monkeypatch.setenv("DJANGO_JOIN_CODE_KEY", "join-key")
+    assert runpy.run_path(str(settings_file))["JOIN_CODE_KEY"] == "join-key"
+
+
+# -----------------------------
+# 17) Join codes resolve through the cache and failed attempts are limited
+# -----------------------------
+@pytest.mark.django_db
+def test_join_code_attempts_are_limited(client):
+    cache.clear()
+    course = Course.objects.create(name="Join", code="JOIN1")
+    user = User.objects.create_user("joiner", password="pass")
+    profile = UserProfile.objects.create(user=user)
+    client.force_login(user)
+    url = reverse("join_course")
+
+    for _ in range(MAX_FAILED_JOINS_PER_USER):
+        response = client.post(url, {"join_code": "NOPE0000"})
+        assert "Invalid course code" in response.content.decode()
+
+    # Once the limit is reached even a valid code is refused without a lookup
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(url, {"join_code": course.course_join_code})
+    assert "Too many invalid join attempts" in response.content.decode()
+    assert not any("course_join_code\" =" in q["sql"] for q in queries.captured_queries)
+    assert not course.students.filter(id=profile.id).exists()
+
+    cache.clear()
+    response = client.post(url, {"join_code": course.course_join_code.lower()})
+    assert course.students.filter(id=profile.id).exists()
+    # The code is now cached, so another student joins without any course lookup
+    other = User.objects.create_user("joiner2", password="pass")
+    other_profile = UserProfile.objects.create(user=other)
+    client.force_login(other)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(url, {"join_code": course.course_join_code})
+    assert "Successfully joined Join" in response.content.decode()
+    assert course.students.filter(id=other_profile.id).exists()
+    assert not any('FROM "pages_course" WHERE' in q["sql"] for q in queries.captured_queries)
+
+    # A replaced code stops resolving
+    old_code = course.course_join_code
+    course.course_join_code = "NEWCODE1"
+    course.save()
+    response = client.post(url, {"join_code": old_code})
+    assert "Invalid course code" in response.content.decode()
+
+
+@pytest.mark.django_db
+def test_join_code_attempts_are_limited_per_address(client, settings):
+    settings.MAX_FAILED_JOINS_PER_USER = 3
+    settings.MAX_FAILED_JOINS_PER_IP = 5
+    cache.clear()
+    course = Course.objects.create(name="Join", code="JOIN1")
+    url = reverse("join_course")
+
+    # Throwaway accounts behind one address share its limit
+    for name, attempts in (("guess1", 3), ("guess2", 2)):
+        user = User.objects.create_user(name, password="pass")
+        UserProfile.objects.create(user=user)
+        client.force_login(user)
+        for _ in range(attempts):
+            response = client.post(url, {"join_code": "NOPE0000"}, REMOTE_ADDR="10.0.0.1")
+            assert "Invalid course code" in response.content.decode()
+
+    user = User.objects.create_user("guess3", password="pass")
+    profile = UserProfile.objects.create(user=user)
+    client.force_login(user)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.post(url, {"join_code": course.course_join_code}, REMOTE_ADDR="10.0.0.1")
+    assert "Too many invalid join attempts" in response.content.decode()
+    assert not any("course_join_code\" =" in q["sql"] for q in queries.captured_queries)
+
+    # The same user from another address is not affected
+    response = client.post(url, {"join_code": course.course_join_code}, REMOTE_ADDR="10.0.0.2")
+    assert course.students.filter(id=profile.id).exists()
+
+    # Saves that leave the join code alone skip the stored-code lookup
+    with CaptureQueriesContext(connection) as queries:
+        course.name = "Joined"
+        course.save(update_fields=["name"])
+    assert len(queries.captured_queries) == 1
+
+
+# -----------------------------
+# 18) Avatars are stored as content-addressed thumbnails
+# -----------------------------
+@pytest.mark.django_db
+def test_avatar_upload_is_resized_and_deduplicated(client, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    buffer = io.BytesIO()
+    Image.new("RGB", (800, 600), "navy").save(buffer, "PNG")
+
+    users = []
+    for name in ("ava", "bob"):
+        user = User.objects.create_user(name, password="pass")
+        UserProfile.objects.create(user=user)
+        client.force_login(user)
+        client.post(reverse("home"), {
+            "first_name": name,
+            "avatar": SimpleUploadedFile("me.png", buffer.getvalue(), content_type="image/png"),
+        })
+        users.append(UserProfile.objects.get(user=user))
+
+    # The same picture is stored once and shared
+    assert users[0].avatar.name == users[1].avatar.name
+    assert avatar_storage.is_hashed(users[0].avatar.name)
+    for size in ("small", "medium", "large"):
+        name = avatar_storage.thumbnail_name(users[0].avatar.name, size)
+        with Image.open(avatar_storage.path(name)) as image:
+            assert image.size == (avatar_storage.SIZES[size],) * 2
+
+    response = client.get(avatar_storage.url(avatar_storage.thumbnail_name(users[0].avatar.name, "small")))
+    assert response.status_code == 200
+    assert "immutable" in response["Cache-Control"]
+
+    response = client.post(reverse("home"), {
+        "first_name": "bob",
+        "avatar": SimpleUploadedFile("bad.png", b"not an image", content_type="image/png"),
+    })
+    assert UserProfile.objects.get(user__username="bob").avatar.name == users[1].avatar.name
+
+
+@pytest.mark.django_db
+def test_avatar_view_only_serves_avatar_names(client, settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / "media")
+    (tmp_path / "media" / "avatars").mkdir(parents=True)
+    (tmp_path / "media" / "avatars" / "Old_photo-1.jpeg").write_bytes(b"legacy")
+    (tmp_path / "media" / "secret.txt").write_text("secret")
+    (tmp_path / "settings.py").write_text("SECRET_KEY = 'x'")
+    user = User.objects.create_user("viewer", password="pass")
+    UserProfile.objects.create(user=user)
+    client.force_login(user)
+
+    assert client.get("/media/avatars/Old_photo-1.jpeg").status_code == 200
+    for path in ("/media/avatars/..%2Fsecret.txt", "/media/avatars/../secret.txt",
+                 "/media/avatars/..%2F..%2Fsettings.py", "/media/avatars/%2E%2E/secret.txt",
+                 "/media/avatars/.", "/media/secret.txt", "/secret.txt"):
+        assert client.get(path).status_code == 404, path
+
+
+# -----------------------------
+# 19) OAuth setup is an explicit, repeatable command
+# -----------------------------
+@pytest.mark.django_db
+def test_setup_oauth_is_idempotent():
+    for _ in range(2):
+        call_command("setup_oauth", stdout=io.StringIO())
+    app = SocialApp.objects.get(provider="google")
+    assert app.sites.count() == 1
+
+
+# -----------------------------
+# 20) SQLite connections are tuned for concurrent writes
+# -----------------------------
+@pytest.mark.django_db
+def test_sqlite_connection_pragmas():
+    if connection.vendor != "sqlite":
+        pytest.skip("SQLite only")
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous")
+        assert cursor.fetchone()[0] == 1  # NORMAL
+        cursor.execute("PRAGMA busy_timeout")
+        assert cursor.fetchone()[0] == 20000
+    assert connection.transaction_mode == "IMMEDIATE"
+
+
+# -----------------------------
+# 21) Results and dashboard queries use the composite indexes
+# -----------------------------
+def _query_plans(queries):
+    plans = []
+    with connection.cursor() as cursor:
+        for query in queries:
+            if query["sql"].startswith(("SELECT", "UPDATE")):
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                plans.append(" ".join(str(row[-1]) for row in cursor.fetchall()))
+    return plans
+
+
+@pytest.mark.django_db
+def test_hot_queries_use_composite_indexes(client):
+    if connection.vendor != "sqlite":
+        pytest.skip("EXPLAIN QUERY PLAN is SQLite syntax")
+    data = _create_minimal_course_with_team_and_form()
+    course, form = data["course"], data["form"]
+    pa, pb = data["profiles"]["a"], data["profiles"]["b"]
+    for evaluator, evaluatee in ((pa, pb), (pb, pa)):
+        FormResponse.objects.create(form=form, evaluator=evaluator, evaluatee=evaluatee, submitted=True)
+
+    _login_as_admin(client, data["users"]["admin"])
+    client.get(reverse("course_detail", args=[course.id]))
+
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get(reverse("form_results", args=[course.id, form.id])).status_code == 200
+        assert client.get(reverse("forms_dashboard")).status_code == 200
+    plans = " | ".join(_query_plans(queries.captured_queries))
+    assert "response_form_evaluatee_idx" in plans
+    assert "form_course_status_close_idx" in plans
+    assert "form_status_publish_idx" in plans
+
+    with CaptureQueriesContext(connection) as queries:
+        list(FormResponse.objects.filter(form=form, evaluator=pa))
+        list(Question.objects.filter(template=form.template, question_type=Question.LIKERT_SCALE))
+    plans = " | ".join(_query_plans(queries.captured_queries))
+    assert "question_template_type_idx" in plans
+    # A student's own responses are served by the unique (form, evaluator, evaluatee) index
+    assert "pages_formresponse_form_id_evaluator_id_evaluatee_id" in plans
+
+
+# -----------------------------
+# 22) Logging in only writes the profile when something changed
+# -----------------------------
+@pytest.mark.django_db
+def test_login_profile_sync_skips_unchanged_writes(client, settings):
+    settings.ADMIN_EMAILS = frozenset(["Boss@Example.com"])
+    user = User.objects.create_user("boss", email="boss@example.com", password="pass")
+    SocialAccount.objects.create(user=user, provider="google", uid="1",
+                                 extra_data={"given_name": "Bo", "family_name": "Ss"})
+
+    client.login(username="boss", password="pass")
+    profile = UserProfile.objects.get(user=user)
+    assert (profile.first_name, profile.last_name, profile.admin) == ("Bo", "Ss", True)
+    user.refresh_from_db()
+    assert user.is_superuser and user.is_staff
+
+    client.logout()
+    with CaptureQueriesContext(connection) as queries:
+        client.login(username="boss", password="pass")
+    profile_queries = [q["sql"] for q in queries.captured_queries if "pages_userprofile" in q["sql"]]
+    assert len(profile_queries) == 1
+    assert profile_queries[0].startswith("SELECT")
+
+    settings.ADMIN_EMAILS = frozenset()
+    client.logout()
+    client.login(username="boss", password="pass")
+    assert not UserProfile.objects.get(user=user).admin
+
+
+# -----------------------------
+# 23) The profile is loaded with the user in one query
+# -----------------------------
+@pytest.mark.django_db
+def test_request_user_profile_is_loaded_with_user(client):
+    user = User.objects.create_user("solo", password="pass")
+    UserProfile.objects.create(user=user)
+    client.force_login(user)
+    client.get(reverse("courses"))
+
+    with CaptureQueriesContext(connection) as queries:
+        assert client.get(reverse("courses")).status_code == 200
+    user_queries = [q["sql"] for q in queries.captured_queries
+                    if 'FROM "auth_user"' in q["sql"] or 'FROM "pages_userprofile"' in q["sql"]]
+    assert len(user_queries) == 1
+    assert "pages_userprofile" in user_queries[0]
+
+
+# -----------------------------
+# 24) Results export streams long and wide CSV/XLSX
+# -----------------------------
+@pytest.mark.django_db
+def test_form_export_streams_long_and_wide_layouts(client):
+    data = _create_minimal_course_with_team_and_form()
+    course, form = data["course"], data["form"]
+    pa, pb = data["profiles"]["a"], data["profiles"]["b"]
+    q1, q2 = data["questions"]["q1"], data["questions"]["q2"]
+    for evaluator, evaluatee, scores in ((pa, pb, (4, 5)), (pb, pa, (3, 2))):
+        response = FormResponse.objects.create(form=form, evaluator=evaluator, evaluatee=evaluatee, submitted=True)
+        Answer.objects.create(response=response, question=q1, likert_answer=scores[0])
+        Answer.objects.create(response=response, question=q2, likert_answer=scores[1])
+
+    _login_as_admin(client, data["users"]["admin"])
+    url = reverse("form_export", args=[course.id, form.id])
+
+    response = client.get(url)
+    assert response.streaming
+    rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+    assert rows[0] == ["evaluator", "evaluatee", "team", "question", "value"]
+    assert ["studentb", "studenta", "Team A", "Effort", "3"] in rows
+    assert len(rows) == 5
+
+    response = client.get(url, {"layout": "wide"})
+    rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+    assert rows[0] == ["team", "evaluatee", "evaluators", "Effort", "Teamwork"]
+    assert ["Team A", "studentb", "1", "4.0", "5.0"] in rows
+
+    response = client.get(url, {"format": "xlsx", "layout": "wide"})
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+    sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+    assert sheet.count("<row>") == 3 and "Teamwork" in sheet
+
+    assert client.get(url, {"format": "pdf"}).status_code == 400
+
+
+def test_xlsx_cells_drop_characters_xml_cannot_hold():
+    cell = ElementTree.fromstring(_xlsx_cell("Great\x00 work\x0b <3 & \x1f\ttabs\nnewlines"))
+    assert cell.find("is/t").text == "Great work <3 & \ttabs\nnewlines"
+
+
+# -----------------------------
+# 25) Per-student feedback reports are bundled into one zip
+# -----------------------------
+@pytest.mark.django_db
+def test_feedback_report_bundle(client, tmp_path, monkeypatch):
+    data = _create_minimal_course_with_team_and_form()
+    course, form = data["course"], data["form"]
+    pa, pb = data["profiles"]["a"], data["profiles"]["b"]
+    q1, q2 = data["questions"]["q1"], data["questions"]["q2"]
+    comment = Question.objects.create(template=form.template, text="Comments",
+                                      question_type=Question.OPEN_ENDED, order=3)
+    response = FormResponse.objects.create(form=form, evaluator=pa, evaluatee=pb, submitted=True)
+    Answer.objects.create(response=response, question=q1, likert_answer=4)
+    Answer.objects.create(response=response, question=q2, likert_answer=2)
+    Answer.objects.create(response=response, question=comment, text_answer="Great <b>work</b>")
+
+    path = tmp_path / "reports.zip"
+    out = io.StringIO()
+    call_command("export_feedback_reports", str(path), course.code, "--workers", "2", stdout=out)
+    assert "Wrote 2 report(s)" in out.getvalue()
+
+    archive = zipfile.ZipFile(path)
+    names = sorted(archive.namelist())
+    assert names == [f"cs101/studenta-{pa.id}.html", f"cs101/studentb-{pb.id}.html"]
+    report = archive.read(f"cs101/studentb-{pb.id}.html").decode()
+    assert "4.00" in report and "2.00" in report
+    assert "Great &lt;b&gt;work&lt;/b&gt;" in report
+
+    # The admin action renders inside the request; only the command uses a pool
+    def no_pool(*args, **kwargs):
+        raise AssertionError("the admin action must not start worker processes")
+    monkeypatch.setattr("pages.reports.ProcessPoolExecutor", no_pool)
+
+    admin_user = data["users"]["admin"]
+    User.objects.filter(id=admin_user.id).update(is_staff=True, is_superuser=True)
+    client.force_login(User.objects.get(id=admin_user.id))
+    response = client.post(reverse("admin:pages_course_changelist"), {
+        "action": "download_feedback_reports", "_selected_action": [course.id],
+    })
+    assert response["Content-Type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+    assert len(archive.namelist()) == 2
+
+
+# -----------------------------
+# 26) Results pages answer conditional GETs with 304 until data changes
+# -----------------------------
+@pytest.mark.django_db
+def test_results_pages_support_conditional_get(client):
+    data = _create_minimal_course_with_team_and_form()
+    course, form = data["course"], data["form"]
+    pa, pb = data["profiles"]["a"], data["profiles"]["b"]
+    response = FormResponse.objects.create(form=form, evaluator=pa, evaluatee=pb, submitted=True)
+    answer = Answer.objects.create(response=response, question=data["questions"]["q1"], likert_answer=4)
+    Form.objects.filter(id=form.id).update(status=Form.PUBLISHED)
+
+    _login_as_admin(client, data["users"]["admin"])
+    client.get(reverse("course_detail", args=[course.id]))
+
+    for url in (reverse("form_results", args=[course.id, form.id]),
+                reverse("member_feedback", args=[course.id, form.id, pb.id]),
+                reverse("performance", args=[course.id])):
+        first = client.get(url)
+        assert first.status_code == 200
+        assert first.has_header("ETag") and first.has_header("Last-Modified")
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        assert cached.status_code == 304
+        assert not any("pages_answer" in q["sql"] and "AVG" in q["sql"].upper() for q in queries.captured_queries)
+        for page in (first, cached):
+            assert "private" in page["Cache-Control"] and "no-cache" in page["Cache-Control"]
+            assert "Cookie" in page["Vary"]
+
+    url = reverse("form_results", args=[course.id, form.id])
+    etag = client.get(url)["ETag"]
+    answer.likert_answer = 2
+    answer.save()
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+    answer.delete()
+    etag_after_delete = client.get(url)["ETag"]
+    assert etag_after_delete != etag
+
+    # Renamed teams and members change the page without touching any response
+    team = data["team"]
+    team.name = "Renamed Team"
+    team.save()
+    renamed = client.get(url, HTTP_IF_NONE_MATCH=etag_after_delete)
+    assert renamed.status_code == 200 and "Renamed Team" in renamed.content.decode()
+    pb.first_name = "Renamed"
+    pb.save()
+    etag = client.get(url, HTTP_IF_NONE_MATCH=renamed["ETag"])["ETag"]
+
+    # Login rotates the CSRF secret, so a page cached before it must not be reused
+    client.logout()
+    _login_as_admin(client, data["users"]["admin"])
+    client.get(reverse("course_detail", args=[course.id]))
+    relogged = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert relogged.status_code == 200
+
+    # A new course in the navbar changes the page as well
+    Course.objects.create(name="Another Course", code="CS999")
+    assert client.get(url, HTTP_IF_NONE_MATCH=relogged["ETag"]).status_code == 200
+
+
+# -----------------------------
+# 27) Instructors get live completion counts over Server-Sent Events
+# -----------------------------
+@pytest.mark.django_db
+def test_completion_stream_sends_snapshot_and_published_updates():
+    data = _create_minimal_course_with_team_and_form()
+    course, form, team = data["course"], data["form"], data["team"]
+    pa, pb = data["profiles"]["a"], data["profiles"]["b"]
+    FormResponse.objects.create(form=form, evaluator=pa, evaluatee=pb, submitted=True)
+    FormResponse.objects.create(form=form, evaluator=pb, evaluatee=pa, submitted=False)
+
+    snapshot = team_completion(form)
+    assert snapshot["teams"] == [{"id": team.id, "name": team.name, "submitted": 1, "expected": 2}]
+
+    def parse(chunk):
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        return json.loads(chunk.split("data: ", 1)[1])
+
+    async def stream(user):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        await UserProfile.objects.filter(id=data["profiles"]["admin"].id).aupdate(admin=True)
+        response = await client.get(reverse("form_completion_stream", args=[course.id, form.id]))
+        if not response.streaming:
+            return response.status_code, []
+        assert response["Content-Type"] == "text/event-stream"
+        chunks = aiter(response.streaming_content)
+        await anext(chunks)  # retry interval
+        first = parse(await anext(chunks))
+        await sync_to_async(FormResponse.objects.filter(evaluator=pb).update)(submitted=True)
+        await sync_to_async(publish_completion)(form)
+        second = parse(await anext(chunks))
+        await chunks.aclose()
+        return response.status_code, [first, second]
+
+    status, events = async_to_sync(stream)(data["users"]["admin"])
+    assert status == 200
+    assert events[0]["teams"][0]["submitted"] == 1
+    assert events[1]["teams"][0]["submitted"] == 2
+    assert not completion_broker.has_subscribers(form.id)
+
+    status, events = async_to_sync(stream)(data["users"]["a"])
+    assert status == 403
+
+
+@pytest.mark.django_db
+def test_completion_falls_back_to_polling_under_wsgi(client):
+    data = _create_minimal_course_with_team_and_form()
+    course, form = data["course"], data["form"]
+    FormResponse.objects.create(form=form, evaluator=data["profiles"]["a"], evaluatee=data["profiles"]["b"],
+                                submitted=True)
+    form.status = Form.ACTIVE
+    form.closing_date = timezone.now() + timedelta(days=1)
+    form.save(force_status=True)
+
+    _login_as_admin(client, data["users"]["admin"])
+
+    # The test client is a WSGI request: the page polls instead of opening a stream
+    page = client.get(reverse("form_results", args=[course.id, form.id])).content.decode()
+    assert "EventSource" not in page
+    assert reverse("form_completion", args=[course.id, form.id]) in page
+
+    counts = client.get(reverse("form_completion", args=[course.id, form.id])).json()
+    assert counts["submitted"] == 1 and counts["teams"][0]["id"] == data["team"].id
+
+    # The stream itself sends one snapshot and ends rather than holding the worker
+    response = client.get(reverse("form_completion_stream", args=[course.id, form.id]))
+    assert not response.streaming
+    assert response["Content-Type"] == "text/event-stream"
+    assert response.content.decode().count("event: completion") == 1
+
+    client.force_login(data["users"]["a"])
+    assert client.get(reverse("form_completion", args=[course.id, form.id])).status_code == 403
+
+
+# -----------------------------
+# 28) Email and course-selection endpoints run as async views
+# -----------------------------
+@pytest.mark.django_db
+def test_async_email_and_selection_views(client, mailoutbox):
+    data = _create_minimal_course_with_team_and_form()
+    course, form = data["course"], data["form"]
+    for view in (views.form_open, views.invite_students, views.update_selected_course):
+        assert asyncio.iscoroutinefunction(view)
+
+    _login_as_admin(client, data["users"]["admin"])
+
+    response = client.post(reverse("invite_students", args=[course.id]), {"email": "new@example.com"})
+    assert response.status_code == 302
+    assert mailoutbox[-1].to == ["new@example.com"]
+    assert course.course_join_code in mailoutbox[-1].body
+
+    form.status = Form.CLOSED
+    form.save(force_status=True)
+    client.post(reverse("form_open", args=[course.id, form.id]))
+    form.refresh_from_db()
+    assert form.status == Form.ACTIVE
+    assert sorted(mailoutbox[-1].to) == ["a@example.com", "b@example.com"]
+
+    response = client.post(reverse("update_selected_course"), json.dumps({"course_id": course.id}),
+                           content_type="application/json")
+    assert response.json() == {"success": True}
+    assert client.session["selected_course_id"] == course.id
+
+    client.force_login(data["users"]["a"])
+    other = Course.objects.create(name="Other", code="OTH1")
+    response = client.post(reverse("update_selected_course"), json.dumps({"course_id": other.id}),
+                           content_type="application/json")
+    assert response.status_code == 403
+
+
+# -----------------------------
+# 29) Synthetic load data is complete and deterministic
+# -----------------------------
+@pytest.mark.django_db
+def test_generate_load_data_is_deterministic():
+    sizes = dict(courses=2, students=6, team_size=3, forms=3, likert_questions=2, open_questions=1, seed=7)
+    counts = generate_load_data(prefix="a", **sizes)
+    assert counts["courses"] == 2 and counts["students"] == 12 and counts["teams"] == 4
+    assert counts["responses"] == 2 * 3 * 6 * 2  # courses * forms * students * (team_size - 1)
+    assert counts["answers"] == Answer.objects.count()
+    assert Form.objects.filter(status=Form.ACTIVE).count() == 2
+    assert all(form.get_questions() for form in Form.objects.all())
+    form = Form.objects.filter(status=Form.ACTIVE).first()
+    seeded = form.question_snapshot
+    form.freeze_questions()
+    assert form.question_snapshot == seeded
+
+    def likert_values(prefix):
+        return list(Answer.objects.filter(response__form__course__code__startswith=prefix.upper() + "-")
+                    .order_by("id").values_list("likert_answer", "text_answer"))
+
+    generate_load_data(prefix="b", **sizes)
+    assert likert_values("a") == likert_values("b")
+
+    with pytest.raises(CommandError):
+        call_command("generate_load_data", "--prefix", "a")
@@ -21,6 +21,7 @@ urlpatterns = [
     path('courses/<int:course_id>/', views.course_detail, name='course_detail'),
     path('courses/create/', views.create_course, name='create_course'),
     path('courses/<int:course_id>/edit/', views.edit_course, name='edit_course'),
+    path('courses/<int:course_id>/clone/', views.clone_course, name='clone_course'),
     
     # Forms dashboard for admins
     path('forms-dashboard/', views.forms_dashboard, name='forms_dashboard'),
@@ -47,6 +48,9 @@ urlpatterns = [
     
     # Form results management URLs
     path('courses/<int:course_id>/forms/<int:form_id>/results/', views.form_results, name='form_results'),
+    path('courses/<int:course_id>/forms/<int:form_id>/export/', views.form_export, name='form_export'),
+    path('courses/<int:course_id>/forms/<int:form_id>/completion/', views.form_completion, name='form_completion'),
+    path('courses/<int:course_id>/forms/<int:form_id>/completion/stream/', views.form_completion_stream, name='form_completion_stream'),
     path('courses/<int:course_id>/forms/<int:form_id>/member/<int:member_id>/', views.member_feedback, name='member_feedback'),
     path('responses/<int:response_id>/edit/', views.edit_response, name='edit_response'),
     path('forms/<int:form_id>/publish/', views.publish_results, name='publish_results'),
@@ -54,6 +58,7 @@ urlpatterns = [
     
     # Form submission for managing teams in courses
     path("courses/<int:course_id>/teams/create/", views.create_team, name="create_team"),
+    path("courses/<int:course_id>/teams/auto/", views.auto_create_teams, name="auto_create_teams"),
     path("teams/<int:team_id>/edit/", views.edit_team, name="edit_team"),
     path('form/<int:course_id>/<int:form_id>/results/<int:member_id>/', views.member_feedback, name='member_feedback'),
     path('update-selected-course/', views.update_selected_course, name='update_selected_course'),
@@ -63,6 +68,9 @@ urlpatterns = [
     path('courses/<int:course_id>/roster/', views.roster, name='roster'),
     path('roster/', views.roster, name='roster_current'),
 
+    # Avatars
+    path('media/<path:name>', views.avatar, name='avatar'),
+
     # Invite
     path('courses/<int:course_id>/invite/', views.invite_students, name='invite_students'),
 ] 
\ No newline at end of file
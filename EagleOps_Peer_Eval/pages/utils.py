@@ -1,5 +1,101 @@
-from django.db.models import Avg, Count
-from .models import FormResponse, Answer, Question
+from django.core.paginator import Paginator
+from django.db.models import (
+    Avg, Count, Case, F, IntegerField, Max, OuterRef, Prefetch, Q, Subquery, Sum, Value, When, Window
+)
+from django.db.models.functions import Coalesce, RowNumber
+from .models import Team, Course, Form, FormTemplate, FormResponse, Answer, Question, UserProfile
+
+DASHBOARD_PAGE_SIZE = 25
+
+# Context name, status and ordering of each forms dashboard section
+DASHBOARD_SECTIONS = [
+    ('active_forms', Form.ACTIVE, 'closing_date'),
+    ('scheduled_forms', Form.SCHEDULED, 'publication_date'),
+    ('closed_pending_forms', Form.CLOSED, '-closing_date'),
+    ('published_forms', Form.PUBLISHED, '-closing_date'),
+    ('draft_forms', Form.DRAFT, '-created_at'),
+]
+
+
+def _count_subquery(queryset, group_field, count_expr):
+    """Wraps a grouped count as a scalar subquery that yields 0 when nothing matches"""
+    counted = queryset.order_by().values(group_field).annotate(n=count_expr).values('n')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+def _aggregate_subquery(queryset, expression):
+    """Wraps an aggregate over every row of queryset as a scalar subquery"""
+    aggregated = queryset.order_by().annotate(_all=Value(1)).values('_all').annotate(result=expression)
+    return Subquery(aggregated.values('result'))
+
+def results_version(course_id, form_id=None, published_only=False):
+    """
+    Fingerprint of the data shown on the results and performance pages: the
+    latest change and the row count of the course's forms (or one form), their
+    templates, responses, answers and team memberships, plus the latest change
+    to the course's teams and their members' profiles (renames). Counts catch
+    deletions, which leave no updated_at behind. Read in one query; None if the course
+    (or form) does not exist.
+    """
+    forms = Form.objects.filter(course_id=course_id)
+    if form_id is not None:
+        forms = forms.filter(id=form_id)
+    if published_only:
+        forms = forms.filter(status=Form.PUBLISHED)
+    responses = FormResponse.objects.filter(form__in=forms)
+    answers = Answer.objects.filter(response__form__in=forms)
+    memberships = Team.members.through.objects.filter(team__course_id=course_id)
+    teams = Team.objects.filter(course_id=course_id)
+    profiles = UserProfile.objects.filter(teams__course_id=course_id)
+
+    row = Course.objects.filter(id=course_id).annotate(
+        forms_count=_aggregate_subquery(forms, Count('id')),
+        forms_changed=_aggregate_subquery(forms, Max('updated_at')),
+        statuses=_aggregate_subquery(forms, Count('id', filter=Q(status=Form.PUBLISHED))),
+        templates_changed=_aggregate_subquery(forms, Max('template__updated_at')),
+        responses_count=_aggregate_subquery(responses, Count('id')),
+        responses_changed=_aggregate_subquery(responses, Max('updated_at')),
+        answers_count=_aggregate_subquery(answers, Count('id')),
+        answers_changed=_aggregate_subquery(answers, Max('updated_at')),
+        memberships_count=_aggregate_subquery(memberships, Count('id')),
+        teams_changed=_aggregate_subquery(teams, Max('updated_at')),
+        profiles_changed=_aggregate_subquery(profiles, Max('updated_at')),
+    ).values(
+        'forms_count', 'forms_changed', 'statuses', 'templates_changed', 'responses_count',
+        'responses_changed', 'answers_count', 'answers_changed', 'memberships_count',
+        'teams_changed', 'profiles_changed',
+    ).first()
+    if row is None or (form_id is not None and not row['forms_count']):
+        return None
+    return row
+
+def with_completion(forms):
+    """
+    Annotate a Form queryset with the numbers behind Form.completion_rate:
+    - completed_count: submitted responses
+    - expected_count: evaluations expected across all assigned teams
+    Everything is computed in SQL, so listing N forms stays a single query.
+    """
+    TeamMember = Team.members.through
+
+    completed = _count_subquery(
+        FormResponse.objects.filter(form=OuterRef('pk'), submitted=True),
+        'form', Count('id')
+    )
+
+    # Joining each membership row to every membership row of the same team
+    # yields sum(n * n) pairs; the memberships alone yield sum(n)
+    team_members = TeamMember.objects.filter(team__assigned_forms=OuterRef('pk'))
+    pairs = _count_subquery(team_members, 'team__assigned_forms', Count('team__members'))
+    singles = _count_subquery(team_members, 'team__assigned_forms', Count('id', distinct=True))
+
+    return forms.annotate(
+        completed_count=completed,
+        expected_count=Case(
+            When(self_assessment=True, then=pairs),
+            default=pairs - singles,
+            output_field=IntegerField(),
+        ),
+    )
 
 def calculate_team_scores(form, team):
     """
@@ -9,74 +105,149 @@ def calculate_team_scores(form, team):
     - member_scores: individual member averages
     - question_averages: average per question
     """
-    # Get all likert questions for this form
-    likert_questions = form.template.questions.filter(question_type='likert')
-    
-    # Get all responses for this team
-    responses = FormResponse.objects.filter(
-        form=form,
-        evaluator__teams=team,
-        submitted=True
-    ).prefetch_related('answers')
-    
-    # Calculate team average
-    team_average = responses.filter(
-        answers__question__in=likert_questions
-    ).aggregate(avg_score=Avg('answers__likert_answer'))['avg_score'] or 0
-    
-    # Calculate member averages
-    member_scores = {}
-    for member in team.members.all():
-        # Get responses received by this member
-        member_responses = responses.filter(evaluatee=member)
-        
-        # Calculate average score received
-        member_avg = member_responses.filter(
-            answers__question__in=likert_questions
-        ).aggregate(avg_score=Avg('answers__likert_answer'))['avg_score'] or 0
-        
-        # Get completion stats
-        total_evaluations = member_responses.count()
-        completed_evaluations = member_responses.filter(submitted=True).count()
-        
-        # Get a preview feedback (first text response)
-        preview_feedback = None
-        text_responses = member_responses.filter(
-            answers__question__question_type='open'
-        ).prefetch_related('answers__question').first()
-        
-        if text_responses:
-            text_answer = text_responses.answers.filter(
-                question__question_type='open'
-            ).first()
-            if text_answer:
-                preview_feedback = {
-                    'question': text_answer.question.text,
-                    'text': text_answer.text_answer,
-                    'evaluator': text_responses.evaluator.full_name
-                }
-        
-        member_scores[member] = {
-            'average_score': member_avg,
-            'completion': f"{completed_evaluations}/{total_evaluations}",
-            'responses': member_responses,
-            'preview_feedback': preview_feedback
-        }
-    
-    # Calculate question averages
-    question_averages = {}
-    for question in likert_questions:
-        avg = responses.filter(
-            answers__question=question
-        ).aggregate(avg_score=Avg('answers__likert_answer'))['avg_score'] or 0
-        question_averages[question] = avg
-    
-    return {
-        'team_average': team_average,
-        'member_scores': member_scores,
-        'question_averages': question_averages
+    return calculate_form_scores(form, [team])[team]
+
+def calculate_form_scores(form, teams):
+    """
+    calculate_team_scores() for several teams of a form at once, in a fixed
+    number of queries however many teams, members and responses there are.
+    Returns {team: scores}; prefetch the teams' members (with their users) to
+    keep it that way.
+    """
+    likert_questions = form.get_question_set().likert
+    likert_ids = [q.id for q in likert_questions]
+    team_ids = [team.id for team in teams]
+    responses = FormResponse.objects.filter(form=form, evaluator__teams__in=team_ids, submitted=True)
+    answers = Answer.objects.filter(
+        response__form=form,
+        response__evaluator__teams__in=team_ids,
+        response__submitted=True
+    )
+
+    # Likert sums per (team, evaluatee, question), averaged below at each level
+    likert_sums = answers.filter(question__in=likert_ids).values_list(
+        'response__evaluator__teams', 'response__evaluatee_id', 'question_id'
+    ).annotate(total=Sum('likert_answer'), count=Count('likert_answer'))
+    totals = {}
+    for team_id, evaluatee_id, question_id, total, count in likert_sums:
+        for key in ((team_id,), (team_id, 'member', evaluatee_id), (team_id, 'question', question_id)):
+            sums = totals.setdefault(key, [0, 0])
+            sums[0] += total or 0
+            sums[1] += count
+
+    def average(*key):
+        total, count = totals.get(key, (0, 0))
+        return total / count if count else 0
+
+    completed = {
+        (team_id, evaluatee_id): count
+        for team_id, evaluatee_id, count in responses.values_list('evaluator__teams', 'evaluatee_id')
+        .annotate(count=Count('id'))
     }
 
+    # Preview feedback: the first open answer of the first response holding one
+    previews = {}
+    open_answers = answers.filter(question__question_type='open').select_related(
+        'question', 'response__evaluator__user'
+    ).annotate(team_id=F('response__evaluator__teams')).order_by('response_id', 'id')
+    for answer in open_answers:
+        key = (answer.team_id, answer.response.evaluatee_id)
+        if key not in previews:
+            previews[key] = {
+                'question': answer.question.text,
+                'text': answer.text_answer,
+                'evaluator': answer.response.evaluator.full_name
+            }
+
+    scores = {}
+    for team in teams:
+        member_scores = {}
+        for member in team.members.all():
+            completed_evaluations = completed.get((team.id, member.id), 0)
+            member_scores[member] = {
+                'average_score': average(team.id, 'member', member.id),
+                'completion': f"{completed_evaluations}/{completed_evaluations}",
+                'responses': responses.filter(evaluator__teams=team, evaluatee=member),
+                'preview_feedback': previews.get((team.id, member.id))
+            }
+        scores[team] = {
+            'team_average': average(team.id),
+            'member_scores': member_scores,
+            'question_averages': {
+                question: average(team.id, 'question', question.id) for question in likert_questions
+            }
+        }
+    return scores
+
+def response_scores(forms, evaluatees=None):
+    """
+    Average likert answer of every submitted response on forms, in one query.
+    Returns {(form id, evaluatee id): [average of each response]}, in response
+    order; responses without likert answers are left out.
+    """
+    answers = Answer.objects.filter(
+        response__form__in=forms,
+        response__submitted=True,
+        question__question_type=Question.LIKERT_SCALE,
+        likert_answer__isnull=False
+    )
+    if evaluatees is not None:
+        answers = answers.filter(response__evaluatee__in=evaluatees)
+    scores = {}
+    for form_id, evaluatee_id, _, score in answers.values_list(
+        'response__form_id', 'response__evaluatee_id', 'response_id'
+    ).annotate(score=Avg('likert_answer')).order_by('response_id'):
+        scores.setdefault((form_id, evaluatee_id), []).append(score)
+    return scores
+
+def open_answer_previews(forms, evaluatees=None, limit=3):
+    """
+    The first `limit` non-empty open-ended answers each evaluatee received on
+    each of forms, in one query. Returns {(form id, evaluatee id): [text]}.
+    """
+    answers = Answer.objects.filter(
+        response__form__in=forms,
+        response__submitted=True,
+        question__question_type=Question.OPEN_ENDED
+    ).exclude(text_answer__isnull=True).exclude(text_answer='')
+    if evaluatees is not None:
+        answers = answers.filter(response__evaluatee__in=evaluatees)
+    answers = answers.annotate(rank=Window(
+        RowNumber(),
+        partition_by=[F('response__form_id'), F('response__evaluatee_id')],
+        order_by=[F('response_id').asc(), F('id').asc()]
+    )).filter(rank__lte=limit).order_by('response_id', 'id')
+    previews = {}
+    for form_id, evaluatee_id, text in answers.values_list(
+        'response__form_id', 'response__evaluatee_id', 'text_answer'
+    ):
+        previews.setdefault((form_id, evaluatee_id), []).append(text)
+    return previews
+
+def get_dashboard_sections(course, params):
+    """
+    Build the paged sections of the forms dashboard.
+    Each section is one status; its page is read from '<section>_page' in params.
+    Returns a dictionary keyed by section name (plus 'templates') of Page objects.
+    """
+    forms = Form.objects.select_related('course', 'template')
+    templates = FormTemplate.objects.select_related('course').annotate(
+        num_questions=Count('questions', filter=Q(questions__retired=False))
+    )
+    if course:
+        forms = forms.filter(course=course)
+        templates = templates.filter(course=course)
+
+    sections = {}
+    for name, status, ordering in DASHBOARD_SECTIONS:
+        section = with_completion(forms.filter(status=status)).order_by(ordering, '-id')
+        sections[name] = Paginator(section, DASHBOARD_PAGE_SIZE).get_page(params.get(f'{name}_page'))
+
+    sections['templates'] = Paginator(
+        templates.order_by('-created_at', '-id'), DASHBOARD_PAGE_SIZE
+    ).get_page(params.get('templates_page'))
+    return sections
+
 def get_score_color(score):
     """Return color class based on score range"""
     if score >= 4:
@@ -98,29 +269,38 @@ def get_member_feedback(form, member):
         form=form,
         evaluatee=member,
         submitted=True
-    ).prefetch_related('answers__question')
-    
+    ).select_related('evaluator__user').prefetch_related(
+        Prefetch('answers', queryset=Answer.objects.filter(question__question_type='open')
+                 .select_related('question'), to_attr='text_answers')
+    )
+
     # Get likert questions and calculate averages
+    likert = form.get_question_set().likert
+    averages = dict(
+        Answer.objects.filter(
+            response__form=form,
+            response__evaluatee=member,
+            response__submitted=True,
+            question__in=[question.id for question in likert]
+        ).values_list('question_id').annotate(avg_score=Avg('likert_answer'))
+    )
     likert_questions = {}
-    for question in form.template.questions.filter(question_type='likert'):
-        avg = responses.filter(
-            answers__question=question
-        ).aggregate(avg_score=Avg('answers__likert_answer'))['avg_score'] or 0
+    for question in likert:
+        avg = averages.get(question.id) or 0
         likert_questions[question] = {
             'average': avg,
             'color': get_score_color(avg)
         }
-    
+
     # Get all text responses
     text_responses = []
     for response in responses:
-        text_answers = response.answers.filter(question__question_type='open')
-        if text_answers.exists():
+        if response.text_answers:
             text_responses.append({
                 'evaluator': response.evaluator,
-                'answers': text_answers
+                'answers': response.text_answers
             })
-    
+
     return {
         'likert_questions': likert_questions,
         'text_responses': text_responses
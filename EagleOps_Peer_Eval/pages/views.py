@@ -1,26 +1,114 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponseRedirect, JsonResponse, Http404
+from django.http import (
+    FileResponse, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseRedirect, JsonResponse, Http404,
+    StreamingHttpResponse
+)
+from django.utils.text import slugify
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import condition, require_POST
 from django.utils import timezone
 from django.urls import reverse
-from django.db.models import Count, Q
-from django.core.exceptions import PermissionDenied
+from django.db.models import Count, Prefetch, Q
+from django.core.exceptions import PermissionDenied, ValidationError
 from django.conf import settings
 from .models import Team, Course, FormTemplate, Question, Form, FormResponse, Answer, UserProfile
-from .utils import calculate_team_scores, get_member_feedback
+from .join_codes import JoinAttemptsExceeded, resolve_join_code
+from .storage import avatar_storage, validate_avatar
+from .exports import long_rows, wide_rows, stream_csv, stream_xlsx
+from .live import (
+    COMPLETION_POLL_INTERVAL, SSE_KEEPALIVE, SSE_RETRY, completion_broker, publish_completion, serves_streams,
+    sse_event, team_completion
+)
+from .utils import calculate_form_scores, get_member_feedback, open_answer_previews, response_scores, get_dashboard_sections, results_version, with_completion
+import functools
+import hashlib
 import json
 from django.contrib.auth import logout
+from django.db import transaction
 from django.db.utils import IntegrityError
 from django.contrib import messages
 from .forms import TeamForm
+from .context_processors import available_courses
+from .team_formation import form_teams
 from datetime import datetime
 from datetime import timedelta
 from django.core.mail import send_mail
+from asgiref.sync import sync_to_async
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 
 def local_now():
     return timezone.localtime(timezone.now())
 
+async def _auser_profile(request):
+    """request.user.userprofile for async views; the backend loads it with the user"""
+    user = await request.auser()
+    return await sync_to_async(lambda: user.userprofile)()
+
+# SMTP round trips run in their own thread pool rather than on the shared sync
+# thread, so a slow mail server does not hold up every other request
+_mail_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'EMAIL_SEND_THREADS', 16),
+                                    thread_name_prefix='send-mail')
+_asend_mail = sync_to_async(send_mail, thread_sensitive=False, executor=_mail_executor)
+
+def _results_version(request, course_id, form_id=None, published_only=False):
+    """results_version() for this request, read once for both ETag and Last-Modified"""
+    if not hasattr(request, '_results_version'):
+        request._results_version = results_version(course_id, form_id, published_only)
+    return request._results_version
+
+def _results_etag(request, course_id, form_id=None, member_id=None, published_only=False):
+    # Pending flash messages must be rendered, so those responses are never 304s
+    if 'messages' in request.COOKIES:
+        return None
+    version = _results_version(request, course_id, form_id, published_only)
+    if version is None:
+        return None
+    # The page also depends on who is viewing it and the navbar's courses, and its
+    # {% csrf_token %} values on the session's CSRF secret, which login rotates
+    navbar = list(available_courses(request.user.userprofile).values_list('id', 'name'))
+    key = (
+        request.user.pk, request.session.session_key, request.META.get('CSRF_COOKIE'),
+        request.session.get('selected_course_id'), navbar, sorted(version.items()),
+    )
+    return hashlib.md5(repr(key).encode()).hexdigest()
+
+def _results_last_modified(request, course_id, form_id=None, member_id=None, published_only=False):
+    if 'messages' in request.COOKIES:
+        return None
+    version = _results_version(request, course_id, form_id, published_only)
+    if version is None:
+        return None
+    changes = [value for name, value in version.items() if name.endswith('_changed') and value]
+    return max(changes, default=None)
+
+def _private_condition(**kwargs):
+    """
+    condition() for per-user pages: shared caches must not store them, and
+    browsers must revalidate, because the validators depend on the session
+    """
+    conditional = condition(**kwargs)
+
+    def decorator(view_func):
+        conditional_view = conditional(view_func)
+
+        @functools.wraps(view_func)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Cookie'])
+            return response
+        return inner
+    return decorator
+
+# Conditional GET for the results pages: unchanged pages get a 304 before any scoring runs
+results_condition = _private_condition(etag_func=_results_etag, last_modified_func=_results_last_modified)
+performance_condition = _private_condition(
+    etag_func=lambda request, course_id: _results_etag(request, course_id, published_only=True),
+    last_modified_func=lambda request, course_id: _results_last_modified(request, course_id, published_only=True),
+)
+
 def home_view(request):
     if request.method == "POST":
         # Check which form is being submitted (here we assume it's the profile update)
@@ -30,12 +118,29 @@ def home_view(request):
             profile.last_name = request.POST.get("last_name", profile.last_name)
             profile.bio = request.POST.get("bio", profile.bio)
             if request.FILES.get("avatar"):
-                profile.avatar = request.FILES["avatar"]
+                try:
+                    validate_avatar(request.FILES["avatar"])
+                    profile.avatar = request.FILES["avatar"]
+                except ValidationError as e:
+                    messages.error(request, e.messages[0])
             profile.save()
             # Optionally, add a success message or redirect
             return redirect(request.path)
     return render(request, "home.html")
 
+@login_required
+def avatar(request, name):
+    """Serves a stored avatar; content-addressed thumbnails are cached by the browser for a year"""
+    # Only avatar names reach the storage, so nothing outside avatars/ can be served
+    if not avatar_storage.is_avatar_name(name) or not avatar_storage.exists(name):
+        raise Http404("Avatar not found")
+    response = FileResponse(avatar_storage.open(name))
+    if avatar_storage.is_hashed(name):
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        patch_cache_control(response, private=True, max_age=3600)
+    return response
+
 def signin(request):
     """View for redirecting to login page"""
     # This view is mainly for explicitly naming the signin URL
@@ -63,15 +168,11 @@ def todo_view(request):
     if request.method == 'POST' and 'join_code' in request.POST:
         join_code = request.POST.get('join_code', '').strip().upper()
         if join_code:
-            try:
-                course = Course.objects.get(course_join_code=join_code)
-                if course.students.filter(id=user.id).exists():
-                    join_error_message = f"You are already enrolled in {course.name}."
-                else:
-                    course.students.add(user)
-                    join_success_message = f"Successfully joined {course.name}."
-            except Course.DoesNotExist:
-                join_error_message = "Invalid course code. Please check and try again."
+            join_error_message, join_success_message = join_course_by_code(request, user, join_code)
+            if join_error_message:
+                join_error_message += "."
+            else:
+                join_success_message += "."
         else:
             join_error_message = "Please enter a course join code."
 
@@ -215,7 +316,7 @@ def courses(request):
     
     if user_profile.admin:
         # Admins see all courses
-        course_list = Course.objects.all().order_by('name')
+        course_list = Course.objects.annotate(team_count=Count('teams')).order_by('name')
     else:
         # Get courses where user is an instructor
         instructor_courses = Course.objects.filter(instructors=user_profile)
@@ -228,11 +329,11 @@ def courses(request):
         
         # Combine the querysets and remove duplicates
         course_list = (instructor_courses | team_courses | enrolled_courses).distinct().order_by('name')
-    
-    # For non-admin users, attach the teams they belong to for each course
-    if not user_profile.admin:
-        for course in course_list:
-            course.user_teams = course.teams.filter(members=user_profile)
+        
+        # Attach the teams the user belongs to in each course
+        course_list = course_list.prefetch_related(
+            Prefetch('teams', queryset=Team.objects.filter(members=user_profile), to_attr='user_teams')
+        )
     
     context = {
         'courses': course_list,
@@ -241,6 +342,28 @@ def courses(request):
     
     return render(request, 'courses.html', context)
 
+def join_course_by_code(request, user_profile, join_code):
+    """
+    Enrolls the user in the course with this join code.
+    Returns (error_message, success_message), one of which is None.
+    """
+    try:
+        resolved = resolve_join_code(request, join_code)
+    except JoinAttemptsExceeded:
+        return 'Too many invalid join attempts. Please try again later', None
+    if resolved is None:
+        return 'Invalid course code. Please check and try again', None
+
+    # Enrollment only needs the course's id and name, so the course row is not loaded
+    course_id, course_name = resolved
+    Enrollment = Course.students.through
+
+    # Check if already enrolled
+    if Enrollment.objects.filter(course_id=course_id, userprofile_id=user_profile.id).exists():
+        return f'You are already enrolled in {course_name}', None
+    Enrollment.objects.create(course_id=course_id, userprofile_id=user_profile.id)
+    return None, f'Successfully joined {course_name}'
+
 @login_required
 def join_course(request):
     """View for students to join a course using a join code"""
@@ -254,18 +377,7 @@ def join_course(request):
         if not join_code:
             error_message = 'Please enter a course join code'
         else:
-            try:
-                course = Course.objects.get(course_join_code=join_code)
-                
-                # Check if already enrolled
-                if course.students.filter(id=user_profile.id).exists():
-                    error_message = f'You are already enrolled in {course.name}'
-                else:
-                    # Add student to course
-                    course.students.add(user_profile)
-                    success_message = f'Successfully joined {course.name}'
-            except Course.DoesNotExist:
-                error_message = 'Invalid course code. Please check and try again.'
+            error_message, success_message = join_course_by_code(request, user_profile, join_code)
     
     # Get courses where user is enrolled
     enrolled_courses = Course.objects.filter(students=user_profile)
@@ -290,11 +402,13 @@ def course_detail(request, course_id):
     
     user_profile = request.user.userprofile
     
-    # Get all teams for this course
-    course_teams = course.teams.all()
+    # Get all teams for this course, with member counts and members loaded up front
+    course_teams = course.teams.annotate(member_count=Count('members')).prefetch_related(
+        Prefetch('members', queryset=UserProfile.objects.select_related('user'))
+    )
     
     # Check if user has access to this course
-    is_team_member = course_teams.filter(members=user_profile).exists()
+    is_team_member = course.teams.filter(members=user_profile).exists()
     is_instructor = course.instructors.filter(id=user_profile.id).exists()
     is_student = course.students.filter(id=user_profile.id).exists()
     
@@ -302,10 +416,12 @@ def course_detail(request, course_id):
         return redirect('courses')
     
     # Get form templates for this course
-    templates = FormTemplate.objects.filter(course=course).order_by('-created_at')
+    templates = FormTemplate.objects.filter(course=course).annotate(
+        num_questions=Count('questions', filter=Q(questions__retired=False))
+    ).order_by('-created_at')
     
     # Get forms for this course
-    forms = Form.objects.filter(course=course).order_by('-created_at')
+    forms = with_completion(Form.objects.filter(course=course)).order_by('-created_at')
     
     # Find teams the user is a member of
     user_teams = course_teams.filter(members=user_profile)
@@ -313,12 +429,6 @@ def course_detail(request, course_id):
     # Get all students in the course
     enrolled_students = course.students.all().select_related('user').order_by('last_name', 'first_name')
     
-    # Get all students that are members of any team in this course but might not be directly enrolled
-    team_members = UserProfile.objects.filter(teams__course=course).select_related('user').distinct()
-    
-    # Combine both querysets using union to avoid the "Cannot combine a unique query with a non-unique query" error
-    all_students = enrolled_students.union(team_members).order_by('last_name', 'first_name')
-    
     context = {
         'course': course,
         'templates': templates,
@@ -391,66 +501,29 @@ def template_create_edit(request, course_id, template_id=None):
                     context = {
                         'course': course,
                         'template': template,
-                        'questions': template.questions.all() if template else [],
+                        'questions': template.current_questions() if template else [],
                         'is_edit': template is not None,
                         'error_message': error_message
                     }
                     return render(request, 'template_edit.html', context)
             
-            # Save or update the template
-            if template:
-                # Update existing template
-                template.title = title
-                template.description = description
-                template.save()
-                
-                # Delete questions not in the updated list (keeping only those with IDs in the new list)
-                question_ids = [q.get('id') for q in questions if q.get('id') and not str(q.get('id')).startswith('temp_')]
-                template.questions.exclude(id__in=question_ids).delete()
-            else:
-                # Create new template
-                template = FormTemplate.objects.create(
-                    title=title,
-                    description=description,
-                    course=course,
-                    created_by=user
-                )
-            
-            # Process each question from the request
-            for order, question_data in enumerate(questions):
-                question_id = question_data.get('id')
-                text = question_data.get('text', '')
-                question_type = question_data.get('type', Question.LIKERT_SCALE)
-                
-                # Skip temporary IDs (client-side only IDs)
-                if question_id and str(question_id).startswith('temp_'):
-                    question_id = None
-                
-                if question_id and not str(question_id).startswith('temp_'):
-                    try:
-                        # Update existing question
-                        Question.objects.filter(id=question_id, template=template).update(
-                            text=text,
-                            question_type=question_type,
-                            order=order
-                        )
-                    except Exception as e:
-                        print(f"Error updating question {question_id}: {str(e)}")
-                else:
-                    try:
-                        # Create new question
-                        Question.objects.create(
-                            template=template,
-                            text=text,
-                            question_type=question_type,
-                            order=order
-                        )
-                    except Exception as e:
-                        print(f"Error creating question: {str(e)}")
+            # Save the template and apply the question changes together
+            # (a new template is only kept once both have succeeded)
+            saved_template = template or FormTemplate(course=course, created_by=user)
+            saved_template.title = title
+            saved_template.description = description
+            with transaction.atomic():
+                saved_template.save()
+                question_ids = saved_template.save_questions(questions)
+            template = saved_template
             
             # Return response based on request type and action
             if is_ajax:
-                return JsonResponse({'status': 'success', 'template_id': template.id})
+                return JsonResponse({
+                    'status': 'success',
+                    'template_id': template.id,
+                    'question_ids': question_ids
+                })
             else:
                 # Redirect based on save_exit flag or preview flag
                 if is_preview:
@@ -460,6 +533,10 @@ def template_create_edit(request, course_id, template_id=None):
                 else:
                     return redirect('template_edit', course_id=course_id, template_id=template.id)
                 
+        except ValidationError as e:
+            error_message = ' '.join(e.messages)
+            if request.headers.get('Content-Type') == 'application/json':
+                return JsonResponse({'status': 'error', 'message': error_message}, status=400)
         except Exception as e:
             # Handle unexpected errors
             print(f"Error in template_create_edit: {str(e)}")
@@ -472,7 +549,7 @@ def template_create_edit(request, course_id, template_id=None):
     context = {
         'course': course,
         'template': template,
-        'questions': template.questions.all() if template else [],
+        'questions': template.current_questions() if template else [],
         'is_edit': template is not None,
         'error_message': error_message
     }
@@ -523,7 +600,7 @@ def form_create_edit(request, course_id, form_id=None):
         form = get_object_or_404(Form, id=form_id, course=course)
     
     templates = FormTemplate.objects.filter(course=course)
-    teams = Team.objects.filter(course=course)
+    teams = Team.objects.filter(course=course).annotate(member_count=Count('members'))
     
     if request.method == 'POST':
         try:
@@ -578,6 +655,8 @@ def form_create_edit(request, course_id, form_id=None):
             if form:
                 print(f"Updating existing form: {form.id}")
                 form.title = title
+                if form.template_id != template.id:
+                    form.clear_question_snapshot()
                 form.template = template
                 form.publication_date = publication_date
                 form.closing_date = closing_date
@@ -616,9 +695,13 @@ def form_create_edit(request, course_id, form_id=None):
     return render(request, 'form_edit.html', context)
 
 @login_required
-def form_open(request, course_id, form_id):
+async def form_open(request, course_id, form_id):
     if request.method == 'POST':
-        form = get_object_or_404(Form, id=form_id, course_id=course_id)
+        try:
+            form = await Form.objects.select_related('course').aget(id=form_id, course_id=course_id)
+        except Form.DoesNotExist:
+            raise Http404("No Form matches the given query.")
+        notify = False
         
         # If form is in draft status, check publication date to determine status
         if form.status == 'draft':
@@ -630,13 +713,13 @@ def form_open(request, course_id, form_id):
             else:
                 form.status = 'scheduled'
                 messages.success(request, f"Form '{form.title}' has been scheduled to open.")
-            form.save(force_status=True)  # Ensure the status is updated with force_status
+            await sync_to_async(form.save)(force_status=True)  # Ensure the status is updated with force_status
         
         # If form is closed, change to active
         elif form.status == 'closed':
             form.status = 'active'
             notify = True
-            form.save(force_status=True)  # Ensure the status is updated with force_status
+            await sync_to_async(form.save)(force_status=True)  # Ensure the status is updated with force_status
             messages.success(request, f"Form '{form.title}' has been reopened.")
         
         else:
@@ -645,7 +728,8 @@ def form_open(request, course_id, form_id):
         #if form has been opened successfully, send an email to students
         if notify: 
             try:
-                form_open_email(form.course, form)
+                emails = [email async for email in _student_emails(form.course)]
+                await _asend_mail(*form_open_message(form.course, form), settings.DEFAULT_FROM_EMAIL, emails)
                 messages.success(request, "Students have been notified via email.")
             except Exception as e:
                 messages.error(request, f"Error sending notification emails: {e}")
@@ -813,6 +897,32 @@ def edit_course(request, course_id):
         'current_year': timezone.now().year
     })
 
+@login_required
+@require_POST
+def clone_course(request, course_id):
+    """
+    Copy a course into the next semester. Only admins can clone courses.
+    """
+    user_profile = request.user.userprofile
+    course = get_object_or_404(Course, id=course_id)
+    
+    # Only admins can clone courses
+    if not user_profile.admin:
+        return redirect('courses')
+    
+    try:
+        offset_days = int(request.POST.get('date_offset_days') or 0)
+    except ValueError:
+        messages.error(request, "The date offset must be a whole number of days.")
+        return redirect('course_detail', course_id=course.id)
+    
+    new_course = course.clone(
+        include_forms=request.POST.get('include_forms') == 'on',
+        date_offset=timedelta(days=offset_days)
+    )
+    messages.success(request, f"Created {new_course.code} for {new_course.semester} {new_course.year}.")
+    return redirect('course_detail', course_id=new_course.id)
+
 @login_required
 def delete_course(request, course_id):
     """
@@ -881,6 +991,30 @@ def create_team(request, course_id):
     }
     return render(request, 'create_team.html', context)
 
+@login_required
+@require_POST
+def auto_create_teams(request, course_id):
+    """Split the course's students who have no team yet into balanced teams"""
+    user_profile = request.user.userprofile
+    course = get_object_or_404(Course, id=course_id)
+    
+    # Only admins can create teams
+    if not user_profile.admin:
+        return redirect('course_detail', course_id=course_id)
+    
+    try:
+        team_size = int(request.POST.get('team_size', ''))
+        teams = form_teams(course, team_size, avoid_prior=request.POST.get('avoid_prior') == 'on')
+    except ValueError as e:
+        messages.error(request, f"Could not form teams: {e}")
+        return redirect('create_team', course_id=course_id)
+    
+    if teams:
+        messages.success(request, f"Created {len(teams)} teams.")
+    else:
+        messages.info(request, "Every student in this course is already on a team.")
+    return redirect('course_detail', course_id=course_id)
+
 @login_required
 def edit_team(request, team_id):
     """View for editing an existing team"""
@@ -937,7 +1071,7 @@ def template_preview(request, course_id, template_id):
     context = {
         'course': course,
         'template': template,
-        'questions': template.questions.all().order_by('order'),
+        'questions': template.get_question_set().all,
         'preview_mode': True,
     }
     
@@ -954,13 +1088,14 @@ def form_preview(request, course_id, form_id):
     if not user.admin:
         raise PermissionDenied
     
-    # Get all questions from the template
-    questions = form.template.questions.all().order_by('order')
+    # Get the form's questions (frozen once the form has opened)
+    questions = form.get_questions()
     
     context = {
         'course': course,
         'form': form,
         'questions': questions,
+        'teams': form.teams.annotate(member_count=Count('members')),
         'preview_mode': True,
     }
     
@@ -1011,16 +1146,19 @@ def form_response(request, course_id, form_id, evaluatee_id):
     # If already submitted and past deadline, only allow viewing
     readonly = timezone.now() > form.closing_date and form_response.submitted
     
-    # Get questions from template
-    questions = form.template.questions.all().order_by('order')
+    # Get the form's questions (frozen once the form has opened)
+    questions = form.get_questions()
     
     # Get existing answers to pre-fill the form
+    question_types = {question.id: question.question_type for question in questions}
     existing_answers = {}
-    for answer in form_response.answers.all():
-        if answer.question.question_type == Question.LIKERT_SCALE:
-            existing_answers[answer.question.id] = answer.likert_answer
+    for question_id, likert_answer, text_answer in form_response.answers.values_list(
+        'question_id', 'likert_answer', 'text_answer'
+    ):
+        if question_types.get(question_id) == Question.LIKERT_SCALE:
+            existing_answers[question_id] = likert_answer
         else:
-            existing_answers[answer.question.id] = answer.text_answer
+            existing_answers[question_id] = text_answer
     
     context = {
         'course': course,
@@ -1051,9 +1189,9 @@ def submit_form_response(request, response_id):
         messages.error(request, "The deadline for this form has passed. Evaluations can no longer be submitted or edited.")
         return redirect('form_evaluations', course_id=form.course.id, form_id=form.id)
     
-    # Process answers
-    questions = form.template.questions.all()
-    for question in questions:
+    # Validate every answer against the form's questions before saving any
+    answers = []
+    for question in form.get_questions():
         if question.question_type == Question.LIKERT_SCALE:
             likert_value = request.POST.get(f'likert_{question.id}')
             text_value = None
@@ -1076,15 +1214,19 @@ def submit_form_response(request, response_id):
                 messages.error(request, f"Response required for question {question.text}")
                 return redirect('form_response', course_id=form.course.id, form_id=form.id, evaluatee_id=form_response.evaluatee.id)
         
-        # Create or update answer
-        answer, created = Answer.objects.update_or_create(
-            response=form_response,
-            question=question,
-            defaults={
-                'likert_answer': likert_value,
-                'text_answer': text_value
-            }
-        )
+        answers.append((question.id, likert_value, text_value))
+    
+    # Create or update answers
+    with transaction.atomic():
+        for question_id, likert_value, text_value in answers:
+            Answer.objects.update_or_create(
+                response=form_response,
+                question_id=question_id,
+                defaults={
+                    'likert_answer': likert_value,
+                    'text_answer': text_value
+                }
+            )
     
     # Mark response as submitted if it hasn't been already
     was_already_submitted = form_response.submitted
@@ -1096,6 +1238,9 @@ def submit_form_response(request, response_id):
         form_response.save()
         messages.success(request, f"Your evaluation for {form_response.evaluatee.full_name} has been updated.")
     
+    # Let instructors watching the form's completion stream see the submission
+    transaction.on_commit(lambda: publish_completion(form))
+
     # Redirect back to form evaluations page instead of todo
     return redirect('form_evaluations', course_id=form.course.id, form_id=form.id)
 
@@ -1107,7 +1252,7 @@ def form_evaluations(request, course_id, form_id):
     form = get_object_or_404(Form, id=form_id, course=course)
     
     # Check if user is in a team assigned to this form
-    user_teams = form.teams.filter(members=user)
+    user_teams = form.teams.filter(members=user).prefetch_related('members')
     if not user_teams.exists():
         messages.error(request, "You are not assigned to this form.")
         return redirect('todo')
@@ -1117,6 +1262,12 @@ def form_evaluations(request, course_id, form_id):
         messages.error(request, "This form is not currently active.")
         return redirect('todo')
     
+    # The user's existing responses for this form, by evaluatee
+    responses = {
+        response.evaluatee_id: response
+        for response in FormResponse.objects.filter(form=form, evaluator=user)
+    }
+    
     # Get all team members that the user needs to evaluate
     evaluatees = []
     for team in user_teams:
@@ -1128,11 +1279,7 @@ def form_evaluations(request, course_id, form_id):
                 continue
                 
             # Check if response already exists
-            response = FormResponse.objects.filter(
-                form=form,
-                evaluator=user,
-                evaluatee=member
-            ).first()
+            response = responses.get(member.id)
             
             evaluatees.append({
                 'member': member,
@@ -1150,6 +1297,7 @@ def form_evaluations(request, course_id, form_id):
     return render(request, 'form_evaluations.html', context)
 
 @login_required
+@results_condition
 def form_results(request, course_id, form_id):
     """View for professors to see and manage form results"""
     user = request.user.userprofile
@@ -1162,12 +1310,12 @@ def form_results(request, course_id, form_id):
         return redirect('course_detail', course_id=course_id)
     
     # Get all teams assigned to this form
-    teams = form.teams.all()
+    teams = form.teams.prefetch_related(
+        Prefetch('members', queryset=UserProfile.objects.select_related('user'))
+    )
     
     # Calculate scores for each team
-    team_scores = {}
-    for team in teams:
-        team_scores[team] = calculate_team_scores(form, team)
+    team_scores = calculate_form_scores(form, teams)
     
     # Get selected member if specified
     selected_member_id = request.GET.get('member')
@@ -1188,7 +1336,9 @@ def form_results(request, course_id, form_id):
         'team_scores': team_scores,
         'is_published': form.status == Form.PUBLISHED,
         'selected_member': selected_member,
-        'member_feedback': member_feedback
+        'member_feedback': member_feedback,
+        'completion_stream': serves_streams(request),
+        'completion_poll_interval': COMPLETION_POLL_INTERVAL,
     }
     
     return render(request, 'form_results.html', context)
@@ -1298,6 +1448,95 @@ def form_unpublish(request, course_id, form_id):
     return redirect('course_detail', course_id=course_id)
 
 @login_required
+def form_export(request, course_id, form_id):
+    """
+    Streams a form's submitted answers as CSV or XLSX (?format=csv|xlsx).
+    ?layout=long gives one row per answer; ?layout=wide one row per evaluatee.
+    """
+    user = request.user.userprofile
+    course = get_object_or_404(Course, id=course_id)
+    form = get_object_or_404(Form, id=form_id, course=course)
+
+    if not user.admin and not course.instructors.filter(id=user.id).exists():
+        messages.error(request, "You do not have permission to view these results.")
+        return redirect('course_detail', course_id=course_id)
+
+    export_format = request.GET.get('format', 'csv')
+    layout = request.GET.get('layout', 'long')
+    if export_format not in ('csv', 'xlsx') or layout not in ('long', 'wide'):
+        return HttpResponseBadRequest("Unknown export format or layout.")
+
+    rows = long_rows(form) if layout == 'long' else wide_rows(form)
+    if export_format == 'csv':
+        response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+    else:
+        response = StreamingHttpResponse(
+            stream_xlsx(rows),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+    filename = f"{slugify(form.title) or 'form'}-{layout}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@login_required
+def form_completion(request, course_id, form_id):
+    """Per-team completion as JSON, polled by the results page when the app is served over WSGI"""
+    user = request.user.userprofile
+    form = get_object_or_404(Form.objects.select_related('course'), id=form_id, course_id=course_id)
+    if not user.admin and not form.course.instructors.filter(id=user.id).exists():
+        return HttpResponseForbidden("You do not have permission to view these results.")
+
+    response = JsonResponse(team_completion(form))
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+@login_required
+async def form_completion_stream(request, course_id, form_id):
+    """
+    Server-Sent Events stream of per-team completion for instructors. Sends the
+    current counts, then a new snapshot whenever a response is submitted and a
+    keepalive comment while idle. Needs the ASGI server (project_main/asgi.py):
+    submissions are only published to streams in the same process. Under WSGI
+    it sends the current counts once and ends, so the client reconnects after
+    SSE_RETRY instead of holding a worker.
+    """
+    form = await Form.objects.select_related('course').filter(id=form_id, course_id=course_id).afirst()
+    if form is None:
+        raise Http404("No Form matches the given query.")
+    profile = await _auser_profile(request)
+    if not profile.admin and not await form.course.instructors.filter(id=profile.id).aexists():
+        return HttpResponseForbidden("You do not have permission to view these results.")
+
+    if not serves_streams(request):
+        snapshot = sse_event(await sync_to_async(team_completion)(form), event='completion')
+        response = HttpResponse(f"retry: {SSE_RETRY}\n\n{snapshot}", content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    async def events():
+        # Subscribe before reading the snapshot so no submission falls in between
+        queue = completion_broker.subscribe(form.id)
+        try:
+            yield f"retry: {SSE_RETRY}\n\n"
+            yield sse_event(await sync_to_async(team_completion)(form), event='completion')
+            while True:
+                try:
+                    snapshot = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield sse_event(snapshot, event='completion')
+        finally:
+            completion_broker.unsubscribe(form.id, queue)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies such as nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@login_required
+@results_condition
 def member_feedback(request, course_id, form_id, member_id):
     """Moderate open-ended feedback for a team member on a specific form."""
     user = request.user.userprofile
@@ -1339,7 +1578,7 @@ def member_feedback(request, course_id, form_id, member_id):
     return render(request, 'member_feedback.html', context)
 
 @require_POST
-def update_selected_course(request):
+async def update_selected_course(request):
     """
     View to update the selected course in the user's session.
     """
@@ -1351,9 +1590,9 @@ def update_selected_course(request):
             return JsonResponse({'error': 'No course ID provided'}, status=400)
             
         # Verify the course exists and user has access to it
-        user_profile = request.user.userprofile
+        user_profile = await _auser_profile(request)
         if user_profile.admin:
-            course = Course.objects.get(id=course_id)
+            course = await Course.objects.aget(id=course_id)
         else:
             # Get courses where user is an instructor
             instructor_courses = Course.objects.filter(instructors=user_profile)
@@ -1368,12 +1607,12 @@ def update_selected_course(request):
             available_courses = (instructor_courses | team_courses | enrolled_courses).distinct()
             
             try:
-                course = available_courses.get(id=course_id)
+                course = await available_courses.aget(id=course_id)
             except Course.DoesNotExist:
                 return JsonResponse({'error': 'Course not found or access denied'}, status=403)
         
         # Update the session
-        request.session['selected_course_id'] = course.id
+        await request.session.aset('selected_course_id', course.id)
         return JsonResponse({'success': True})
         
     except json.JSONDecodeError:
@@ -1383,7 +1622,45 @@ def update_selected_course(request):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+def _member_performance(member, forms, team_member_ids, scores, previews):
+    """
+    Performance of member on forms, from response_scores() and
+    open_answer_previews(). A form's team score averages the responses
+    received by the member's team on it, team_member_ids[form id].
+    """
+    member_data = {
+        'member': member,
+        'forms': [],
+        'average_score': 0,
+    }
+    total_score = 0
+    for form in forms:
+        member_scores = scores.get((form.id, member.id))
+        if not member_scores:
+            continue
+        form_score = sum(member_scores) / len(member_scores)
+        total_score += form_score
+
+        # Calculate team average score
+        team_scores = [
+            score for member_id in team_member_ids.get(form.id, [])
+            for score in scores.get((form.id, member_id), [])
+        ]
+        team_avg_score = sum(team_scores) / len(team_scores) if team_scores else 0
+
+        member_data['forms'].append({
+            'form': form,
+            'score': round(form_score, 2),
+            'team_score': round(team_avg_score, 2),
+            'open_responses': previews.get((form.id, member.id), []),
+        })
+
+    if member_data['forms']:
+        member_data['average_score'] = round(total_score / len(member_data['forms']), 2)
+    return member_data
+
 @login_required
+@performance_condition
 def performance_view(request, course_id):
     """
     View to show performance metrics and assessment results.
@@ -1399,10 +1676,15 @@ def performance_view(request, course_id):
     # If the user is an admin or instructor, they can view all team members' performance
     if user_profile.admin or user_profile in course.instructors.all():
         # Get all teams in the course
-        teams = Team.objects.filter(course=course)
+        teams = Team.objects.filter(course=course).prefetch_related(
+            Prefetch('members', queryset=UserProfile.objects.select_related('user')),
+            'assigned_forms'
+        )
         
-        # Get all forms for this course
-        forms = Form.objects.filter(course=course, status=Form.PUBLISHED)
+        # Get all forms for this course, with every response's score read up front
+        forms = list(Form.objects.filter(course=course, status=Form.PUBLISHED))
+        scores = response_scores(forms)
+        previews = open_answer_previews(forms)
         
         # Prepare performance data for each team and its members
         for team in teams:
@@ -1410,181 +1692,43 @@ def performance_view(request, course_id):
                 'team': team,
                 'members': [],
             }
+            assigned = {form.id for form in team.assigned_forms.all()}
+            team_forms = [form for form in forms if form.id in assigned]
+            member_ids = [member.id for member in team.members.all()]
+            team_member_ids = {form.id: member_ids for form in team_forms}
             
             for member in team.members.all():
-                member_data = {
-                    'member': member,
-                    'forms': [],
-                    'average_score': 0,
-                }
-                
-                total_score = 0
-                form_count = 0
-                
-                for form in forms:
-                    if form in team.assigned_forms.all():
-                        # Get all responses for this member in this form
-                        responses = FormResponse.objects.filter(
-                            form=form,
-                            evaluatee=member,
-                            submitted=True
-                        )
-                        
-                        if responses.exists():
-                            form_score = 0
-                            response_count = 0
-                            open_responses = []
-                            
-                            for response in responses:
-                                # Calculate average score for this response
-                                likert_answers = Answer.objects.filter(
-                                    response=response,
-                                    question__question_type=Question.LIKERT_SCALE
-                                )
-                                
-                                if likert_answers.exists():
-                                    avg_score = sum(a.likert_answer for a in likert_answers) / len(likert_answers)
-                                    form_score += avg_score
-                                    response_count += 1
-                                
-                                # Get open-ended responses
-                                text_answers = Answer.objects.filter(
-                                    response=response,
-                                    question__question_type=Question.OPEN_ENDED
-                                )
-                                for answer in text_answers:
-                                    if answer.text_answer:
-                                        open_responses.append(answer.text_answer)
-                            
-                            if response_count > 0:
-                                form_score = form_score / response_count
-                                total_score += form_score
-                                form_count += 1
-                                
-                                # Calculate team average score
-                                team_responses = FormResponse.objects.filter(
-                                    form=form,
-                                    evaluatee__in=team.members.all(),
-                                    submitted=True
-                                )
-                                team_score = 0
-                                team_response_count = 0
-                                
-                                for team_response in team_responses:
-                                    team_likert_answers = Answer.objects.filter(
-                                        response=team_response,
-                                        question__question_type=Question.LIKERT_SCALE
-                                    )
-                                    if team_likert_answers.exists():
-                                        team_avg = sum(a.likert_answer for a in team_likert_answers) / len(team_likert_answers)
-                                        team_score += team_avg
-                                        team_response_count += 1
-                                
-                                team_avg_score = team_score / team_response_count if team_response_count > 0 else 0
-                                
-                                member_data['forms'].append({
-                                    'form': form,
-                                    'score': round(form_score, 2),
-                                    'team_score': round(team_avg_score, 2),
-                                    'open_responses': open_responses[:3],  # Limit to 3 responses for preview
-                                })
-                
-                if form_count > 0:
-                    member_data['average_score'] = round(total_score / form_count, 2)
-                
-                team_data['members'].append(member_data)
+                team_data['members'].append(
+                    _member_performance(member, team_forms, team_member_ids, scores, previews)
+                )
             
             performance_data.append(team_data)
     
     # If the user is a student, show only their own performance
     else:
-        student_data = {
-            'member': user_profile,
-            'forms': [],
-            'average_score': 0,
-        }
-
         # Get the forms for the course
-        forms = Form.objects.filter(course=course, status=Form.PUBLISHED)
-
-        total_score = 0
-        form_count = 0
-
-        for form in forms:
-            # Get the student's responses for each form
-            responses = FormResponse.objects.filter(
-                form=form,
-                evaluatee=request.user.userprofile,
-                submitted=True
-            )
-            
-            if responses.exists():
-                form_score = 0
-                response_count = 0
-                open_responses = []
-                
-                for response in responses:
-                    # Calculate average score for this response
-                    likert_answers = Answer.objects.filter(
-                        response=response,
-                        question__question_type=Question.LIKERT_SCALE
-                    )
-                    
-                    if likert_answers.exists():
-                        avg_score = sum(a.likert_answer for a in likert_answers) / len(likert_answers)
-                        form_score += avg_score
-                        response_count += 1
-                    
-                    # Get open-ended responses
-                    text_answers = Answer.objects.filter(
-                        response=response,
-                        question__question_type=Question.OPEN_ENDED
-                    )
-                    for answer in text_answers:
-                        if answer.text_answer:
-                            open_responses.append(answer.text_answer)
-                
-                if response_count > 0:
-                    form_score = form_score / response_count
-                    total_score += form_score
-                    form_count += 1
-                    
-                    # Calculate team average score
-                    team = form.teams.filter(members=user_profile).first()
-                    if team:
-                        team_responses = FormResponse.objects.filter(
-                            form=form,
-                            evaluatee__in=team.members.all(),
-                            submitted=True
-                        )
-                        team_score = 0
-                        team_response_count = 0
-                        
-                        for team_response in team_responses:
-                            team_likert_answers = Answer.objects.filter(
-                                response=team_response,
-                                question__question_type=Question.LIKERT_SCALE
-                            )
-                            if team_likert_answers.exists():
-                                team_avg = sum(a.likert_answer for a in team_likert_answers) / len(team_likert_answers)
-                                team_score += team_avg
-                                team_response_count += 1
-                        
-                        team_avg_score = team_score / team_response_count if team_response_count > 0 else 0
-                    else:
-                        team_avg_score = 0
-
-                    student_data['forms'].append({
-                        'form': form,
-                        'score': round(form_score, 2),
-                        'team_score': round(team_avg_score, 2),
-                        'open_responses': open_responses[:3],  # Limit to 3 responses for preview
-                    })
-        
-        if form_count > 0:
-            student_data['average_score'] = round(total_score / form_count, 2)
-        
-        performance_data.append(student_data)
+        forms = list(Form.objects.filter(course=course, status=Form.PUBLISHED))
+
+        # The student's team on each form (the first one, if several) and its members
+        Assignment = Form.teams.through
+        form_teams = {}
+        for form_id, team_id in Assignment.objects.filter(
+            form__in=forms, team__members=user_profile
+        ).order_by('team_id').values_list('form_id', 'team_id'):
+            form_teams.setdefault(form_id, team_id)
+        team_members = {}
+        for team_id, member_id in Team.members.through.objects.filter(
+            team_id__in=set(form_teams.values())
+        ).values_list('team_id', 'userprofile_id'):
+            team_members.setdefault(team_id, []).append(member_id)
+
+        evaluatees = {user_profile.id}.union(*team_members.values())
+        scores = response_scores(forms, evaluatees)
+        previews = open_answer_previews(forms, [user_profile.id])
+        team_member_ids = {
+            form.id: team_members.get(form_teams.get(form.id), []) for form in forms
+        }
+        performance_data.append(_member_performance(user_profile, forms, team_member_ids, scores, previews))
     
     context = {
         'course': course,
@@ -1694,70 +1838,53 @@ def forms_dashboard(request):
         except Course.DoesNotExist:
             selected_course = None
     
-    # Define form statuses for categorization
-    active_status = Form.ACTIVE
-    scheduled_status = Form.SCHEDULED
-    closed_status = Form.CLOSED
-    published_status = Form.PUBLISHED
-    
-    # If a specific course is selected, filter by that course
-    if selected_course:
-        # Get templates for the selected course
-        templates = FormTemplate.objects.filter(course=selected_course).order_by('-created_at')
-        
-        # Get forms for the selected course, categorized by status
-        active_forms = Form.objects.filter(course=selected_course, status=active_status).order_by('closing_date')
-        scheduled_forms = Form.objects.filter(course=selected_course, status=scheduled_status).order_by('publication_date')
-        closed_pending_forms = Form.objects.filter(course=selected_course, status=closed_status).order_by('-closing_date')
-        published_forms = Form.objects.filter(course=selected_course, status=published_status).order_by('-closing_date')
-        
-        # Get courses for the dropdown
-        courses = Course.objects.all().order_by('name')
-    else:
-        # Get all templates across all courses
-        templates = FormTemplate.objects.all().order_by('-created_at')
-        
-        # Get all forms across all courses, categorized by status
-        active_forms = Form.objects.filter(status=active_status).order_by('closing_date')
-        scheduled_forms = Form.objects.filter(status=scheduled_status).order_by('publication_date')
-        closed_pending_forms = Form.objects.filter(status=closed_status).order_by('-closing_date')
-        published_forms = Form.objects.filter(status=published_status).order_by('-closing_date')
-        
-        # Get courses for the dropdown
-        courses = Course.objects.all().order_by('name')
-    
-    # Automatically move scheduled forms to active if their publication date has passed
+    # Move scheduled forms whose publication date has passed to active (or closed,
+    # if their closing date has passed as well) before the sections are read
     now = timezone.now()
-    for form in scheduled_forms:
-        if form.publication_date <= now:
-            form.status = active_status  # Move to active status
-            form.save()
+    due_forms = Form.objects.filter(status=Form.SCHEDULED, publication_date__lte=now)
+    if selected_course:
+        due_forms = due_forms.filter(course=selected_course)
+    due_forms = list(due_forms.select_related('template'))
+    if due_forms:
+        due_ids = [form.id for form in due_forms]
+        Form.objects.filter(id__in=due_ids, closing_date__gt=now).update(status=Form.ACTIVE, updated_at=now)
+        Form.objects.filter(id__in=due_ids, closing_date__lte=now).update(status=Form.CLOSED, updated_at=now)
+        # The bulk updates skip Form.save(), so freeze the opened forms' questions here
+        for form in due_forms:
+            if form.question_snapshot is None:
+                form.freeze_questions()
+    
+    sections = get_dashboard_sections(selected_course, request.GET)
     
     # Mark urgent forms (due within 24 hours)
-    for form in active_forms:
+    for form in sections['active_forms']:
         form.is_urgent = form.closing_date - now <= timedelta(hours=24)
     
+    # Get courses for the dropdown
+    courses = Course.objects.all().order_by('name')
+    
     context = {
         'selected_course': selected_course,
         'courses': courses,
-        'templates': templates,
-        'active_forms': active_forms,
-        'scheduled_forms': scheduled_forms,  # Add scheduled forms to context
-        'closed_pending_forms': closed_pending_forms,
-        'published_forms': published_forms,
         'available_courses': courses,  # For the navbar course selector
+        **sections,
     }
     
     return render(request, 'forms_dashboard.html', context)
 
-def invite_students(request, course_id):
+@login_required
+async def invite_students(request, course_id):
     if request.method == 'POST':
-        if not request.user.userprofile.admin:
+        user_profile = await _auser_profile(request)
+        if not user_profile.admin:
             messages.error(request, "You do not have permission to invite students.")
             return redirect('course_detail', course_id=course_id)
 
         email = request.POST.get('email')
-        course = get_object_or_404(Course, id=course_id)
+        try:
+            course = await Course.objects.aget(id=course_id)
+        except Course.DoesNotExist:
+            raise Http404("No Course matches the given query.")
 
         subject = f"You're invited to join {course.name}"
         message = f"""Hi there,
@@ -1774,14 +1901,18 @@ def invite_students(request, course_id):
             The EagleOps Team"""
 
         try:
-            send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email])
+            await _asend_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [email])
             messages.success(request, f"Invite sent to {email}")
         except Exception as e:
             messages.error(request, f"Error sending email: {e}")
 
-        return redirect('course_detail', course_id=course_id)
-    
-def form_open_email(course, form):
+    return redirect('course_detail', course_id=course_id)
+
+def _student_emails(course):
+    return course.students.values_list('user__email', flat=True)
+
+def form_open_message(course, form):
+    """Subject and body of the email sent to students when a form opens"""
     subject = f"New form published in {course.name}"
     message = f"""Hello,
 
@@ -1791,16 +1922,7 @@ def form_open_email(course, form):
 
         Best,
         The EagleOps Team"""
-    
-    students = course.students.all()
-    emails = [student.user.email for student in students]
-
-    try:
-        send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, emails)
-    except Exception as e:
-        # Log the error or handle it
-        print(f"Error sending email: {e}")
-        raise e  # Re-raise the exception to be caught by the calling function   
+    return subject, message
 
 def form_published_email(course, form):
     subject = f"New form published in {course.name}"
@@ -1813,8 +1935,7 @@ def form_published_email(course, form):
         Best,
         The EagleOps Team"""
     
-    students = course.students.all()
-    emails = [student.user.email for student in students]
+    emails = list(_student_emails(course))
 
     try:
         send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, emails)
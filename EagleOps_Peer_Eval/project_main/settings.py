@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import secrets
+
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -78,9 +81,10 @@ SOCIALACCOUNT_ADAPTER = "pages.adapters.CustomSocialAccountAdapter"
 # Disable redirect to signup page
 SOCIALACCOUNT_QUERY_EMAIL = False
 
+# ModelBackend and allauth's backend, loading the UserProfile with the user
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
-    'allauth.account.auth_backends.AuthenticationBackend',
+    'pages.backends.ProfileModelBackend',
+    'pages.backends.ProfileAuthenticationBackend',
     'social_core.backends.google.GoogleOAuth2',
 ]
 
@@ -100,6 +104,17 @@ SOCIALACCOUNT_PROVIDERS = {
     }
 }
 
+# Users with these emails are made admins (and superusers) when they log in
+ADMIN_EMAILS = frozenset([
+    'hazardo@bc.edu',
+    'spotob@bc.edu',
+    'mimi@bc.edu',
+    'villelas@bc.edu',
+    'brecker@bc.edu',
+    'careysh@bc.edu',
+    'wuaye@bc.edu',
+])
+
 LOGIN_REDIRECT_URL = '/'
 SOCIAL_AUTH_LOGIN_REDIRECT_URL = '/'
 SOCIAL_AUTH_GOOGLE_OAUTH2_LOGIN_REDIRECT_URL = '/'
@@ -148,6 +163,21 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            # Seconds a connection waits for a lock before "database is locked"
+            "timeout": 20,
+            # Take the write lock when a transaction starts, so concurrent writers
+            # queue on the timeout instead of failing when a read lock is upgraded
+            "transaction_mode": "IMMEDIATE",
+            # Run on every new connection: WAL lets readers continue during writes
+            "init_command": ";".join([
+                "PRAGMA journal_mode=WAL",
+                "PRAGMA synchronous=NORMAL",
+                "PRAGMA mmap_size=134217728",
+                "PRAGMA cache_size=-20000",
+                "PRAGMA temp_store=MEMORY",
+            ]),
+        },
     }
 }
 
@@ -187,6 +217,13 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 
 STATIC_URL = "/static/"
+
+# Uploaded files (avatars), served by pages.views.avatar. Kept outside the source
+# tree so no request can reach code, settings or the database through it.
+# Avatars uploaded before this setting existed sit in avatars/ next to manage.py;
+# copy that directory into MEDIA_ROOT to keep serving them.
+MEDIA_URL = "/media/"
+MEDIA_ROOT = os.environ.get("DJANGO_MEDIA_ROOT", str(Path.home() / ".eagleops" / "media"))
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 
 # Default primary key field type
@@ -207,6 +244,61 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = 'eagleopspeerevaluations@gmail.com'
 EMAIL_HOST_PASSWORD = 'afqk gzha yvbb ocoe'
 DEFAULT_FROM_EMAIL = 'EagleOps Peer Evaluations <eagleopspeerevaluations@gmail.com>'
+# Threads sending mail for async views; each holds one SMTP connection at a time
+EMAIL_SEND_THREADS = 16
+
+# Key of the permutation that turns join code sequence numbers into codes. Anyone
+# who knows it can list every course's code, so it only comes from the
+# environment. Without one, development uses a random key per process.
+JOIN_CODE_KEY = os.environ.get("DJANGO_JOIN_CODE_KEY") or secrets.token_hex(32)
 
 TIME_ZONE = 'America/New_York'
-USE_TZ = True
\ No newline at end of file
+USE_TZ = True
+
+# Settings profile
+# DJANGO_ENV=production switches on the settings below; anything else keeps the
+# development defaults above.
+
+DJANGO_ENV = os.environ.get("DJANGO_ENV", "development")
+
+if DJANGO_ENV == "production":
+    DEBUG = False
+    # Secrets must be provided; the development values above are public
+    for name in ("DJANGO_SECRET_KEY", "DJANGO_JOIN_CODE_KEY"):
+        if not os.environ.get(name):
+            raise ImproperlyConfigured(f"{name} must be set when DJANGO_ENV=production.")
+    SECRET_KEY = os.environ["DJANGO_SECRET_KEY"]
+    JOIN_CODE_KEY = os.environ["DJANGO_JOIN_CODE_KEY"]
+    ALLOWED_HOSTS = [host for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",") if host]
+
+    # Parse each template once per process instead of on every render
+    TEMPLATES[0]["APP_DIRS"] = False
+    TEMPLATES[0]["OPTIONS"]["loaders"] = [
+        ("django.template.loaders.cached.Loader", [
+            "django.template.loaders.filesystem.Loader",
+            "django.template.loaders.app_directories.Loader",
+        ]),
+    ]
+
+    # Reuse database connections across requests, checking them before reuse
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.environ.get("DJANGO_CONN_MAX_AGE", 600))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+    # Shared by all worker processes: Redis when configured, otherwise files on local disk
+    if os.environ.get("REDIS_URL"):
+        CACHES = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": os.environ["REDIS_URL"],
+            }
+        }
+    else:
+        CACHES = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": os.environ.get("DJANGO_CACHE_DIR", str(BASE_DIR / ".cache")),
+            }
+        }
+
+    # Sessions are read from the cache and only fall back to the database on a miss
+    SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
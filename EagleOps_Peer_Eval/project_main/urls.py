@@ -18,8 +18,6 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from pages import views as page_views
-from django.conf.urls.static import static
-from django.conf import settings
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -36,6 +34,4 @@ urlpatterns = [
     path('courses/<int:course_id>/delete/', page_views.delete_course, name='delete_course'),
 ]
 
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Media files are served by pages.views.avatar, which checks the name and the login
\ No newline at end of file